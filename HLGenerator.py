@@ -2,14 +2,18 @@ import os
 import numpy as np
 from contextlib import redirect_stdout
 
+from tracer import TRACE_INST
+import vinst
+
 
 class HLGenerator:
-    def __init__(self, VLEN=4096, DataWidth=64, debug=False):
+    def __init__(self, VLEN=4096, DataWidth=64, TraceLevel=TRACE_INST, debug=False):
 
         # === parameters ===
-        self.VLEN      = VLEN
-        self.DataWidth = DataWidth
-        self.debug     = debug
+        self.VLEN       = VLEN
+        self.DataWidth  = DataWidth
+        self.TraceLevel = TraceLevel  # the strip-mining trace is only printed when TraceLevel >= TRACE_INST
+        self.debug      = debug
 
         # === Dynamic parameters ===
         self._SEW  = 8    # 64, 32, 16, 8
@@ -32,10 +36,10 @@ class HLGenerator:
         """
         
         inst_list = []
-        arg_list  = []
-        print(f"SEW:  {self._SEW}")
-        print(f"LMUL: {self._LMUL}")
-        print("========")
+        verbose   = self.TraceLevel >= TRACE_INST
+        verbose and print(f"SEW:  {self._SEW}")
+        verbose and print(f"LMUL: {self._LMUL}")
+        verbose and print("========")
 
         # === The parameter checks whether a new C code instruction needs to be generated ====
         static_vstart      = 0
@@ -51,7 +55,7 @@ class HLGenerator:
         
         # === strip-mining the AVL ===
         for seg in range(segment):
-            print(f"{mode} [Seg{seg}]")
+            verbose and print(f"{mode} [Seg{seg}]")
 
             # === Pre-calculate start position of segment which in VRF and MMmemory===
             vrfaddr     = vrf_addr + seg * seg_len
@@ -69,20 +73,20 @@ class HLGenerator:
                 vreg_change           = False
                 target_addr_change    = False
 
-                print(f"VRF Byte Addr: {vrfaddr:6}", end=",  ")
+                verbose and print(f"VRF Byte Addr: {vrfaddr:6}", end=",  ")
 
-                print(f"vreg: {vreg:2}", end=",  ")
+                verbose and print(f"vreg: {vreg:2}", end=",  ")
                 if vreg != static_vreg:
                     static_vreg = vreg
                     vreg_change   = True
 
-                print(f"vstart: {vstart:3}", end=",  ")
+                verbose and print(f"vstart: {vstart:3}", end=",  ")
                 if vstart != static_vstart:
                     static_vstart = vstart
                     vstart_change = True
 
                 
-                print(f"Target Byte Addr: {target_addr:6} (0x{target_addr:X})", end=",  ")
+                verbose and print(f"Target Byte Addr: {target_addr:6} (0x{target_addr:X})", end=",  ")
                 if target_addr != static_target_addr:
                     static_target_addr     = target_addr
                     target_addr_change     = True
@@ -129,36 +133,60 @@ class HLGenerator:
                     vstart = 0
                     self.debug and print("case4", end=",  ")
 
-                print(f"elen: {elen:3}", end=",  ")
+                verbose and print(f"elen: {elen:3}", end=",  ")
                 
                 
 
                 vl = static_vstart + elen
-                print(f"vl: {vl:3}", end=",  ")
+                verbose and print(f"vl: {vl:3}", end=",  ")
                    
                 
-                print(f"len (byte): {len:4}")
+                verbose and print(f"len (byte): {len:4}")
 
                 
                 # === to check if there has new instruction needed ===
-                inst_list.append(self.VectorCodeGen('vset',   [vl, self._SEW, self._LMUL]))
-                arg_list.append([vl, self._SEW, self._LMUL])
+                inst_list.append(vinst.vset(vl, self._SEW, self._LMUL))
                 if vstart_change: 
-                    inst_list.append(self.VectorCodeGen('vstart', [static_vstart]))
-                    arg_list.append([static_vstart])
+                    inst_list.append(vinst.vstart(static_vstart))
                 if vreg_change or target_addr_change or vstart_change:
-                    mode == 'load'  and inst_list.append(self.VectorCodeGen('vload_a',  [self._SEW, static_vreg, static_target_addr]))
-                    mode == 'store' and inst_list.append(self.VectorCodeGen('vstore_a', [self._SEW, static_vreg, static_target_addr]))
-                    arg_list.append([self._SEW, static_vreg, static_target_addr])
+                    mode == 'load'  and inst_list.append(vinst.vle(self._SEW, static_vreg, static_target_addr))
+                    mode == 'store' and inst_list.append(vinst.vse(self._SEW, static_vreg, static_target_addr))
 
                 # === Calculating the AVL ===
                 target_addr = static_target_addr + (static_vstart * self.SEWB) + len
                 vrfaddr     = vrfaddr + len
                 AVL         = AVL - elen
                 
-            print()
+            verbose and print()
+
+        return inst_list
+
+    def CIM_Segment_LS(self, mode, nf, length, MMemeory_addr, vreg):
+        """
+        the function to load or store an interleaved matrix (e.g. RGB pixels, NHWC tile) by segment load/store
+        NOTE:
+        (1) "length" is the number of segments (e.g. pixels), each segment is "nf" fields (e.g. channels)
+        (2) the field f of the strip k is in vreg + (k * nf + f) * LMUL, one vlseg/vsseg per strip of VLMAX segments
+        (3) mode can be "load" or "store"
+        """
+        inst_list = []
+        verbose   = self.TraceLevel >= TRACE_INST
+        lmul      = max(int(self._LMUL), 1)
+        strips    = -(-length // self.VLMAX)
+        if nf * lmul > 8 or vreg + strips * nf * lmul > 32:
+            raise ValueError(f"CIM_Segment_LS: {length} segments of {nf} fields exceed the VRF from v{vreg}")
+
+        for strip in range(strips):
+            vl          = min(self.VLMAX, length - strip * self.VLMAX)
+            vd          = vreg + strip * nf * lmul
+            target_addr = MMemeory_addr + strip * self.VLMAX * nf * self.SEWB
+            verbose and print(f"{mode} [Strip{strip}] vreg: {vd:2},  Target Byte Addr: {target_addr:6} (0x{target_addr:X}),  vl: {vl:3}")
+
+            inst_list.append(vinst.vset(vl, self._SEW, self._LMUL))
+            mode == 'load'  and inst_list.append(vinst.vlseg(nf, self._SEW, vd, target_addr))
+            mode == 'store' and inst_list.append(vinst.vsseg(nf, self._SEW, vd, target_addr))
 
-        return inst_list, arg_list
+        return inst_list
 
     def LoadMatrix(self, segment, seg_stride, seg_len, MMemeory_addr, vrf_addr):
         """
@@ -170,10 +198,10 @@ class HLGenerator:
         """
         
         inst_list = []
-        arg_list  = []
-        print(f"SEW:  {self._SEW}")
-        print(f"LMUL: {self._LMUL}")
-        print("========")
+        verbose   = self.TraceLevel >= TRACE_INST
+        verbose and print(f"SEW:  {self._SEW}")
+        verbose and print(f"LMUL: {self._LMUL}")
+        verbose and print("========")
 
         # === The parameter checks whether a new C code instruction needs to be generated ====
         static_vstart      = 0
@@ -201,7 +229,7 @@ class HLGenerator:
         
         # === strip-mining the AVL ===
         for seg in range(segment):
-            print(f"Seg{seg}")
+            verbose and print(f"Seg{seg}")
 
             # === Pre-calculate start position of segment which in VRF and MMmemory===
             vrfaddr     = vrf_addr + seg * seg_len
@@ -219,20 +247,20 @@ class HLGenerator:
                 vd_change             = False
                 target_addr_change    = False
 
-                print(f"Source V Byte Addr: {vrfaddr:6}", end=",  ")
+                verbose and print(f"Source V Byte Addr: {vrfaddr:6}", end=",  ")
 
-                print(f"vreg(vd): {vd:2}", end=",  ")
+                verbose and print(f"vreg(vd): {vd:2}", end=",  ")
                 if vd != static_vd:
                     static_vd = vd
                     vd_change   = True
 
-                print(f"vstart: {vstart:3}", end=",  ")
+                verbose and print(f"vstart: {vstart:3}", end=",  ")
                 if vstart != static_vstart:
                     static_vstart = vstart
                     vstart_change = True
 
                 
-                print(f"Target Byte Addr: {target_addr:6} (0x{target_addr:X})", end=",  ")
+                verbose and print(f"Target Byte Addr: {target_addr:6} (0x{target_addr:X})", end=",  ")
                 if target_addr != static_target_addr:
                     static_target_addr     = target_addr
                     target_addr_change     = True
@@ -279,35 +307,32 @@ class HLGenerator:
                     vstart = 0
                     self.debug and print("case4", end=",  ")
 
-                print(f"elen: {elen:3}", end=",  ")
+                verbose and print(f"elen: {elen:3}", end=",  ")
                 
                 
 
                 vl = static_vstart + elen
-                print(f"vl: {vl:3}", end=",  ")
+                verbose and print(f"vl: {vl:3}", end=",  ")
                    
                 
-                print(f"len (byte): {len:4}")
+                verbose and print(f"len (byte): {len:4}")
 
                 
                 # === to check if there has new instruction needed ===
-                inst_list.append(self.VectorCodeGen('vset',   [vl, self._SEW, self._LMUL]))
-                arg_list.append([vl, self._SEW, self._LMUL])
+                inst_list.append(vinst.vset(vl, self._SEW, self._LMUL))
                 if vstart_change: 
-                    inst_list.append(self.VectorCodeGen('vstart', [static_vstart]))
-                    arg_list.append([static_vstart])
+                    inst_list.append(vinst.vstart(static_vstart))
                 if vd_change or target_addr_change: 
-                    inst_list.append(self.VectorCodeGen('vload_a', [self._SEW, static_vd, static_target_addr]))  
-                    arg_list.append([self._SEW, static_vd, static_target_addr])
+                    inst_list.append(vinst.vle(self._SEW, static_vd, static_target_addr))  
 
                 # === Calculating the AVL ===
                 target_addr = static_target_addr + (static_vstart * self.SEWB) + len
                 vrfaddr     = vrfaddr + len
                 AVL         = AVL - elen
                 
-            print()
+            verbose and print()
 
-        return inst_list, arg_list
+        return inst_list
     
     def StoreMatrix(self, segment, seg_stride, seg_len, MMemeory_addr, vrf_addr):
         """
@@ -321,10 +346,10 @@ class HLGenerator:
         """
 
         inst_list = []
-        arg_list  = []
-        print(f"SEW:  {self._SEW}")
-        print(f"LMUL: {self._LMUL}")
-        print("========")
+        verbose   = self.TraceLevel >= TRACE_INST
+        verbose and print(f"SEW:  {self._SEW}")
+        verbose and print(f"LMUL: {self._LMUL}")
+        verbose and print("========")
 
         # === The parameter checks whether a new C code instruction needs to be generated ====
         static_vstart      = 0
@@ -340,7 +365,7 @@ class HLGenerator:
         
         # === strip-mining the AVL ===
         for seg in range(segment):
-            print(f"Seg{seg}")
+            verbose and print(f"Seg{seg}")
 
             # === Pre-calculate start position of segment which in VRF and MMmemory===
             vrfaddr     = vrf_addr + seg * seg_len
@@ -358,20 +383,20 @@ class HLGenerator:
                 vs_change             = False
                 target_addr_change    = False
 
-                print(f"Source V Byte Addr: {vrfaddr:6}", end=",  ")
+                verbose and print(f"Source V Byte Addr: {vrfaddr:6}", end=",  ")
 
-                print(f"vreg(vs): {vs:2}", end=",  ")
+                verbose and print(f"vreg(vs): {vs:2}", end=",  ")
                 if vs != static_vs:
                     static_vs = vs
                     vs_change   = True
 
-                print(f"vstart: {vstart:3}", end=",  ")
+                verbose and print(f"vstart: {vstart:3}", end=",  ")
                 if vstart != static_vstart:
                     static_vstart = vstart
                     vstart_change = True
 
                 
-                print(f"Target Byte Addr: {target_addr:6}", end=",  ")
+                verbose and print(f"Target Byte Addr: {target_addr:6}", end=",  ")
                 if target_addr != static_target_addr:
                     static_target_addr     = target_addr
                     target_addr_change     = True
@@ -418,61 +443,39 @@ class HLGenerator:
                     vstart = 0
                     self.debug and print("case4", end=",  ")
 
-                print(f"elen: {elen:3}", end=",  ")
+                verbose and print(f"elen: {elen:3}", end=",  ")
                 
                 
 
                 vl = static_vstart + elen
-                print(f"vl: {vl:3}", end=",  ")
+                verbose and print(f"vl: {vl:3}", end=",  ")
                    
                 
-                print(f"len (byte): {len:4}")
+                verbose and print(f"len (byte): {len:4}")
 
                 
                 # === to check if there has new instruction needed ===
-                inst_list.append(self.VectorCodeGen('vset',   [vl, self._SEW, self._LMUL]))
-                arg_list.append([vl, self._SEW, self._LMUL])
+                inst_list.append(vinst.vset(vl, self._SEW, self._LMUL))
                 if vstart_change: 
-                    inst_list.append(self.VectorCodeGen('vstart', [static_vstart]))
-                    arg_list.append([static_vstart])
+                    inst_list.append(vinst.vstart(static_vstart))
                 if vs_change or target_addr_change: 
-                    inst_list.append(self.VectorCodeGen('vstore_a', [self._SEW, static_vs, static_target_addr]))  
-                    arg_list.append([self._SEW, static_vs, static_target_addr])
+                    inst_list.append(vinst.vse(self._SEW, static_vs, static_target_addr))  
 
                 # === Calculating the AVL ===
                 target_addr = static_target_addr + (static_vstart * self.SEWB) + len
                 vrfaddr     = vrfaddr + len
                 AVL         = AVL - elen
                 
-            print()
+            verbose and print()
 
-        return inst_list, arg_list
+        return inst_list
 
-    def VectorCodeGen(self, type, require_list):
+    def VectorCodeGen(self, inst_list):
         """
         this function is used to generate the VPU C code to run in RTL
+        NOTE it is only a serializer of the generated VInst list, the simulator runs the VInst directly
         """
-        
-        if type == 'vset':  # [vl, sew, lmul]
-            vl, sew, lmul = require_list
-            return f'VSET({vl}, e{sew}, m{lmul});'
-
-        elif type == 'vstart':  # [vstart]
-            vstart = require_list[0]
-            return f'write_csr(vstart, {vstart});'
-
-        elif type == 'vload_a':  # [sew, vd, base_addr]
-            sew, vd, base_addr = require_list
-            return (f'asm volatile("vle{sew}.v v{vd}, (%0)" '
-                    f'::"r"((uint{sew}_t*){base_addr}));')
-
-        elif type == 'vstore_a': # [sew, vs, base_addr]
-            sew, vs, base_addr = require_list
-            return (f'asm volatile("vse{sew}.v v{vs}, (%0)" '
-                    f'::"r"((uint{sew}_t*){base_addr}));')
-
-        else:
-            raise ValueError(f"Unsupported instruction type: {type}")
+        return [inst.capi() for inst in inst_list]
     
 
 if __name__ == "__main__":
@@ -490,12 +493,16 @@ if __name__ == "__main__":
     DRAM_BASEADDR = 0xE0000000
     with open(output_path, "w", encoding="utf-8") as f:
         with redirect_stdout(f):
-            inst, arg = instGenerator.CIM_Scatter_LS('load', 20, 5120, 160, DRAM_BASEADDR, 0) #(mode, segment, seg_stride, seg_len, MMemeory_addr, vrf_addr)
-            for line in inst:
+            inst = instGenerator.CIM_Scatter_LS('load', 20, 5120, 160, DRAM_BASEADDR, 0) #(mode, segment, seg_stride, seg_len, MMemeory_addr, vrf_addr)
+            for line in instGenerator.VectorCodeGen(inst):
                 print(f"{line}")
             
-            inst, arg = instGenerator.CIM_Scatter_LS('store', 20, 160, 160, DRAM_BASEADDR, 0) #(mode, segment, seg_stride, seg_len, MMemeory_addr, vrf_addr)
-            for line in inst:
+            inst = instGenerator.CIM_Scatter_LS('store', 20, 160, 160, DRAM_BASEADDR, 0) #(mode, segment, seg_stride, seg_len, MMemeory_addr, vrf_addr)
+            for line in instGenerator.VectorCodeGen(inst):
+                print(f"{line}")
+
+            inst = instGenerator.CIM_Segment_LS('load', 3, 1024, DRAM_BASEADDR, 8) #(mode, nf, length, MMemeory_addr, vreg)
+            for line in instGenerator.VectorCodeGen(inst):
                 print(f"{line}")
     
     # === Load the Golden Pattern ===
@@ -1,19 +1,47 @@
 import os
 import numpy as np
-from main_memory import MEMORY
+from main_memory import MEMORY, ELEMENT_DTYPE
 
+# @ global variables
+AXI_BOUNDARY = 4096  # an AXI burst must not cross a 4KB address boundary
+AXI_COUNTERS = ('bursts', 'beats', 'bytes', 'cycles')
 
 class LSU:
-    def __init__(self, Memory, debug=False):
+    def __init__(self, Memory, AxiDataWidth=64, MaxBurstLen=256, ReadOutstanding=8, WriteOutstanding=8, AxiLatency=20, debug=False):
+        """
+        the load/store unit with an AXI front end
+        NOTE:
+        (1) the beats of an access (in element order) are coalesced into INCR bursts, a burst breaks when
+            the next beat isn't the next address, at the "MaxBurstLen" beats and at the 4KB boundary
+        (2) each burst holds one of the "ReadOutstanding" / "WriteOutstanding" transaction slots
+            for "AxiLatency" + its beats cycles, the data channel moves one beat per cycle:
+            cycles = max(AxiLatency + max(beats, bursts), (bursts * AxiLatency + beats) / outstanding)
+        (3) "axi" is the counters of the last access (one vector instruction), "total_axi" is accrued over all the accesses
+        """
         self.memory = Memory # bind memory to LSU
         self.debug  = debug
 
+        # === parameters ===
+        self.AxiDataWidth     = AxiDataWidth        # store beat width (bit)
+        self.BeatBytes        = AxiDataWidth // 8
+        self.MaxBurstLen      = MaxBurstLen         # beats per burst (256 for AXI4 INCR)
+        self.ReadOutstanding  = ReadOutstanding     # outstanding read transactions
+        self.WriteOutstanding = WriteOutstanding    # outstanding write transactions
+        self.AxiLatency       = AxiLatency          # address to first data (read) or to the response (write), cycles
+
         # === variable for addrgen ===
         self._vl         = 0
         self._vstart     = 0
         self._vsew       = 0
         
         self.elen        = 0
+
+        # === statistics ===
+        self.beats       = 0  # distinct beats touched by the last access
+        self.total_beats = 0  # distinct beats accrued over all the accesses
+        self.span        = None  # byte span [lo, hi) of the last access
+        self.axi         = dict.fromkeys(AXI_COUNTERS, 0)  # AXI counters of the last access
+        self.total_axi   = dict.fromkeys(AXI_COUNTERS, 0)  # AXI counters accrued over all the accesses
     
     def AxiAddrSet(self, vl, vstart, vsew):
         self._vl             = vl
@@ -22,81 +50,250 @@ class LSU:
 
         self.elen            = self._vl - self._vstart
 
-    def LoadMemory(self, base_addr, stride):
+    def ElementAddr(self, base_addr, stride=1, offset=None, active=None):
+        """
+        this function is used to get the byte address of the elements [vstart, vl) as one array
+        NOTE:
+        (1) "stride" is main memory byte stride defined by RVV (1 is unit-stride), it can be 0 or negative
+        (2) "offset" is the byte offset vector of the indexed access (unsigned, one offset per element)
+        (3) the masked-off elements ("active" is False) are dropped, they don't access memory
+        """
+        if offset is not None:
+            element_addr = base_addr + np.asarray(offset).astype(np.uint64).astype(np.int64)
+        else:
+            step = self._vsew // 8 if stride == 1 else stride
+            element_addr = base_addr + (self._vstart + np.arange(max(self.elen, 0), dtype=np.int64)) * step
+        return element_addr if active is None else element_addr[active]
+
+    def CountBeats(self, element_addr, write=False):
+        """
+        this function is used to count the distinct beats touched by the elements (a misaligned element can touch two)
+        """
+        first = element_addr // self.BeatBytes
+        last  = (element_addr + self._vsew // 8 - 1) // self.BeatBytes
+        self.beats        = len(np.unique(np.concatenate([first, last])))
+        self.span         = (int(element_addr.min()), int(element_addr.max()) + self._vsew // 8) if len(element_addr) else None
+        self.total_beats += self.beats
+        self.AxiBursts(np.stack([first, last], axis=1).reshape(-1), len(element_addr) * (self._vsew // 8), write)
+        return self.beats
+
+    def NoAccess(self):
+        """
+        this function is used to clear the statistics of the last access when no element is accessed
+        (vl <= vstart, or no active element), so the counters of the previous access aren't charged again
+        """
+        self.beats = 0
+        self.span  = None
+        self.axi   = dict.fromkeys(AXI_COUNTERS, 0)
+        self.memory.account([])  # an empty request clears the per-request counters of the memory levels
+
+    def AxiBursts(self, beat, nbytes, write=False):
+        """
+        this function is used to coalesce the beats (beat index, in issue order) of one access into AXI INCR bursts
+        will return the AXI counters of the access
+        """
+        beat = np.asarray(beat, dtype=np.int64)
+        if len(beat):
+            beat = beat[np.append(True, beat[1:] != beat[:-1])]  # the bytes of one beat are one transfer
+
+        # === a burst starts at an address jump or a 4KB boundary, and is split at "MaxBurstLen" ===
+        start = np.ones((len(beat)), dtype=bool)
+        start[1:] = (beat[1:] != beat[:-1] + 1) | (beat[1:] * self.BeatBytes % AXI_BOUNDARY == 0)
+        index = np.arange(len(beat))
+        pos   = index - np.maximum.accumulate(np.where(start, index, 0))
+        start |= pos % self.MaxBurstLen == 0
+
+        bursts      = int(np.count_nonzero(start))
+        outstanding = self.WriteOutstanding if write else self.ReadOutstanding
+        cycles      = max(self.AxiLatency + max(len(beat), bursts), -(-(bursts * self.AxiLatency + len(beat)) // outstanding)) if bursts else 0
+        self.axi    = {'bursts': bursts, 'beats': len(beat), 'bytes': int(nbytes), 'cycles': cycles}
+        self.total_axi = {counter: self.total_axi[counter] + self.axi[counter] for counter in AXI_COUNTERS}
+        return self.axi
+
+    def AxiReport(self, counters=None):
+        """
+        the function to get the AXI counters with the average burst length (beats) and bandwidth (bytes per cycle)
+        """
+        counters = self.total_axi if counters is None else counters
+        return {**counters, 'avg_burst_len': counters['beats'] / max(counters['bursts'], 1),
+                'bandwidth': counters['bytes'] / max(counters['cycles'], 1)}
+
+    def LoadMemory(self, base_addr, stride, active=None):
         """
         this function is used to load data from Main Memory
-        will return the data list with specify data size
-        NOTE: "stride" is main memory byte stride defined by RVV
+        will return the data vector (numpy array) with specify data size
+        NOTE: 
+        (1) "stride" is main memory byte stride defined by RVV
+        (2) the unit-stride load is one burst of contiguous bytes, 
+            the strided / masked load and the debug tracing gather the elements (LoadElements)
+        (3) only the active elements are returned if "active" is given
         """
-        static_byte_addr = 0
-        rtn_data         = 0
-        vector_list      = []
-        
-        for element in range(self.elen):
-            # === 64b axi addr pre-calculate ===
-            if stride == 1:
-                byte_addr = base_addr + ((self._vstart + element) * (self._vsew // 8))
-            else:
-                byte_addr = base_addr + ((self._vstart + element) * stride)
-            self.debug and print(f"Fetch Addr: 0x{byte_addr:X}", end=", ")
-            
-            
-            # === load data from Main memory per 64b===
-            updata_addr = (static_byte_addr >> 3) != (byte_addr >> 3)
-
-            if updata_addr:
-                static_byte_addr = byte_addr
-                rtn_data = self.memory.take64bData(static_byte_addr)  # TODO add DRAM perfomance counter here !!
-                # print(f"Fetch Addr: 0x{static_byte_addr:X}")
-            self.debug and print(f"data: 0x{rtn_data:X}")
-            
-            # === add element to the return list ===
-            element_value = (rtn_data >> ((byte_addr & 0b111) * 8)) & ((1 << self._vsew) - 1)
-            vector_list.append(element_value)
-        
+        # === unit-stride burst: the whole vector is one contiguous byte range ===
+        if stride == 1 and active is None and not self.debug:
+            return self.LoadBurst(base_addr)
+        return self.LoadElements(self.ElementAddr(base_addr, stride, active=active))
+
+    def LoadIndexed(self, base_addr, offset, active=None):
+        """
+        this function is used to load an indexed vector (vluxei/vloxei) from Main Memory
+        NOTE the ordered and unordered loads are the same for the memory without side effects
+        """
+        return self.LoadElements(self.ElementAddr(base_addr, offset=offset, active=active))
+
+    def LoadSegment(self, base_addr, stride, nf, offset=None, active=None):
+        """
+        this function is used to load a segment vector (vlseg/vlsseg/vl[u|o]xseg) from Main Memory
+        will return the (nf, element) array, row f is the field f of all segments
+        NOTE:
+        (1) the segment i is nf contiguous elements at its segment address, "stride" 1 is unit-stride (nf * SEW/8 bytes)
+        (2) all fields are one bulk read and de-interleaved by one reshape/transpose
+        """
+        sewb         = self._vsew // 8
+        segment_addr = self.ElementAddr(base_addr, nf * sewb if stride == 1 else stride, offset, active)
+
+        # === unit-stride burst: all the segments are one contiguous byte range ===
+        if stride == 1 and offset is None and active is None and not self.debug:
+            start_addr = int(base_addr + self._vstart * nf * sewb)
+            byte_data  = self.memory.take_bytes(start_addr, len(segment_addr) * nf * sewb)
+            self.memory.account_range(start_addr, len(byte_data))  # DRAM performance counter
+            elements  = byte_data.view(ELEMENT_DTYPE[self._vsew]).astype(ELEMENT_DTYPE[self._vsew].newbyteorder('='))
+            self.CountBeats((segment_addr[:, None] + np.arange(nf) * sewb).reshape(-1))
+        else:
+            elements  = self.LoadElements((segment_addr[:, None] + np.arange(nf) * sewb).reshape(-1))
+        return elements.reshape(-1, nf).T
 
-        return vector_list
+    def LoadElements(self, element_addr):
+        """
+        this function is used to gather the elements at any byte address from Main Memory in one call
+        will return the data vector (numpy array) with specify data size
+        """
+        sewb      = self._vsew // 8
+        byte_addr = (element_addr[:, None] + np.arange(sewb)).reshape(-1)
+        byte_data = self.memory.take_scattered(byte_addr)
+        self.memory.account(byte_addr)  # DRAM performance counter
+        elements  = byte_data.view(ELEMENT_DTYPE[self._vsew]).astype(ELEMENT_DTYPE[self._vsew].newbyteorder('='))
+        self.CountBeats(element_addr)
+
+        if self.debug:
+            for addr, data in zip(element_addr, elements):
+                print(f"Fetch Addr: 0x{addr:X}, data: 0x{data:X}")
+        return elements
+
+    def LoadBurst(self, base_addr):
+        """
+        this function is used to load an unit-stride vector from Main Memory in one burst
+        will return the data vector (numpy array) with specify data size
+        """
+        sewb       = self._vsew // 8
+        start_addr = base_addr + self._vstart * sewb
+        byte_data  = self.memory.take_bytes(start_addr, max(self.elen, 0) * sewb)
+        self.memory.account_range(start_addr, len(byte_data))  # DRAM performance counter
+        self.CountBeats(start_addr + np.arange(0, len(byte_data), sewb, dtype=np.int64))
+
+        return byte_data.view(ELEMENT_DTYPE[self._vsew]).astype(ELEMENT_DTYPE[self._vsew].newbyteorder('='))
     
-    def StoreMemory(self, base_addr, stride, data_list):
+    def StoreMemory(self, base_addr, stride, data_list, active=None):
         """
         this function is used to store data to Main Mempry
-        NOTE: "stride" is main memory byte stride defined by RVV
-        TODO: 
-        (1) this function is not same as Ara, not only 64b store when vstart is not 0
+        NOTE: 
+        (1) "stride" is main memory byte stride defined by RVV
+        (2) the unit-stride store is one masked write of contiguous bytes,
+            the other stores are merged into beats by the write-combining buffer (StoreElements)
+        (3) "data_list" is the elements [vstart, vl), the masked-off elements ("active" is False) are not stored
         """
-        if stride == 1:
-            static_byte_addr = base_addr + (self._vstart * (self._vsew // 8))
-        else:
-            static_byte_addr = base_addr + (self._vstart * stride)
-        byte_strb        = 0
-        store_data       = 0
-
-        for element in range(self.elen):
-            # === 64b axi addr pre-calculate ===
-            if stride == 1:
-                byte_addr = base_addr + ((self._vstart + element) * (self._vsew // 8))
-            else:
-                byte_addr = base_addr + ((self._vstart + element) * stride)
-            print(f"Store Addr: 0x{byte_addr:X}")
-
-            
-            # === Store data to Main memory per 64b ===
-            updata_addr = ( (static_byte_addr >> 3) != (byte_addr >> 3) )
-
-            if updata_addr:
-                print(f"Store Addr: 0x{static_byte_addr:X}, strb: {byte_strb:X}, data: 0x{store_data:X}")
-                self.memory.store64bData(static_byte_addr, byte_strb, store_data)  # TODO add DRAM perfomance counter here !!
-                static_byte_addr = byte_addr
-                byte_strb  = 0
-                store_data = 0
-            else:
-                byte_strb = byte_strb   | (1 << (byte_addr & 0b111))  # byte strb
-                store_data = store_data | (data_list[element] << ((byte_addr & 0b111) * 8))
+        elements     = self._store_elements(data_list, active)
+        element_addr = self.ElementAddr(base_addr, stride, active=active)
+
+        # === unit-stride burst: the whole vector is one contiguous byte range ===
+        if stride == 1 and active is None and not self.debug and len(elements):
+            self.memory.store_bytes(int(element_addr[0]), elements.view(np.uint8))
+            self.memory.account_range(int(element_addr[0]), elements.nbytes, write=True)  # DRAM performance counter
+            self.CountBeats(element_addr, write=True)
+            return
+        self.StoreElements(element_addr, elements)
+
+    def StoreIndexed(self, base_addr, offset, data_list, active=None):
+        """
+        this function is used to store an indexed vector (vsuxei/vsoxei) to Main Memory
+        NOTE the elements are always stored in element order, which is the ordering of vsoxei
+             and one of the legal orders of vsuxei: the later element wins if the addresses overlap
+        """
+        self.StoreElements(self.ElementAddr(base_addr, offset=offset, active=active), self._store_elements(data_list, active))
+
+    def StoreSegment(self, base_addr, stride, nf, fields, offset=None, active=None):
+        """
+        this function is used to store a segment vector (vsseg/vssseg/vs[u|o]xseg) to Main Memory
+        NOTE "fields" is the (nf, element) array of [vstart, vl), it is interleaved by one transpose/reshape
+        """
+        sewb         = self._vsew // 8
+        segment_addr = self.ElementAddr(base_addr, nf * sewb if stride == 1 else stride, offset, active)
+        fields       = np.asarray(fields)[:, :max(self.elen, 0)].astype(ELEMENT_DTYPE[self._vsew])
+        elements     = np.ascontiguousarray((fields if active is None else fields[:, active]).T).reshape(-1)
+        element_addr = (segment_addr[:, None] + np.arange(nf) * sewb).reshape(-1)
+
+        # === unit-stride burst: all the segments are one contiguous byte range ===
+        if stride == 1 and offset is None and active is None and not self.debug and len(elements):
+            self.memory.store_bytes(int(element_addr[0]), elements.view(np.uint8))
+            self.memory.account_range(int(element_addr[0]), elements.nbytes, write=True)  # DRAM performance counter
+            self.CountBeats(element_addr, write=True)
+            return
+        self.StoreElements(element_addr, elements)
+
+    def _store_elements(self, data_list, active):
+        elements = np.asarray(data_list)[:max(self.elen, 0)].astype(ELEMENT_DTYPE[self._vsew])
+        return elements if active is None else elements[active]
+
+    def StoreElements(self, element_addr, elements):
+        """
+        this function is used to scatter the elements to any byte address of Main Memory in one call
+        NOTE the element bytes are merged into beats (in element order), all beats are flushed at the vector end
+        """
+        if len(elements) == 0:
+            return self.NoAccess()
+        sewb      = self._vsew // 8
+        byte_addr = (element_addr[:, None] + np.arange(sewb)).reshape(-1)
+        beat_addr, byte_strb, beat_data = self.WriteCombine(byte_addr, elements.view(np.uint8))
+
+        if self.debug:
+            for addr, strb, data in zip(beat_addr, byte_strb, beat_data):
+                strb_value = sum(1 << int(byte) for byte in np.flatnonzero(strb))
+                print(f"Store Addr: 0x{addr:X}, strb: {strb_value:X}, data: 0x{data[::-1].tobytes().hex().upper()}")
+        self.memory.store_beats(beat_addr, byte_strb, beat_data)
+        self.memory.account(beat_addr, int(byte_strb.sum()), write=True)  # DRAM performance counter
+        self.CountBeats(element_addr, write=True)
+
+    def WriteCombine(self, byte_addr, byte_data):
+        """
+        this function is the write-combining buffer of the store path
+        the bytes (in issue order) are merged into one beat until the address leaves the beat
+        will return (beat_addr, byte_strb, beat_data), byte_strb/beat_data are (beat, BeatBytes) arrays
+        """
+        byte_addr = np.asarray(byte_addr, dtype=np.int64)
+        beat      = byte_addr // self.BeatBytes
+        lane      = byte_addr %  self.BeatBytes
+
+        # === a new beat starts whenever the address moves to another beat ===
+        new_beat  = np.ones((len(beat)), dtype=bool)
+        new_beat[1:] = beat[1:] != beat[:-1]
+        beat_idx  = np.cumsum(new_beat) - 1
+        nr_beats  = int(beat_idx[-1]) + 1 if len(beat_idx) else 0
+
+        # === fill the beats, the later byte wins if the elements overlap ===
+        slot = beat_idx * self.BeatBytes + lane
+        last_slot, last_pos = np.unique(slot[::-1], return_index=True)
+
+        byte_strb = np.zeros((nr_beats * self.BeatBytes), dtype=bool)
+        beat_data = np.zeros((nr_beats * self.BeatBytes), dtype=np.uint8)
+        byte_strb[last_slot] = True
+        beat_data[last_slot] = byte_data[::-1][last_pos]
+
+        beat_addr = beat[new_beat] * self.BeatBytes
+        return beat_addr, byte_strb.reshape(nr_beats, self.BeatBytes), beat_data.reshape(nr_beats, self.BeatBytes)
                 
 
 if __name__ == "__main__":
     print("===== LoadStoreUnit testbench =====")
-    print("version: 2025.05.23")
+    print("version: 2025.06.20")
 
     current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -119,6 +316,19 @@ if __name__ == "__main__":
     lsu.AxiAddrSet(6, 0, 16) #(vl, vstart, vsew)
     print(f"sew: {lsu._vsew}, elen: {lsu.elen}")
     lsu.StoreMemory(0xE0000000, 1, [0x1111, 0x2222, 0x3333, 0x4444, 0x5555, 0x6666])  # (self, base_addr, stride, data_list)
+
+    # === Strided / indexed test ===
+    lsu.AxiAddrSet(8, 0, 32) #(vl, vstart, vsew)
+    vector = lsu.LoadMemory(0xE0000000, 64)  # stride is byte stride
+    print([f"0x{val:X}"  for val in vector], f"beats: {lsu.beats}")
+    vector = lsu.LoadIndexed(0xE0000000, [0, 4, 4, 64, 8, 128, 12, 0])  # byte offset
+    print([f"0x{val:X}"  for val in vector], f"beats: {lsu.beats}")
+    
+
     
 
-    
\ No newline at end of file
+    # === AXI bursts: a strip-mined unit-stride load resumed at vstart, and a strided load ===
+    for vl, vstart, stride in [(512, 0, 1), (512, 5, 1), (512, 300, 1), (64, 0, 16)]:
+        lsu.AxiAddrSet(vl, vstart, 32)
+        lsu.LoadMemory(0xE0000F00, stride)
+        print(f"vl: {vl}, vstart: {vstart}, stride: {stride} ->", lsu.AxiReport(lsu.axi))
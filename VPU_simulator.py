@@ -1,68 +1,288 @@
 import numpy as np
 import os
+import copy
 from contextlib import redirect_stdout
 
 from HLGenerator import HLGenerator
 from main_memory import MEMORY
-from dispatcher import DISPATCHER
+from dispatcher import DISPATCHER, STRIDE_OPS, INDEX_OPS
 from vrf import VRF
 from LoadStoreU import LSU
+from valu import VALU, VALU_OPS, _emul
+from vmfpu import VMFPU, VMFPU_OPS
+from vrdu import VRDU, VRDU_OPS
+from masku import MASKU, MASKU_OPS
+from sldu import SLDU, SLDU_OPS
+from vinst import VInst
+from tracer import TRACER, TRACE_OFF, TRACE_SUMMARY, TRACE_INST, TRACE_ELEMENT
+from timing import TIMING
+from cache import CACHE, SCRATCHPAD
 
 DRAM_BASEADDR = 0xE0000000
+SRAM_BASEADDR = 0xC0000000  # the scratchpad (UNI_SRAM), in front of the cache and the DRAM
+DRAM_DEPTH    = 409600      # number of 64b words
+MEM_OPS       = STRIDE_OPS + INDEX_OPS
 
 class VPU_simulator:
-    def __init__(self, debug=False):
+    def __init__(self, DramDepth=DRAM_DEPTH, DramFile=None, DramPaged=False, TraceLevel=TRACE_INST, Timing=False,
+                 Cache=False, SramDepth=0, debug=False):
+        """
+        NOTE: 
+        (1) "DramFile" is an optional DRAM image path, the DRAM is memory-mapped from it
+            so multi-GB address spaces only keep the touched pages resident
+        (2) "DramPaged" uses the sparse paged DRAM, which makes fork() cheap
+        (3) "TraceLevel": TRACE_OFF / TRACE_SUMMARY / TRACE_INST / TRACE_ELEMENT,
+            TRACE_ELEMENT turns on the per element trace of LSU and VRF
+        (4) "Timing" turns on the cycle-approximate timing model, see "timing.report()" after the run,
+            and the DRAM timing and statistics layer, see "dram.timing.report()"
+        (5) "Cache" puts a CACHE between the LSU and the DRAM, True is the default cache, a dict is the CACHE parameters
+            "SramDepth" (64b words) puts a SCRATCHPAD at SRAM_BASEADDR in front of them, see cache.py
+        """
         # Initialize all sub-modules
-        self.dram       = MEMORY(BASEADDR=DRAM_BASEADDR, DataWidth=64, Depth=409600, debug=False)
-        self.vrf        = VRF()
+        self.tracer     = TRACER(level=TraceLevel)
+        self.dram       = MEMORY(BASEADDR=DRAM_BASEADDR, DataWidth=64, Depth=DramDepth, BackingFile=DramFile, Paged=DramPaged,
+                                 Timing=Timing, debug=False)
+        self.vrf        = VRF(debug=TraceLevel >= TRACE_ELEMENT)
         self.dispatcher = DISPATCHER()
-        self.lsu        = LSU(Memory=self.dram)  # bind main memory to lsu
+        self.cache      = CACHE(self.dram, **(Cache if isinstance(Cache, dict) else {}),
+                                debug=TraceLevel >= TRACE_ELEMENT) if Cache else None
+        self.sram       = SCRATCHPAD(self.dram if self.cache is None else self.cache, BASEADDR=SRAM_BASEADDR, Depth=SramDepth,
+                                     debug=TraceLevel >= TRACE_ELEMENT) if SramDepth else None
+        self.memory     = next(level for level in (self.sram, self.cache, self.dram) if level is not None)  # the front level
+        self.lsu        = LSU(Memory=self.memory, debug=TraceLevel >= TRACE_ELEMENT)  # bind main memory to lsu
+        self.valu       = VALU(self.vrf, self.dispatcher, debug=TraceLevel >= TRACE_ELEMENT)
+        self.vmfpu      = VMFPU(self.vrf, self.dispatcher, debug=TraceLevel >= TRACE_ELEMENT)
+        self.vrdu       = VRDU(self.vrf, self.dispatcher, debug=TraceLevel >= TRACE_ELEMENT)
+        self.masku      = MASKU(self.vrf, self.dispatcher, debug=TraceLevel >= TRACE_ELEMENT)
+        self.sldu       = SLDU(self.vrf, self.dispatcher, debug=TraceLevel >= TRACE_ELEMENT)
+        self.timing     = TIMING(self.vrf, self.dispatcher, self.lsu, self.vrdu, self.sldu,
+                                 debug=TraceLevel >= TRACE_ELEMENT) if Timing else None
         self.debug      = debug
     
 
     def preload_memory(self, dir_path):
-        raw_pattern = np.load(dir_path)                        # load file
-        byte_pattern = raw_pattern.flatten().astype(np.uint8)  # fp32 to uint8
-        self.dram.init_byte_to_mem(byte_pattern)               # the preload pattern which is represent in byte
+        """
+        the function to preload a pattern (.npy of any dtype) into DRAM, its raw little-endian bytes are loaded
+        """
+        raw_pattern = np.load(dir_path)           # load file
+        self.dram.init_byte_to_mem(raw_pattern)   # init_byte_to_mem reinterprets the raw bytes, no copy
 
+    def fork(self):
+        """
+        the function to fork the simulator, e.g. to start many experiments from one preloaded DRAM
+        NOTE with "DramPaged" the DRAM pages are shared copy-on-write, so the fork costs microseconds
+        """
+        if self.dram.BackingFile is not None:
+            raise ValueError("fork: file-backed DRAM can't be forked")
 
-    def run(self, inst_list, arg_list):
-        for inst_number, (inst, arg) in enumerate( zip(inst_list, arg_list)):
+        sim = VPU_simulator(DramDepth=self.dram.Depth, DramPaged=self.dram.Paged, TraceLevel=self.tracer.level,
+                            Timing=self.timing is not None, Cache=self.cache is not None,
+                            SramDepth=self.sram.sram.Depth if self.sram is not None else 0, debug=self.debug)
+        sim.dram.restore(self.dram.snapshot())
+        sim.dram.dirty  = self.dram.dirty.copy()
+        sim.dram.timing = copy.deepcopy(self.dram.timing)
+        for level in ('cache', 'sram'):
+            getattr(self, level) is not None and getattr(sim, level).__dict__.update(
+                copy.deepcopy({k: v for k, v in getattr(self, level).__dict__.items() if k != 'memory'}))
+
+        # === copy the architectural state in place (the sub-modules keep their bindings) ===
+        sim.vrf.__dict__.update(copy.deepcopy(self.vrf.__dict__))
+        sim.dispatcher.__dict__.update(copy.deepcopy(self.dispatcher.__dict__))
+        sim.lsu.__dict__.update(copy.deepcopy({k: v for k, v in self.lsu.__dict__.items() if k != 'memory'}))
+        sim.vrdu.inter_lane_steps = self.vrdu.inter_lane_steps
+        sim.sldu.inter_lane_moves = self.sldu.inter_lane_moves
+        if self.timing is not None:
+            bindings = ('vrf', 'dispatcher', 'lsu', 'vrdu', 'sldu')
+            sim.timing.__dict__.update(copy.deepcopy({k: v for k, v in self.timing.__dict__.items() if k not in bindings}))
+        return sim
+
+
+    # === execution of the instructions which move data, indexed by the decoded type ===
+    def _exec_vle(self, inst):  # [sew, vd, base_addr, nf]
+        self._load(inst, stride=1) # set unit stride
+
+    def _exec_vse(self, inst):  # [sew, vs, base_addr, nf]
+        self._store(inst, stride=1) # set unit stride
+
+    def _exec_vlse(self, inst):  # [sew, vd, base_addr, stride]
+        self._load(inst, *self._stride(inst))
+
+    def _exec_vsse(self, inst):  # [sew, vs, base_addr, stride]
+        self._store(inst, *self._stride(inst))
+
+    def _exec_vlxei(self, inst):  # [index eew, vd, base_addr, vs2]
+        self._load(inst, offset=self._offset(inst))
+
+    def _exec_vsxei(self, inst):  # [index eew, vs, base_addr, vs2]
+        self._store(inst, offset=self._offset(inst))
+
+    def _stride(self, inst):
+        """
+        the function to get (stride, offset) of the strided load/store
+        NOTE the LSU takes stride 1 as unit-stride, a real 1 byte stride of SEW > 8 or segments is given as the offset vector
+        """
+        if inst.rs2 == 1 and (self.dispatcher.SEW > 8 or inst.nf > 1):
+            return 1, np.arange(self.dispatcher.vstart, self.dispatcher.vl)
+        return inst.rs2, None
+
+    def _offset(self, inst):
+        """
+        the function to get the byte offset vector [vstart, vl) of the indexed load/store
+        NOTE the index vs2 is EEW = inst.sew, EMUL = EEW/SEW*LMUL, the data is SEW/LMUL
+        """
+        eew = inst.sew
+        return self.vrf.take(inst.vs2, self.dispatcher.vstart, max(self.dispatcher.vl - self.dispatcher.vstart, 0),
+                             eew, _emul(self.dispatcher.LMUL, eew, self.dispatcher.SEW))
+
+    def _fields(self, inst):
+        """
+        the function to get the register of each field, the field f of a segment load/store is vd + f*EMUL
+        """
+        emul = max(int(self.dispatcher.LMUL), 1)
+        if inst.nf * emul > 8 or inst.vd + inst.nf * emul > 32:
+            raise ValueError(f"VPU_simulator: {inst!r} is reserved, NFIELDS * EMUL > 8 or the fields exceed v31.")
+        return [inst.vd + field * emul for field in range(inst.nf)]
+
+    def _load(self, inst, stride=1, offset=None):
+        # TODO VRF element length need be calculate in lane
+        vl, vstart     = self.dispatcher.vl, self.dispatcher.vstart
+        element_length = vl - vstart
+        fields         = self._fields(inst)
+        if element_length <= 0:
+            return self.lsu.NoAccess()
+        active = self.masku.predicate(inst.vm, vstart, vl)
+
+        # === load from main memory, the masked-off elements are not accessed ===
+        self.lsu.AxiAddrSet(vl, vstart, self.dispatcher.SEW)
+        if inst.nf > 1:
+            temp_fields = self.lsu.LoadSegment(inst.rs1, stride, inst.nf, offset, active)
+        elif offset is None:
+            temp_fields = [self.lsu.LoadMemory(inst.rs1, stride, active)]
+        else:
+            temp_fields = [self.lsu.LoadIndexed(inst.rs1, offset, active)]
+
+        # === store to VRF ===
+        self.vrf.vset(self.dispatcher.SEW, self.dispatcher.LMUL)
+        for vd, temp_vector in zip(fields, temp_fields):
+            self.debug and print( [f"0x{val:X}"  for val in temp_vector] )
+            if active is not None:
+                vector = self.vrf.take(vd, vstart, element_length)
+                vector[:] = np.iinfo(vector.dtype).max if self.dispatcher.vma else vector
+                vector[active] = temp_vector
+                temp_vector = vector
+            self.vrf.load(vd, vstart, element_length, temp_vector)
+
+    def _store(self, inst, stride=1, offset=None):
+        # TODO VRF element length need be calculate in lane
+        vl, vstart     = self.dispatcher.vl, self.dispatcher.vstart
+        element_length = vl - vstart
+        fields         = self._fields(inst)
+        if element_length <= 0:
+            return self.lsu.NoAccess()
+
+        # === load from VRF ===
+        self.vrf.vset(self.dispatcher.SEW, self.dispatcher.LMUL)
+        temp_fields = np.stack([self.vrf.take(vs, vstart, element_length) for vs in fields])
+        active      = self.masku.predicate(inst.vm, vstart, vl)
+
+        # === store to maine memory ===
+        self.lsu.AxiAddrSet(vl, vstart, self.dispatcher.SEW)
+        if inst.nf > 1:
+            self.lsu.StoreSegment(inst.rs1, stride, inst.nf, temp_fields, offset, active)
+        elif offset is None:
+            self.lsu.StoreMemory(inst.rs1, stride, temp_fields[0], active)
+        else:
+            self.lsu.StoreIndexed(inst.rs1, offset, temp_fields[0], active)
+
+    def _exec_valu(self, inst):  # [vd, vs2, vs1/rs1/imm]
+        self.valu.execute(inst)
+
+    def _exec_vmfpu(self, inst):  # [vd, vs2, vs1/rs1]
+        self.vmfpu.execute(inst)
+
+    def _exec_vrdu(self, inst):  # [vd, vs2, vs1]
+        self.vrdu.execute(inst)
+
+    def _exec_masku(self, inst):  # [vd/rd, vs2, vs1]
+        self.masku.execute(inst)
+
+    def _exec_sldu(self, inst):  # [vd, vs2, vs1/rs1/imm]
+        self.sldu.execute(inst)
+
+    EXECUTE = {
+        'vle':    _exec_vle,
+        'vse':    _exec_vse,
+        'vlse':   _exec_vlse,
+        'vsse':   _exec_vsse,
+        'vluxei': _exec_vlxei,
+        'vloxei': _exec_vlxei,
+        'vsuxei': _exec_vsxei,
+        'vsoxei': _exec_vsxei,
+        'vlseg':  _exec_vle,
+        'vsseg':  _exec_vse,
+        'vlsseg': _exec_vlse,
+        'vssseg': _exec_vsse,
+        'vluxseg': _exec_vlxei,
+        'vloxseg': _exec_vlxei,
+        'vsuxseg': _exec_vsxei,
+        'vsoxseg': _exec_vsxei,
+        **dict.fromkeys(VALU_OPS, _exec_valu),
+        **dict.fromkeys(VMFPU_OPS, _exec_vmfpu),
+        **dict.fromkeys(VRDU_OPS, _exec_vrdu),
+        **dict.fromkeys(MASKU_OPS, _exec_masku),
+        **dict.fromkeys(SLDU_OPS, _exec_sldu),
+    }
+
+    def run(self, inst_list):
+        """
+        the function to run the instructions
+        NOTE:
+        (1) "inst_list" is a list of VInst (see HLGenerator), or a raw RVV binary stream (32b words)
+            the scalar operands of the binary are read from the scalar regfile "dispatcher.xreg"
+        (2) each instruction is dispatched by one dict lookup of its type
+        (3) the trace level is checked before any formatting, TRACE_OFF runs without any string formatting
+        """
+        level = self.tracer.level
+        since = self.tracer.count
+        dram  = self.dram.timing and dict(self.dram.timing.total)  # DRAM counters before the run
+        axi   = dict(self.lsu.total_axi)                           # AXI counters before the run
+        cache = self.cache and dict(self.cache.total)              # cache counters before the run
+        sram  = self.sram and dict(self.sram.total)                # scratchpad counters before the run
+        if isinstance(inst_list, np.ndarray):
+            inst_list = inst_list.tolist()
+
+        for inst_number, inst in enumerate(inst_list):
 
             # === Decoder instruction ===
-            type = self.dispatcher.decodeCAPI(inst, arg)
+            if type(inst) is not VInst:
+                inst = self.dispatcher.decodeBin(inst)
+            inst_type = self.dispatcher.decodeInst(inst)
+
+            # === Trace the instruction ===
+            level >= TRACE_INST and print(f"Inst number[{inst_number}] -> type: {inst_type},", inst)
+            level >= TRACE_SUMMARY and self.tracer.record(inst_number, inst_type, self.dispatcher.vl, self.dispatcher.vstart, self.dispatcher.SEW,
+                                                          inst.vd, inst.rs1 if inst_type in MEM_OPS else 0)
 
             # === Dataflow for different type of instruction ===
-            print(f"Inst number[{inst_number}] -> type: {type}", arg)
-            
             # if type == 'vset':  sew, lmul is stored in dispatcher
             # if type == 'vstart': csr is stored in dispatcher
-            if type == 'vload_a':  # [sew, vd, base_addr]
-                # === load from main memory ===
-                self.lsu.AxiAddrSet(self.dispatcher.vl, self.dispatcher.vstart, self.dispatcher.SEW)
-                temp_vector = self.lsu.LoadMemory(arg[2], 1) # set unit stride
-                self.debug and print( [f"0x{val:X}"  for val in temp_vector] )
-                
-                # TODO VRF element length need be calculate in lane
-                # === store to VRF ===
-                element_length = self.dispatcher.vl - self.dispatcher.vstart
-                self.vrf.vset(self.dispatcher.SEW, self.dispatcher.LMUL)
-                self.vrf.load(arg[1], self.dispatcher.vstart, element_length, temp_vector)
-            
-            if type == 'store_a':  # [sew, vs, base_addr]
-                # TODO VRF element length need be calculate in lane
-                # === load from VRF ===
-                element_length = self.dispatcher.vl - self.dispatcher.vstart
-                self.vrf.vset(self.dispatcher.SEW, self.dispatcher.LMUL)
-                temp_vector = self.vrf.take(arg[1], self.dispatcher.vstart, element_length)
-
-                # === store to maine memory ===
-                self.lsu.AxiAddrSet(self.dispatcher.vl, self.dispatcher.vstart, self.dispatcher.SEW)
-                self.lsu.StoreMemory(arg[2], 1, temp_vector) # set unit stride
+            execute = self.EXECUTE.get(inst_type)
+            execute and execute(self, inst)
+            self.timing is not None and self.timing.issue(inst, inst_type)
+            level >= TRACE_INST and inst_type in MEM_OPS and print(f"AXI -> {self.lsu.AxiReport(self.lsu.axi)}")
+            level >= TRACE_INST and cache and inst_type in MEM_OPS and print(f"Cache -> {self.cache.report(self.cache.last)}")
+            level >= TRACE_INST and dram and inst_type in MEM_OPS and print(f"DRAM -> {self.dram.timing.report(self.dram.timing.last)}")
             
             # === set instruction break point ===
             # if inst_number == 5: break
 
+        level >= TRACE_SUMMARY and print(f"Run {len(inst_list)} instructions -> {self.tracer.summary(since)}")
+        level >= TRACE_SUMMARY and self.timing is not None and print(f"Timing -> {self.timing.report()}")
+        level >= TRACE_SUMMARY and print(f"AXI -> {self.lsu.AxiReport({k: v - axi[k] for k, v in self.lsu.total_axi.items()})}")
+        level >= TRACE_SUMMARY and cache and print(f"Cache -> {self.cache.report({k: v - cache[k] for k, v in self.cache.total.items()})}")
+        level >= TRACE_SUMMARY and sram and print(f"SRAM -> {self.sram.report({k: v - sram[k] for k, v in self.sram.total.items()})}")
+        level >= TRACE_SUMMARY and dram and print(f"DRAM -> {self.dram.timing.report({k: v - dram[k] for k, v in self.dram.timing.total.items()})}")
+
 
 
 if __name__ == "__main__":
@@ -87,12 +307,12 @@ if __name__ == "__main__":
     with open(terminal_output_path, "w", encoding="utf-8") as f:
         with redirect_stdout(f):
             # === Load Matrix Insturction ===
-            loadMatricInsst, loadMatricArg = instGen.CIM_Scatter_LS('load', 20, 5120, 160, DRAM_BASEADDR, 0)
-            sim.run(loadMatricInsst, loadMatricArg)
+            loadMatricInsst = instGen.CIM_Scatter_LS('load', 20, 5120, 160, DRAM_BASEADDR, 0)
+            sim.run(loadMatricInsst)
 
             # === Store Matrix Insturction ===
-            storeMatricInsst, storeMatricArg = instGen.CIM_Scatter_LS('store', 20, 160, 160, DRAM_BASEADDR, 0)
-            sim.run(storeMatricInsst, storeMatricArg)
+            storeMatricInsst = instGen.CIM_Scatter_LS('store', 20, 160, 160, DRAM_BASEADDR, 0)
+            sim.run(storeMatricInsst)
 
 
     # === Print out the current VRF memory mapping ===
@@ -101,9 +321,7 @@ if __name__ == "__main__":
             sim.vrf.dumpVRF_data()
     print("VRF dump success")
 
-    # === Print out the current VRF memory mapping ===
-    with open(dram_output_path, "w", encoding="utf-8") as f:
-        with redirect_stdout(f):
-            sim.dram.dumpMem_data('debug')
+    # === Print out the current DRAM ===
+    sim.dram.dump(dram_output_path, 'debug')
     print("DRAM dump success")
     
\ No newline at end of file
@@ -0,0 +1,370 @@
+import numpy as np
+
+from main_memory import MEMORY
+
+# @ global variables
+CACHE_COUNTERS = ('lines', 'hits', 'misses', 'evictions', 'writebacks')
+SPM_COUNTERS   = ('requests', 'read_bytes', 'write_bytes')
+POLICIES       = ('lru', 'plru', 'fifo')
+
+
+class CACHE:
+    def __init__(self, Memory, Size=32768, LineBytes=64, Ways=4, Policy='lru', WriteBack=True, WriteAllocate=True, debug=False):
+        """
+        the set-associative cache between the LSU and the next level ("Memory", MEMORY or another CACHE)
+        NOTE:
+        (1) the cache keeps the tags only, the data always lives in the next level (the data calls are passed through),
+            so the cache changes the traffic and the counters of the next level, never the data
+        (2) each LSU request looks up all its lines in one pass per round, a round takes at most one line of each set,
+            so the lines of one set are served in order and the sets are served in parallel
+        (3) "Policy": 'lru' / 'plru' (tree pseudo-LRU, power-of-2 "Ways") / 'fifo', an invalid way is filled first
+        (4) "WriteBack" keeps the written lines dirty until they are evicted (write-through otherwise),
+            "WriteAllocate" fills the line on a write miss (the write goes around the cache otherwise)
+        (5) the fills, the write-backs and the write-through lines are one request of the next level,
+            "last" is the counters of the last request (one vector instruction), "total" is accrued since clear()
+        """
+        if Policy not in POLICIES:
+            raise ValueError(f"CACHE: unknown replacement policy {Policy}, use one of {POLICIES}")
+        if Size % (LineBytes * Ways) or Size < LineBytes * Ways:
+            raise ValueError(f"CACHE: size {Size} is not a multiple of LineBytes * Ways ({LineBytes * Ways})")
+        if Policy == 'plru' and Ways & (Ways - 1):
+            raise ValueError(f"CACHE: plru needs a power-of-2 number of ways, not {Ways}")
+
+        self.memory = Memory  # bind the next level
+        self.debug  = debug
+
+        # === parameters ===
+        self.Size          = Size
+        self.LineBytes     = LineBytes
+        self.Ways          = Ways
+        self.Sets          = Size // (LineBytes * Ways)
+        self.Policy        = Policy
+        self.WriteBack     = WriteBack
+        self.WriteAllocate = WriteAllocate
+        self.clear()
+
+    def clear(self):
+        self.tags   = np.full((self.Sets, self.Ways), -1, dtype=np.int64)              # (set, way) -> tag, -1 is invalid
+        self.dirty  = np.zeros((self.Sets, self.Ways), dtype=bool)                     # (set, way) -> dirty
+        self.stamp  = np.zeros((self.Sets, self.Ways), dtype=np.int64)                 # (set, way) -> last use (lru) / fill (fifo)
+        self.plru   = np.zeros((self.Sets, max(self.Ways - 1, 0)), dtype=np.int8)      # (set, node) -> 1 points to the right half
+        self.clock  = 0
+        self.last   = dict.fromkeys(CACHE_COUNTERS, 0)
+        self.total  = dict.fromkeys(CACHE_COUNTERS, 0)
+
+    def __getattr__(self, name):
+        # the data calls and the other attributes are the next level's
+        if name == 'memory':
+            raise AttributeError(name)
+        return getattr(self.memory, name)
+
+    # === replacement ===
+    def victim(self, sets):
+        """
+        the function to get the way to fill of each set (the sets are distinct)
+        """
+        invalid = self.tags[sets] < 0
+        if self.Policy == 'plru':
+            node = np.zeros((len(sets)), dtype=np.int64)
+            for _ in range(int(np.log2(self.Ways))):
+                node = 2 * node + 1 + self.plru[sets, node]
+            way = node - (self.Ways - 1)
+        else:
+            way = self.stamp[sets].argmin(axis=1)
+        return np.where(invalid.any(axis=1), invalid.argmax(axis=1), way)
+
+    def touch(self, sets, ways, filled):
+        """
+        the function to update the replacement state of the used ways (the sets are distinct)
+        """
+        if self.Policy == 'lru':
+            self.stamp[sets, ways] = self.clock
+        elif self.Policy == 'fifo':
+            self.stamp[sets[filled], ways[filled]] = self.clock
+        else:
+            node = ways + self.Ways - 1
+            for _ in range(int(np.log2(self.Ways))):
+                parent = (node - 1) // 2
+                self.plru[sets, parent] = node == 2 * parent + 1  # the left half is used, point to the right half
+                node = parent
+
+    # === lookup ===
+    def lookup(self, lines, write=False):
+        """
+        the function to look up the lines (line index, in issue order) of one request
+        will return (the lines read from the next level, the lines written to the next level)
+        """
+        lines = np.asarray(lines, dtype=np.int64).reshape(-1)
+        _, first = np.unique(lines, return_index=True)
+        lines = lines[np.sort(first)]  # a repeated line is a hit of the first one
+        sets  = lines % self.Sets
+        tags  = lines // self.Sets
+
+        # === the rank of each line in its set, one round serves one line of each set ===
+        order  = np.argsort(sets, kind='stable')
+        start  = np.ones((len(order)), dtype=bool)
+        start[1:] = sets[order][1:] != sets[order][:-1]
+        rank   = np.empty((len(order)), dtype=np.int64)
+        rank[order] = np.arange(len(order)) - np.maximum.accumulate(np.where(start, np.arange(len(order)), 0))
+
+        counters = dict.fromkeys(CACHE_COUNTERS, 0)
+        fills, writes = [], []
+        for r in range(int(rank.max()) + 1 if len(rank) else 0):
+            self.clock += 1
+            index = np.flatnonzero(rank == r)
+            s, t  = sets[index], tags[index]
+            match = self.tags[s] == t[:, None]
+            hit   = match.any(axis=1)
+            way   = np.where(hit, match.argmax(axis=1), self.victim(s))
+            fill  = ~hit & (self.WriteAllocate or not write)
+
+            # === evict the victims, the dirty ones are written back ===
+            evict = fill & (self.tags[s, way] >= 0)
+            back  = evict & self.dirty[s, way]
+            writes.append(self.tags[s[back], way[back]] * self.Sets + s[back])
+
+            # === fill the missed lines ===
+            self.tags[s[fill], way[fill]]  = t[fill]
+            self.dirty[s[fill], way[fill]] = False
+            fills.append(lines[index[fill]])
+            kept = hit | fill
+            self.touch(s[kept], way[kept], fill[kept])
+
+            # === write: dirty (write-back) or through to the next level ===
+            if write and self.WriteBack:
+                self.dirty[s[kept], way[kept]] = True
+                writes.append(lines[index[~kept]])
+            elif write:
+                writes.append(lines[index])
+
+            counters['hits']       += int(np.count_nonzero(hit))
+            counters['evictions']  += int(np.count_nonzero(evict))
+            counters['writebacks'] += int(np.count_nonzero(back))
+
+        counters.update(lines=len(lines), misses=len(lines) - counters['hits'])
+        self.last  = counters
+        self.total = {counter: self.total[counter] + counters[counter] for counter in CACHE_COUNTERS}
+        self.debug and print(f"CACHE {'write' if write else 'read'} {self.last}")
+        return (np.concatenate(fills) if fills else np.zeros((0), dtype=np.int64),
+                np.concatenate(writes) if writes else np.zeros((0), dtype=np.int64))
+
+    def forward(self, fills, writes, write=False):
+        """
+        the function to send the fills and the write-backs (line index) to the next level as one request
+        """
+        lines = np.concatenate([fills, writes])
+        beat  = self.LineBytes if self.memory.timing is None else self.memory.timing.BeatBytes
+        addrs = (lines[:, None] * self.LineBytes + np.arange(0, self.LineBytes, beat)).reshape(-1)
+        return self.memory.account(addrs, len(lines) * self.LineBytes, write)
+
+    def writeback(self):
+        """
+        the function to write all the dirty lines back to the next level (the lines stay valid)
+        will return the number of written lines
+        NOTE it only accounts the traffic, flush() is still the next level's (e.g. sync the DRAM image file)
+        """
+        sets, ways = np.nonzero(self.dirty)
+        self.forward(np.zeros((0), dtype=np.int64), self.tags[sets, ways] * self.Sets + sets, write=True)
+        self.dirty[:] = False
+        self.total['writebacks'] += len(sets)
+        return len(sets)
+
+    # === the accounting calls of the LSU ===
+    def account(self, byte_addrs, nbytes=None, write=False):
+        """
+        the function to account one LSU request (byte_addrs is byte addr array in issue order)
+        will return the DRAM counters of the request like MEMORY.account (None if the DRAM timing is off),
+        the cache counters of the request are "last"
+        """
+        return self.forward(*self.lookup(np.asarray(byte_addrs, dtype=np.int64) // self.LineBytes, write), write)
+
+    def account_range(self, start_addr, nbytes, write=False):
+        """
+        the function to account one contiguous request (start_addr is byte addr)
+        """
+        lines = np.arange(start_addr // self.LineBytes, (start_addr + nbytes - 1) // self.LineBytes + 1) if nbytes > 0 else []
+        return self.forward(*self.lookup(lines, write), write)
+
+    def report(self, counters=None):
+        """
+        the function to get the counters with the hit rate
+        """
+        counters = self.total if counters is None else counters
+        return {**counters, 'hit_rate': counters['hits'] / max(counters['lines'], 1)}
+
+
+class SCRATCHPAD:
+    def __init__(self, Memory, BASEADDR, Depth, DataWidth=64, debug=False):
+        """
+        the explicitly addressed scratchpad (e.g. UNI_SRAM of the macro ops) in front of the next level ("Memory")
+        NOTE:
+        (1) the bytes in [BASEADDR, BASEADDR + Depth * DataWidth/8) are served by the scratchpad,
+            it is never cached and never goes to the DRAM, the other bytes are passed to the next level
+        (2) one request can mix both regions, it is split by one address mask
+        (3) "last" is the counters of the last request, "total" is accrued since clear()
+        (4) the addressed data calls (take_data, store_data, take64bData, the batch calls, dump) are routed by region,
+            a range across the scratchpad boundary raises. init_byte_to_mem and dumpMem_data have no address,
+            they are the next level's (use "sram" for the scratchpad itself)
+        """
+        self.memory = Memory  # bind the next level
+        self.sram   = MEMORY(BASEADDR=BASEADDR, DataWidth=DataWidth, Depth=Depth)
+        self.debug  = debug
+
+        # === parameters ===
+        self.BASEADDR = BASEADDR
+        self.ENDADDR  = BASEADDR + Depth * DataWidth // 8
+        self.clear()
+
+    def clear(self):
+        self.last  = dict.fromkeys(SPM_COUNTERS, 0)
+        self.total = dict.fromkeys(SPM_COUNTERS, 0)
+
+    def __getattr__(self, name):
+        # the other attributes are the next level's
+        if name == 'memory':
+            raise AttributeError(name)
+        return getattr(self.memory, name)
+
+    def contains(self, byte_addrs):
+        byte_addrs = np.asarray(byte_addrs, dtype=np.int64)
+        return (byte_addrs >= self.BASEADDR) & (byte_addrs < self.ENDADDR)
+
+    def region(self, start_addr, nbytes):
+        """
+        the function to get where a byte range is: 'sram', 'next' or 'both'
+        """
+        if nbytes <= 0 or start_addr + nbytes <= self.BASEADDR or start_addr >= self.ENDADDR:
+            return 'next'
+        return 'sram' if self.BASEADDR <= start_addr and start_addr + nbytes <= self.ENDADDR else 'both'
+
+    def level(self, start_addr, nbytes):
+        """
+        the function to get the level which serves a byte range, the scratchpad or the next level
+        """
+        if self.region(start_addr, max(nbytes, 1)) == 'both':
+            raise ValueError(f"SCRATCHPAD: byte range 0x{start_addr:X} (+{nbytes} bytes) crosses the scratchpad boundary")
+        return self.sram if self.region(start_addr, max(nbytes, 1)) == 'sram' else self.memory
+
+    def levels(self, start_addrs, nbytes):
+        """
+        the function to get the level which serves all the byte ranges of a batch call
+        """
+        starts = np.asarray(start_addrs, dtype=np.int64).reshape(-1)
+        levels = {id(level): level for level in map(self.level, starts.tolist(), np.broadcast_to(nbytes, starts.shape).tolist())}
+        if len(levels) > 1:
+            raise ValueError("SCRATCHPAD: a batch call can't mix the scratchpad and the next level")
+        return next(iter(levels.values()), self.memory)
+
+    # === data ===
+    def take64bData(self, addr):
+        return self.level(addr, 8).take64bData(addr)
+
+    def store64bData(self, addr, byte_strb, data):
+        return self.level(addr, 8).store64bData(addr, byte_strb, data)
+
+    def take_data(self, start_addr, size, length):
+        return self.level(start_addr, length * size // 8).take_data(start_addr, size, length)
+
+    def store_data(self, start_addr, size, vector):
+        return self.level(start_addr, len(vector) * size // 8).store_data(start_addr, size, vector)
+
+    def take_data_batch(self, start_addrs, size, lengths):
+        return self.levels(start_addrs, np.asarray(lengths) * size // 8).take_data_batch(start_addrs, size, lengths)
+
+    def store_data_batch(self, start_addrs, size, vectors):
+        nbytes = [len(vector) * size // 8 for vector in vectors]
+        return self.levels(start_addrs, nbytes).store_data_batch(start_addrs, size, vectors)
+
+    def dump(self, file, mode='debug', start_addr=None, end_addr=None, **options):
+        level = self.sram if start_addr is not None and self.contains(start_addr) else self.memory
+        return level.dump(file, mode, start_addr, end_addr, **options)
+
+    def take_bytes(self, start_addr, nbytes):
+        where = self.region(start_addr, nbytes)
+        if where == 'both':
+            return self.take_scattered(np.arange(start_addr, start_addr + nbytes))
+        return (self.sram if where == 'sram' else self.memory).take_bytes(start_addr, nbytes)
+
+    def store_bytes(self, start_addr, byte_data):
+        byte_data = np.asarray(byte_data, dtype=np.uint8).reshape(-1)
+        where     = self.region(start_addr, len(byte_data))
+        if where == 'both':
+            return self.store_scattered(np.arange(start_addr, start_addr + len(byte_data)), byte_data)
+        (self.sram if where == 'sram' else self.memory).store_bytes(start_addr, byte_data)
+
+    def take_scattered(self, byte_addrs):
+        byte_addrs = np.asarray(byte_addrs, dtype=np.int64)
+        inside     = self.contains(byte_addrs)
+        byte_data  = np.empty((len(byte_addrs)), dtype=np.uint8)
+        byte_data[inside]  = self.sram.take_scattered(byte_addrs[inside])
+        byte_data[~inside] = self.memory.take_scattered(byte_addrs[~inside])
+        return byte_data
+
+    def store_scattered(self, byte_addrs, byte_data):
+        byte_addrs = np.asarray(byte_addrs, dtype=np.int64)
+        byte_data  = np.asarray(byte_data, dtype=np.uint8)
+        inside     = self.contains(byte_addrs)
+        self.sram.store_scattered(byte_addrs[inside], byte_data[inside])
+        self.memory.store_scattered(byte_addrs[~inside], byte_data[~inside])
+
+    def store_beats(self, beat_addrs, byte_strbs, beat_data):
+        beat_addrs = np.asarray(beat_addrs, dtype=np.int64)
+        inside     = self.contains(beat_addrs)
+        byte_strbs, beat_data = np.asarray(byte_strbs, dtype=bool), np.asarray(beat_data, dtype=np.uint8)
+        self.sram.store_beats(beat_addrs[inside], byte_strbs[inside], beat_data[inside])
+        self.memory.store_beats(beat_addrs[~inside], byte_strbs[~inside], beat_data[~inside])
+
+    # === the accounting calls of the LSU ===
+    def account(self, byte_addrs, nbytes=None, write=False):
+        """
+        the function to account one LSU request (byte_addrs is byte addr array in issue order)
+        NOTE the scratchpad share of "nbytes" is the share of its addresses,
+             the return is the DRAM counters like MEMORY.account, the scratchpad counters of the request are "last"
+        """
+        byte_addrs = np.asarray(byte_addrs, dtype=np.int64).reshape(-1)
+        inside     = self.contains(byte_addrs)
+        nbytes     = len(byte_addrs) if nbytes is None else nbytes
+        spm_bytes  = int(round(nbytes * np.count_nonzero(inside) / max(len(byte_addrs), 1)))
+        self.count(spm_bytes, write)
+        return self.memory.account(byte_addrs[~inside], nbytes - spm_bytes, write)
+
+    def account_range(self, start_addr, nbytes, write=False):
+        """
+        the function to account one contiguous request (start_addr is byte addr)
+        """
+        lo, hi = max(start_addr, self.BASEADDR), min(start_addr + nbytes, self.ENDADDR)
+        if hi <= lo:
+            self.count(0, write)
+            return self.memory.account_range(start_addr, nbytes, write)
+        if self.region(start_addr, nbytes) == 'both':
+            return self.account(np.arange(start_addr, start_addr + nbytes), nbytes, write)
+        self.count(nbytes, write)
+        return self.memory.account_range(start_addr, 0, write)  # nothing goes to the next level
+
+    def count(self, nbytes, write):
+        self.last = {'requests': int(nbytes > 0), 'read_bytes': 0 if write else nbytes, 'write_bytes': nbytes if write else 0}
+        self.total = {counter: self.total[counter] + self.last[counter] for counter in SPM_COUNTERS}
+
+    def report(self, counters=None):
+        return dict(self.total if counters is None else counters)
+
+
+if __name__ == "__main__":
+    print("===== CACHE testbench =====")
+    print("version: 2025.06.21")
+
+    from VPU_simulator import VPU_simulator, DRAM_BASEADDR, SRAM_BASEADDR
+    from vinst import vset, vle, vse, vlse
+    from tracer import TRACE_OFF
+
+    # === the same strided kernel on the policies, then DRAM -> UNI_SRAM (see pattern/macro_op0.log) ===
+    program = [vset(320, 32, 4)] + [vlse(32, 4, DRAM_BASEADDR + 4 * column, 5184) for column in range(8)]  # 5 lines per set
+    for policy in POLICIES:
+        sim = VPU_simulator(DramDepth=65536 * 8, TraceLevel=TRACE_OFF, Timing=True, Cache=dict(Size=16384, Ways=4, Policy=policy))
+        sim.run(program)
+        print(f"{policy:4}:", sim.cache.report(), "DRAM:", sim.dram.timing.report()['cycles'])
+
+    sim = VPU_simulator(DramDepth=65536, TraceLevel=TRACE_OFF, Timing=True, Cache=True, SramDepth=4096)
+    sim.run([vset(40, 32, 1)] + [op for macro in range(8) for op in
+             (vle(32, 1, DRAM_BASEADDR + 5120 * macro), vse(32, 1, SRAM_BASEADDR + 160 * macro))])
+    print("cache:", sim.cache.report(), "sram:", sim.sram.report())
@@ -1,3 +1,12 @@
+import numpy as np
+
+from vinst import VInst
+from valu import VALU_OPS
+from vmfpu import VMFPU_OPS
+from vrdu import VRDU_OPS
+from masku import MASKU_OPS
+from sldu import SLDU_OPS
+
 # Global parameter
 VLEN = 4096 # bit
 ELEN = 64 # bit
@@ -9,6 +18,247 @@ vs = 0 #TODO
 # In normal, EEW = SEW, EMUL = LMUL 
 
 
+# === RVV binary encode tables ===
+# major opcode -> opcode class
+OPCODE_CLASS = {
+    0b1010111: 'OPV',
+    0b0000111: 'load',   # LOAD-FP
+    0b0100111: 'store',  # STORE-FP
+}
+
+# OPV funct3 -> operand form
+FUNCT3_FORM = {
+    0b000: 'OPIVV',
+    0b001: 'OPFVV',
+    0b010: 'OPMVV',
+    0b011: 'OPIVI',
+    0b100: 'OPIVX',
+    0b101: 'OPFVF',
+    0b110: 'OPMVX',
+    0b111: 'OPCFG',
+}
+
+# load/store width -> EEW, the other widths are scalar floating-point load/store
+WIDTH_EEW = {0b000: 8, 0b101: 16, 0b110: 32, 0b111: 64}
+
+# mop -> [load, store] mnemonic
+MOP_NAME = {
+    0b00: ['vle',    'vse'],     # unit-stride, see LUMOP_NAME/SUMOP_NAME
+    0b01: ['vluxei', 'vsuxei'],  # indexed-unordered
+    0b10: ['vlse',   'vsse'],    # strided
+    0b11: ['vloxei', 'vsoxei'],  # indexed-ordered
+}
+LUMOP_NAME = {0b00000: 'vle', 0b01000: 'vlre', 0b01011: 'vlm', 0b10000: 'vleff'}
+SUMOP_NAME = {0b00000: 'vse', 0b01000: 'vsr',  0b01011: 'vsm'}
+
+# mnemonic -> segment mnemonic (nf != 0), the field number is NFIELDS = nf + 1
+SEGMENT_NAME = {'vle': 'vlseg', 'vse': 'vsseg', 'vlse': 'vlsseg', 'vsse': 'vssseg',
+                'vluxei': 'vluxseg', 'vloxei': 'vloxseg', 'vsuxei': 'vsuxseg', 'vsoxei': 'vsoxseg'}
+
+# load/store ops of the LSU, the EEW of unit-stride/strided is the data EEW, the EEW of indexed is the index EEW
+STRIDE_OPS = ('vle', 'vse', 'vlse', 'vsse', 'vlseg', 'vsseg', 'vlsseg', 'vssseg')
+INDEX_OPS  = ('vluxei', 'vloxei', 'vsuxei', 'vsoxei', 'vluxseg', 'vloxseg', 'vsuxseg', 'vsoxseg')
+
+# funct6 -> mnemonic
+# NOTE an entry can be a dict, first keyed by the operand form, then keyed by the vs1 field (unary groups)
+OPI_FUNCT6 = {
+    0b000000: 'vadd',     0b000010: 'vsub',     0b000011: 'vrsub',
+    0b000100: 'vminu',    0b000101: 'vmin',     0b000110: 'vmaxu',    0b000111: 'vmax',
+    0b001001: 'vand',     0b001010: 'vor',      0b001011: 'vxor',
+    0b001100: 'vrgather',
+    0b001110: {'OPIVV': 'vrgatherei16', 'OPIVX': 'vslideup',   'OPIVI': 'vslideup'},
+    0b001111: {'OPIVX': 'vslidedown',   'OPIVI': 'vslidedown'},
+    0b010000: 'vadc',     0b010001: 'vmadc',    0b010010: 'vsbc',     0b010011: 'vmsbc',
+    0b010111: 'vmerge',   # vm=1 -> vmv.v
+    0b011000: 'vmseq',    0b011001: 'vmsne',    0b011010: 'vmsltu',   0b011011: 'vmslt',
+    0b011100: 'vmsleu',   0b011101: 'vmsle',    0b011110: 'vmsgtu',   0b011111: 'vmsgt',
+    0b100000: 'vsaddu',   0b100001: 'vsadd',    0b100010: 'vssubu',   0b100011: 'vssub',
+    0b100101: 'vsll',
+    0b100111: {'OPIVV': 'vsmul',        'OPIVX': 'vsmul',      'OPIVI': 'vmvnr'},
+    0b101000: 'vsrl',     0b101001: 'vsra',     0b101010: 'vssrl',    0b101011: 'vssra',
+    0b101100: 'vnsrl',    0b101101: 'vnsra',    0b101110: 'vnclipu',  0b101111: 'vnclip',
+    0b110000: {'OPIVV': 'vwredsumu'},
+    0b110001: {'OPIVV': 'vwredsum'},
+}
+
+OPM_FUNCT6 = {
+    0b000000: 'vredsum',  0b000001: 'vredand',  0b000010: 'vredor',   0b000011: 'vredxor',
+    0b000100: 'vredminu', 0b000101: 'vredmin',  0b000110: 'vredmaxu', 0b000111: 'vredmax',
+    0b001000: 'vaaddu',   0b001001: 'vaadd',    0b001010: 'vasubu',   0b001011: 'vasub',
+    0b001110: {'OPMVX': 'vslide1up'},
+    0b001111: {'OPMVX': 'vslide1down'},
+    0b010000: {'OPMVV': {0b00000: 'vmv.x.s', 0b10000: 'vcpop', 0b10001: 'vfirst'},     # VWXUNARY0
+               'OPMVX': 'vmv.s.x'},                                                    # VRXUNARY0
+    0b010010: {'OPMVV': {0b00010: 'vzext.vf8', 0b00011: 'vsext.vf8', 0b00100: 'vzext.vf4',
+                         0b00101: 'vsext.vf4', 0b00110: 'vzext.vf2', 0b00111: 'vsext.vf2'}},  # VXUNARY0
+    0b010100: {'OPMVV': {0b00001: 'vmsbf', 0b00010: 'vmsof', 0b00011: 'vmsif',
+                         0b10000: 'viota', 0b10001: 'vid'}},                                  # VMUNARY0
+    0b010111: {'OPMVV': 'vcompress'},
+    0b011000: 'vmandn',   0b011001: 'vmand',    0b011010: 'vmor',     0b011011: 'vmxor',
+    0b011100: 'vmorn',    0b011101: 'vmnand',   0b011110: 'vmnor',    0b011111: 'vmxnor',
+    0b100000: 'vdivu',    0b100001: 'vdiv',     0b100010: 'vremu',    0b100011: 'vrem',
+    0b100100: 'vmulhu',   0b100101: 'vmul',     0b100110: 'vmulhsu',  0b100111: 'vmulh',
+    0b101001: 'vmadd',    0b101011: 'vnmsub',   0b101101: 'vmacc',    0b101111: 'vnmsac',
+    0b110000: 'vwaddu',   0b110001: 'vwadd',    0b110010: 'vwsubu',   0b110011: 'vwsub',
+    0b110100: 'vwaddu.w', 0b110101: 'vwadd.w',  0b110110: 'vwsubu.w', 0b110111: 'vwsub.w',
+    0b111000: 'vwmulu',   0b111010: 'vwmulsu',  0b111011: 'vwmul',
+    0b111100: 'vwmaccu',  0b111101: 'vwmacc',   0b111110: {'OPMVX': 'vwmaccus'}, 0b111111: 'vwmaccsu',
+}
+
+OPF_FUNCT6 = {
+    0b000000: 'vfadd',    0b000001: {'OPFVV': 'vfredusum'},
+    0b000010: 'vfsub',    0b000011: {'OPFVV': 'vfredosum'},
+    0b000100: 'vfmin',    0b000101: {'OPFVV': 'vfredmin'},
+    0b000110: 'vfmax',    0b000111: {'OPFVV': 'vfredmax'},
+    0b001000: 'vfsgnj',   0b001001: 'vfsgnjn',  0b001010: 'vfsgnjx',
+    0b001110: {'OPFVF': 'vfslide1up'},
+    0b001111: {'OPFVF': 'vfslide1down'},
+    0b010000: {'OPFVV': {0b00000: 'vfmv.f.s'}, 'OPFVF': 'vfmv.s.f'},                    # VWFUNARY0 / VRFUNARY0
+    0b010010: {'OPFVV': {0b00000: 'vfcvt.xu.f.v',      0b00001: 'vfcvt.x.f.v',
+                         0b00010: 'vfcvt.f.xu.v',      0b00011: 'vfcvt.f.x.v',
+                         0b00110: 'vfcvt.rtz.xu.f.v',  0b00111: 'vfcvt.rtz.x.f.v',
+                         0b01000: 'vfwcvt.xu.f.v',     0b01001: 'vfwcvt.x.f.v',
+                         0b01010: 'vfwcvt.f.xu.v',     0b01011: 'vfwcvt.f.x.v',
+                         0b01100: 'vfwcvt.f.f.v',
+                         0b01110: 'vfwcvt.rtz.xu.f.v', 0b01111: 'vfwcvt.rtz.x.f.v',
+                         0b10000: 'vfncvt.xu.f.w',     0b10001: 'vfncvt.x.f.w',
+                         0b10010: 'vfncvt.f.xu.w',     0b10011: 'vfncvt.f.x.w',
+                         0b10100: 'vfncvt.f.f.w',      0b10101: 'vfncvt.rod.f.f.w',
+                         0b10110: 'vfncvt.rtz.xu.f.w', 0b10111: 'vfncvt.rtz.x.f.w'}},  # VFUNARY0
+    0b010011: {'OPFVV': {0b00000: 'vfsqrt', 0b00100: 'vfrsqrt7', 0b00101: 'vfrec7', 0b10000: 'vfclass'}},  # VFUNARY1
+    0b010111: {'OPFVF': 'vfmerge'},  # vm=1 -> vfmv.v.f
+    0b011000: 'vmfeq',    0b011001: 'vmfle',    0b011011: 'vmflt',    0b011100: 'vmfne',
+    0b011101: {'OPFVF': 'vmfgt'},
+    0b011111: {'OPFVF': 'vmfge'},
+    0b100000: 'vfdiv',    0b100001: {'OPFVF': 'vfrdiv'},
+    0b100100: 'vfmul',    0b100111: {'OPFVF': 'vfrsub'},
+    0b101000: 'vfmadd',   0b101001: 'vfnmadd',  0b101010: 'vfmsub',   0b101011: 'vfnmsub',
+    0b101100: 'vfmacc',   0b101101: 'vfnmacc',  0b101110: 'vfmsac',   0b101111: 'vfnmsac',
+    0b110000: 'vfwadd',   0b110001: {'OPFVV': 'vfwredusum'},
+    0b110010: 'vfwsub',   0b110011: {'OPFVV': 'vfwredosum'},
+    0b110100: 'vfwadd.w', 0b110110: 'vfwsub.w',
+    0b111000: 'vfwmul',
+    0b111100: 'vfwmacc',  0b111101: 'vfwnmacc', 0b111110: 'vfwmsac',  0b111111: 'vfwnmsac',
+}
+
+FORM_FUNCT6 = {
+    'OPIVV': OPI_FUNCT6, 'OPIVX': OPI_FUNCT6, 'OPIVI': OPI_FUNCT6,
+    'OPMVV': OPM_FUNCT6, 'OPMVX': OPM_FUNCT6,
+    'OPFVV': OPF_FUNCT6, 'OPFVF': OPF_FUNCT6,
+}
+
+# the unmasked (vm=1) encoding is a move
+VM_ALIAS = {'vmerge': 'vmv.v', 'vfmerge': 'vfmv.v.f'}
+
+# OPV operand form -> VInst form
+ARITH_FORM = {'OPIVV': 'vv', 'OPMVV': 'vv', 'OPFVV': 'vv', 'OPIVX': 'vx', 'OPMVX': 'vx', 'OPIVI': 'vi', 'OPFVF': 'vf'}
+
+# instruction word -> DecodedOp, shared by all dispatchers (the decode is stateless)
+DECODE_CACHE = {}
+
+
+
+class DecodedOp:
+    """
+    the compact record of one decoded RVV instruction word
+    NOTE:
+    (1) "cls" is the opcode class: 'vset' / 'load' / 'store' / the OPV operand form 'OPIVV', 'OPMVX', ...
+    (2) "name" is the mnemonic, None for a reserved / unsupported encoding
+    (3) the raw fields are always filled, "vs1" and "rs1" are the same [19:15] field,
+        "vs2" is also the rs2 (stride / vtype register) and the lumop / sumop field
+    (4) "imm": sign-extended simm5 of OPIVI, uimm(AVL) of vsetivli
+    (5) "width": EEW of load/store in bit, "vtype": vtypei of vsetvli / vsetivli
+    (6) the records are shared by the decode cache, they must be read-only
+    """
+    __slots__ = ('inst', 'cls', 'name', 'opcode', 'funct6', 'funct3', 'vd', 'vs1', 'vs2', 'rs1',
+                 'vm', 'mop', 'nf', 'mew', 'width', 'vtype', 'imm')
+
+    def __init__(self, inst):
+        self.inst   = inst
+        self.cls    = 'unknown'
+        self.name   = None
+        self.opcode = inst & 0b1111111
+        self.vd     = inst >> 7  & 0b11111
+        self.funct3 = inst >> 12 & 0b111
+        self.vs1    = inst >> 15 & 0b11111
+        self.rs1    = self.vs1
+        self.vs2    = inst >> 20 & 0b11111
+        self.vm     = inst >> 25 & 0b1
+        self.funct6 = inst >> 26 & 0b111111
+        self.mop    = inst >> 26 & 0b11
+        self.mew    = inst >> 28 & 0b1
+        self.nf     = inst >> 29 & 0b111
+        self.width  = None
+        self.vtype  = None
+        self.imm    = None
+
+    def __repr__(self):
+        if self.name is None:
+            return f"unknown(0x{self.inst:08x})"
+        mask = "" if self.vm else ", v0.t"
+        if self.cls == 'vset':
+            avl   = self.imm if self.name == 'vsetivli' else f"x{self.rs1}"
+            vtype = f"x{self.vs2}" if self.vtype is None else f"0x{self.vtype:x}"
+            return f"{self.name} x{self.vd}, {avl}, {vtype}"
+        if self.cls in ('load', 'store'):
+            operand = {0b01: f", v{self.vs2}", 0b10: f", x{self.vs2}", 0b11: f", v{self.vs2}"}.get(self.mop, "")
+            mnemonic = {'vleff': f"vle{self.width}ff", 'vlre': f"vl{self.nf + 1}re{self.width}",
+                        'vsr': f"vs{self.nf + 1}r", 'vlm': "vlm", 'vsm': "vsm"}.get(self.name, f"{self.name}{self.width}")
+            if self.name in SEGMENT_NAME.values():
+                mnemonic = f"{self.name}{self.nf + 1}{'ei' if self.mop & 0b01 else 'e'}{self.width}"
+            return f"{mnemonic}.v v{self.vd}, (x{self.rs1}){operand}{mask}"
+        src = {'X': f"x{self.rs1}", 'F': f"f{self.rs1}"}.get(self.cls[-1], f"v{self.vs1}")
+        src = self.imm if self.cls == 'OPIVI' else src
+        return f"{self.name} v{self.vd}, v{self.vs2}, {src}{mask}"
+
+def decode_vset(op):
+    """
+    vsetvli / vsetivli / vsetvl, the OPCFG form of OPV
+    """
+    op.cls = 'vset'
+    inst = op.inst
+    if inst >> 31 == 0b0:
+        op.name  = 'vsetvli'
+        op.vtype = inst >> 20 & 0b11111111111
+    elif inst >> 30 == 0b11:
+        op.name  = 'vsetivli'
+        op.vtype = inst >> 20 & 0b1111111111
+        op.imm   = op.rs1
+    elif inst >> 25 == 0b1000000:
+        op.name  = 'vsetvl'
+
+def decode_opv(op):
+    form = FUNCT3_FORM[op.funct3]
+    if form == 'OPCFG':
+        return decode_vset(op)
+
+    op.cls = form
+    name = FORM_FUNCT6[form].get(op.funct6)
+    if type(name) is dict: name = name.get(form)    # operand form dependent
+    if type(name) is dict: name = name.get(op.vs1)  # unary group, vs1 is the sub-opcode
+    op.name = VM_ALIAS.get(name, name) if op.vm else name
+    if form == 'OPIVI':
+        op.imm = op.vs1 - 32 if op.vs1 & 0b10000 else op.vs1
+
+def decode_ldst(op, store):
+    op.cls   = 'store' if store else 'load'
+    op.width = WIDTH_EEW.get(op.funct3)
+    if op.width is None or op.mew:  # scalar floating-point load/store, or reserved mew
+        return
+    if op.mop == 0b00:
+        op.name = (SUMOP_NAME if store else LUMOP_NAME).get(op.vs2)
+    else:
+        op.name = MOP_NAME[op.mop][store]
+    if op.nf:
+        op.name = SEGMENT_NAME.get(op.name, op.name)
+
+OPCODE_DECODER = {
+    0b1010111: decode_opv,
+    0b0000111: lambda op: decode_ldst(op, False),
+    0b0100111: lambda op: decode_ldst(op, True),
+}
+
+
 
 class DISPATCHER:
     def __init__(self, debug=False):
@@ -20,19 +270,27 @@ class DISPATCHER:
         self.LMUL       = 1
         self.SEW        = 8
         self.vd         = 0
-        self.scalar_imm = 0   # TODO a scalar regfile with 32 index
+        self.scalar_imm = 0
+        self.xreg       = [0] * 32   # scalar regfile, x0 is hardwired to 0
+        self.freg       = [0.0] * 32 # scalar floating-point regfile
 
         #  === CSRs ===
         self.vstart  = 0
         self.vl      = 0
         self.vtype   = 0
+        self.vta     = 0
+        self.vma     = 0
+        self.frm     = 0  # floating-point rounding mode (RNE)
+        self.fflags  = 0  # floating-point accrued exception flags
+        self.vxrm    = 0  # fixed-point rounding mode (rnu)
+        self.vxsat   = 0  # fixed-point accrued saturation flag
         self.mstatus = 0 | vs << 9 #TODO
         
         # === RISC-V encode Mapper ===
         self.vlmul_map = {
             0: 1,
             1: 2,
-            2: 3,
+            2: 4,
             3: 8,
             5: 1/8,
             6: 1/4,
@@ -58,31 +316,60 @@ class DISPATCHER:
     def VLMAX(self):
         return VLEN * self.LMUL // self.SEW
     
-    def decodeCAPI(self, CAPI, arg):
+    # === VInst decoders, indexed by "VInst.op" ===
+    def _decode_vset(self, inst):    # [AVL, sew, lmul] -> vl, rd
+        self.set_vtype(inst.lmul, inst.sew, inst.ta, inst.ma)
+        self.vl = int(min(inst.rs1, self.VLMAX))
+        if inst.vd != 0:
+            self.xreg[inst.vd] = self.vl
+
+    def _decode_vstart(self, inst):  # [vstart]
+        self.vstart = inst.imm
+
+    def _decode_vmem(self, inst):    # [sew, vd, base_addr, stride]
+        self.SEW        = inst.sew
+        self.vd         = inst.vd
+        self.scalar_imm = inst.rs1
+
+    def _decode_vindex(self, inst):  # [index eew, vd, base_addr, vs2], the data is in SEW
+        self.vd         = inst.vd
+        self.scalar_imm = inst.rs1
+
+    def _decode_frm(self, inst):     # [frm]
+        self.frm = inst.imm
+
+    def _decode_vxrm(self, inst):    # [vxrm]
+        self.vxrm = inst.imm
+
+    def _decode_varith(self, inst):  # [vd, vs2, vs1/rs1/imm]
+        self.vd = inst.vd
+
+    INST_DECODER = {
+        'vset':   _decode_vset,
+        'vstart': _decode_vstart,
+        **dict.fromkeys(STRIDE_OPS, _decode_vmem),
+        **dict.fromkeys(INDEX_OPS, _decode_vindex),
+        'frm':    _decode_frm,
+        'vxrm':   _decode_vxrm,
+        **dict.fromkeys(VALU_OPS, _decode_varith),
+        **dict.fromkeys(VMFPU_OPS, _decode_varith),
+        **dict.fromkeys(VRDU_OPS, _decode_varith),
+        **dict.fromkeys(MASKU_OPS, _decode_varith),
+        **dict.fromkeys(SLDU_OPS, _decode_varith),
+    }
+
+    def decodeInst(self, inst):
         """
-        this function is used to decode C code API, which can run in RTL
+        this function is used to decode the typed instruction (VInst) and update the CSRs
+        NOTE the dispatch is one dict lookup of "inst.op", the returned type is "inst.op"
         """
-        type = 'None'
-
-        # === Check for specific instuction types
-        if "VSET" in CAPI:     # [vl, sew, lmul]
-            self.vl = arg[0]
-            self.set_vtype(arg[2], arg[1], 0, 0)
-            type = 'vset'
-        
-        elif "vstart" in CAPI: # [vstart]
-            self.vstart = arg[0]
-            type = 'vstart'
-            
-        elif "vle" in CAPI:   # [sew, vd, base_addr]  TODO decode uint stride, stride, index
-            self.SEW        = arg[0]
-            self.vd         = arg[1]
-            self.scalar_imm = arg[2]
-            type = 'vload_a'
-        else:
+        decoder = self.INST_DECODER.get(inst.op)
+        if decoder is None:
             print("-> Unknown instrtuction")
-        
-        return type
+            return 'None'
+
+        decoder(self, inst)
+        return inst.op
 
     def decode(self, instruction):
         # CSR: vstart, vxsat, vxrm, vcsr, vtype, vl, vlenb
@@ -168,131 +455,69 @@ class DISPATCHER:
         else:
             self.debug and print(f"Unknown instruction: {instruction}")
 
-    def Bin2Asm(self, inst):
-        
-        # vset
-        if (inst & 0b1111111 == 0b1010111):
-            # type
-            if inst >> 25 == 0b1000000: type = "vsetvl"
-            elif inst >> 30 == 0b11:    type = "vsetivli"
-            elif inst >> 31 == 0b0:     type = "vsetvli"
-            print( f"{type}")
-
-            # rs1 (AVL)
-            rs1 = inst >> 15 & 0b11111
-            print(f"rs1(AVL): {rs1}", end=", ")
-
-            # rs2 (vtype)
-            if type == "vsetvli":
-                rs2 = inst >> 20 & 0b11111111111
-                vlmul = rs2 & 0b111
-                vsew  = (rs2 >> 3) & 0b111
-                vta   = (rs2 >> 6) & 0b1
-                vma   = (rs2 >> 7) & 0b1
-                print(f"rs2(vtype) -> vma:{vma}, vta:{vta}, vsew:{vsew}. vlmul:{vlmul}" ,end=", ") # TODO: vsew, vlmul mapping
-            elif type == "vsetivli":
-                rs2 = inst >> 20 & 0b1111111111
-                vlmul = rs2 & 0b111
-                vsew  = (rs2 >> 3) & 0b111
-                vta   = (rs2 >> 6) & 0b1
-                vma   = (rs2 >> 7) & 0b1
-                print(f"rs2(vtype) -> vma:{vma}, vta:{vta}, vsew:{vsew}. vlmul:{vlmul}" ,end=", ") # TODO: vsew, vlmul mapping
-            elif type == "vsetvl":
-                rs2 = inst >> 20 & 0b11111
-                print(f"rs2(vtype): {rs2:05b}", end=", ")
-            
-            # rd
-            rd = inst >> 7 & 0b11111
-            print(f"rd: {rd}")
-
-        # vload/store
-        elif (inst & 0b1111111 == 0b0000111) or (inst & 0b1111111 == 0b0100111): 
-            type = inst >> 5 & 0b1 # 0: vload, 1: vstore
-            if type == 0:
-                print("vload")
-            else:
-                print("vstore")
-            
-            # mop
-            mop = inst >> 26 & 0b11
-            if   mop == 0b00: mop_mode = "unit-stride"
-            elif mop == 0b01: mop_mode = "indexed-unordered"
-            elif mop == 0b10: mop_mode = "strided"
-            elif mop == 0b11: mop_mode = "indexed-ordered"
-            print(f"mop: {mop_mode}", end=", ")
-
-            # nf
-            nf = inst >> 29 & 0b111
-            # mew
-            mew = inst >> 28 & 0b1
-            # vm
-            vm = inst >> 25 & 0b1
-            if vm == 0:
-                print(f"vm: masked", end=", ")
-            else:
-                print(f"vm: umasked", end=", ")
-            # lumop/sumop/rs2/vs2
-            rs2 = inst >> 20 & 0b11111
-
-            if mop_mode == "unit-stride":
-                if type == 0:
-                    print(f"lumop(rs2): {rs2}", end=", ")
-                else:
-                    print(f"sumop(rs2): {rs2}", end=", ")
-            elif mop_mode == "strided":
-                print(f"rs2: {rs2}", end=", ")
-            elif mop_mode == "indexed-unordered" or mop_mode == "indexed-ordered":
-                print(f"vs2: {rs2}", end=", ")
-
-            # rs1
-            rs1 = inst >> 15 & 0b11111
-            # width
-            width = inst >> 12 & 0b111
-            # vd
-            vd = inst >> 7 & 0b11111
-
-            print(f"nf: {nf}, mew: {mew}, rs1: {rs1}, width: {width}, vd: {vd}")
-        
-        # Arithmetic
-        elif (inst & 0b1111111 == 0b1010111):
-            print("Arithmetic")
-            
-            # funct6
-            funct6 = inst >> 26 & 0b111111
-            # 11.1. Vector Single-Width Integer Add and Subtract
-            if   (funct6 == 0b000000): print("vadd")
-            elif (funct6 == 0b000010): print("vsub")
-            elif (funct6 == 0b000011): print("vrsub")
-
-            # 11.2. Vector Widening Integer Add/Subtract
-
-            # 11.3. Vector Integer Extension
-
-            # vm
-            vm = inst >> 25 & 0b1
-
-            # vs2
-            vs2 = inst >> 20 & 0b11111
-
-            # vs1
-            vs1 = inst >> 15 & 0b11111
-
-            # funct3
-            funct3 = inst >> 12 & 0b111
-            if   (funct3 == 0b000): print("OPIVV")
-            elif (funct3 == 0b001): print("OPFVV")
-            elif (funct3 == 0b010): print("OPMVV")
-            elif (funct3 == 0b011): print("OPIVI")
-            elif (funct3 == 0b100): print("OPIVX")
-            elif (funct3 == 0b101): print("OPFVF")
-            elif (funct3 == 0b110): print("OPMVX")
-            elif (funct3 == 0b111): print("OPCFG")
-
-            # vd
-            vd = inst >> 7 & 0b11111
+    def decodeBin(self, inst):
+        """
+        this function is used to translate a 32b RVV instruction word into a VInst
+        NOTE:
+        (1) the scalar operands (AVL, base address, stride) are read from the scalar regfile "xreg"
+        (2) AVL follow rvv: rs1 != x0 -> x[rs1], rs1 == x0 & rd != x0 -> VLMAX, rs1 == rd == x0 -> keep vl
+        (3) the unsupported (or reserved) encodings are translated to VInst('unknown')
+        """
+        op = self.DecodeBin(inst)
+
+        if op.cls == 'vset':
+            vtype = self.xreg[op.vs2] if op.vtype is None else op.vtype
+            vlmul = vtype & 0b111
+            vsew  = vtype >> 3 & 0b111
+            if vlmul in self.vlmul_map and vsew in self.vsew_map and vtype >> 8 == 0:
+                if   op.name == 'vsetivli': avl = op.imm
+                elif op.rs1 != 0:           avl = self.xreg[op.rs1]
+                elif op.vd  != 0:           avl = VLEN  # any AVL >= VLMAX
+                else:                       avl = self.vl
+                return VInst('vset', vd=op.vd, rs1=avl, sew=self.vsew_map[vsew], lmul=self.vlmul_map[vlmul],
+                             ta=vtype >> 6 & 0b1, ma=vtype >> 7 & 0b1)
+
+        elif op.name in STRIDE_OPS + INDEX_OPS:
+            stride = self.xreg[op.vs2] if op.mop == 0b10 else 0
+            return VInst(op.name, vd=op.vd, vs2=op.vs2, rs1=self.xreg[op.rs1], rs2=stride, vm=op.vm, sew=op.width,
+                         nf=op.nf + 1)
+
+        elif op.name in self.INST_DECODER and op.cls in ARITH_FORM:
+            scalar = self.freg[op.rs1] if op.cls == 'OPFVF' else self.xreg[op.rs1]
+            return VInst(op.name, vd=op.vd, vs1=op.vs1, vs2=op.vs2, rs1=scalar, imm=op.imm, vm=op.vm,
+                         form=ARITH_FORM[op.cls])
+
+        return VInst(op.name or 'unknown')
+
+    def DecodeBin(self, inst):
+        """
+        the function to decode one 32b instruction word into a DecodedOp
+        NOTE the decode is memoized by the instruction word, each unique encoding is decoded once
+        """
+        op = DECODE_CACHE.get(inst)
+        if op is None:
+            op = DecodedOp(inst)
+            decoder = OPCODE_DECODER.get(op.opcode)
+            decoder and decoder(op)
+            DECODE_CACHE[inst] = op
+        return op
+
+    def DecodeStream(self, inst_words):
+        """
+        the function to decode an instruction stream, only the unique words go through DecodeBin
+        """
+        words = np.asarray(inst_words, dtype=np.uint32)
+        uniq, inverse = np.unique(words, return_inverse=True)
+        ops = [self.DecodeBin(word) for word in uniq.tolist()]
+        return [ops[i] for i in inverse.ravel().tolist()]
 
-        else:
+    def Bin2Asm(self, inst):
+        op = self.DecodeBin(inst)
+        if op.name is None:
             print("Error: not suppport insturction")
+        else:
+            print(op)
+        return op
 
     def set_vtype(self, vlmul, vsew, vta, vma):
         """
@@ -311,7 +536,7 @@ class DISPATCHER:
             self.debug and print(f"LMUL = {self.LMUL}", end=", ") # TODO print faction, not float
 
         # set vsew
-        enc_vsew = self.vlmul_reverse[vsew]
+        enc_vsew = self.vsew_reverse[vsew]
         if enc_vsew > 3:
             self.SEW = 8
             self.debug and print("Error, RVV vsew > 3 is reserved")
@@ -358,18 +583,18 @@ if __name__ == "__main__":
     # dispatcher.decode("vadd v0, v1, v2")
     
     """
-    Test the decodeCAPI function
+    Test the decodeInst function
     """
     print("Case 1")
-    dispatcher.decodeCAPI('VSET(160, e8, m8);', [160, 8, 8])
+    dispatcher.decodeInst(VInst('vset', rs1=160, sew=8, lmul=8))
     print(f"vtype: {dispatcher.vtype:X}")
 
     print("Case 2")
-    dispatcher.decodeCAPI('write_csr(vstart, 8);', [8])
+    dispatcher.decodeInst(VInst('vstart', imm=8))
     print(f"vstart: {dispatcher.vstart}")
 
     print("Case 3")
-    dispatcher.decodeCAPI('asm volatile("vle8.v v2, (%0)" ::"r"((uint8_t*)3758096384));', [8, 2, 3758096384])
+    dispatcher.decodeInst(VInst('vle', vd=2, rs1=3758096384, sew=8))
     print(f"sew: {dispatcher.SEW},  vd: {dispatcher.vd},  addr: {dispatcher.scalar_imm:8X}")
 
 
@@ -377,61 +602,69 @@ if __name__ == "__main__":
     Used to check the binary decode result
     """
     # vsetvli	t0, a0, e8, m1, ta, ma
-    # print("\nCase 1: ", end="")
-    # inst = 0x0c0572d7
-    # dispatcher.Bin2Asm(inst)
+    print("\nCase 1: ", end="")
+    inst = 0x0c0572d7
+    dispatcher.Bin2Asm(inst)
 
-    # # vsetvl	a2, zero, a0
-    # print("\nCase 2: ", end="")
-    # inst = 0x80a07657
-    # dispatcher.Bin2Asm(inst)
+    # vsetvl	a2, zero, a0
+    print("\nCase 2: ", end="")
+    inst = 0x80a07657
+    dispatcher.Bin2Asm(inst)
 
-    # # vsetivli	a1, 0xc, e8, m1, ta, ma
-    # print("\nCase 3: ", end="")
-    # inst = 0xcc0675d7
-    # dispatcher.Bin2Asm(inst)
+    # vsetivli	a1, 0xc, e8, m1, ta, ma
+    print("\nCase 3: ", end="")
+    inst = 0xcc0675d7
+    dispatcher.Bin2Asm(inst)
 
-    # # vsetivli	a1, 0xc, e8, m1, ta, mu
-    # print("\nCase 4: ", end="")
-    # inst = 0xc40675d7
-    # dispatcher.Bin2Asm(inst)
+    # vsetivli	a1, 0xc, e8, m1, ta, mu
+    print("\nCase 4: ", end="")
+    inst = 0xc40675d7
+    dispatcher.Bin2Asm(inst)
 
     # vle8.v	v0, (a0)
-    # print("\nCase 5: ", end="")
-    # inst = 0x02050007
-    # dispatcher.Bin2Asm(inst)
-
-    # # vle8.v	v3, (a0), v0.t
-    # print("\nCase 6: ", end="")
-    # inst = 0x00050187
-    # dispatcher.Bin2Asm(inst)
-
-    # # vse8.v	v3, (a0)
-    # print("\nCase 7: ", end="")
-    # inst = 0x020501a7
-    # dispatcher.Bin2Asm(inst)
-
-    # # vlse8.v	v1, (a0), a1
-    # print("\nCase 8: ", end="")
-    # inst = 0x0ab50087
-    # dispatcher.Bin2Asm(inst)
-
-    # # vlse8.v	v1, (a0), a1, v0.t
-    # print("\nCase 9: ", end="")
-    # inst = 0x08b50087
-    # dispatcher.Bin2Asm(inst)
-
-    # # vluxei8.v	v1, (a0), v2
-    # print("\nCase 10: ", end="")
-    # inst = 0x06250087
-    # dispatcher.Bin2Asm(inst)
-
-    # # vluxei8.v	v1, (a0), v2, v0.t
-    # print("\nCase 11: ", end="")
-    # inst = 0x04250087
-    # dispatcher.Bin2Asm(inst)
-
-    # # vle8ff.v	v1, (a0), v0.t
-    # print("\nCase 12: ", end="")
-    # inst = 0x01050087
-    # dispatcher.Bin2Asm(inst)
\ No newline at end of file
+    print("\nCase 5: ", end="")
+    inst = 0x02050007
+    dispatcher.Bin2Asm(inst)
+
+    # vle8.v	v3, (a0), v0.t
+    print("\nCase 6: ", end="")
+    inst = 0x00050187
+    dispatcher.Bin2Asm(inst)
+
+    # vse8.v	v3, (a0)
+    print("\nCase 7: ", end="")
+    inst = 0x020501a7
+    dispatcher.Bin2Asm(inst)
+
+    # vlse8.v	v1, (a0), a1
+    print("\nCase 8: ", end="")
+    inst = 0x0ab50087
+    dispatcher.Bin2Asm(inst)
+
+    # vlse8.v	v1, (a0), a1, v0.t
+    print("\nCase 9: ", end="")
+    inst = 0x08b50087
+    dispatcher.Bin2Asm(inst)
+
+    # vluxei8.v	v1, (a0), v2
+    print("\nCase 10: ", end="")
+    inst = 0x06250087
+    dispatcher.Bin2Asm(inst)
+
+    # vluxei8.v	v1, (a0), v2, v0.t
+    print("\nCase 11: ", end="")
+    inst = 0x04250087
+    dispatcher.Bin2Asm(inst)
+
+    # vle8ff.v	v1, (a0), v0.t
+    print("\nCase 12: ", end="")
+    inst = 0x01050087
+    dispatcher.Bin2Asm(inst)
+
+    """
+    Run the binary vset with the scalar regfile
+    """
+    print("\nCase 13: ", end="")
+    dispatcher.xreg[10] = avl
+    inst = dispatcher.decodeBin(0x0c0572d7)
+    print(f"{inst} -> type: {dispatcher.decodeInst(inst)}, vl: {dispatcher.vl}, t0: {dispatcher.xreg[5]}")
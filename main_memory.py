@@ -1,64 +1,537 @@
 import os
+import io
+import sys
+import copy
 import numpy as np
 from contextlib import redirect_stdout
 
+# @ global variables
+ELEMENT_DTYPE = {8: np.dtype('<u1'), 16: np.dtype('<u2'), 32: np.dtype('<u4'), 64: np.dtype('<u8')}  # element size -> little-endian dtype
+DIRTY_WORDS   = 512  # 64b words per dirty tracking block (4KB)
+HEX_DIGITS    = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+DRAM_COUNTERS = ('requests', 'beats', 'bytes', 'row_hits', 'row_misses', 'row_conflicts', 'latency', 'cycles')
+
+class PagedMemory:
+    """
+    sparse page table of 64b words, used as the storage of MEMORY
+    NOTE:
+    (1) a page is a fixed-size numpy array which is only allocated on the first write,
+        the unallocated pages are read as zero
+    (2) fork() shares all pages copy-on-write, a shared page is copied on its first write
+    """
+    def __init__(self, Depth, PageWords=4096):
+
+        # === parameters ===
+        self.Depth     = Depth
+        self.PageWords = PageWords       # 64b words per page (4096 -> 32KB page)
+        self.PageBytes = PageWords * 8
+
+        # === page table ===
+        self.pages = {}                  # page number -> page array
+        self.owned = set()               # page numbers which are not shared and can be written in place
+        self._zero = np.zeros((self.PageWords), dtype=np.dtype('<u8'))
+        self._zero.flags.writeable = False
+
+    @property
+    def shape(self):
+        return (self.Depth,)
+
+    def __len__(self):
+        return self.Depth
+
+    def __iter__(self):
+        for start in range(0, self.Depth, self.PageWords):
+            yield from self._rpage(start // self.PageWords)[:self.Depth - start]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.Depth)
+            words = self.read_bytes(start * 8, max(stop - start, 0) * 8).view(np.dtype('<u8'))
+            return words[::step]
+
+        idx = self._check(idx)
+        return self._rpage(idx // self.PageWords)[idx % self.PageWords]
+
+    def __setitem__(self, idx, value):
+        idx = self._check(idx)
+        self._wpage(idx // self.PageWords)[idx % self.PageWords] = value
+
+    def _check(self, idx):
+        idx = int(idx)
+        if not 0 <= idx < self.Depth:
+            raise IndexError(f"PagedMemory: word index {idx} is out of range")
+        return idx
+
+    def _rpage(self, page):
+        """
+        the function to get a page for read, the unallocated page is the shared zero page
+        """
+        return self.pages.get(page, self._zero)
+
+    def _wpage(self, page):
+        """
+        the function to get a page for write, allocate it or break the sharing if needed
+        """
+        if page not in self.owned:
+            shared = self.pages.get(page)
+            self.pages[page] = np.zeros((self.PageWords), dtype=np.dtype('<u8')) if shared is None else shared.copy()
+            self.owned.add(page)
+        return self.pages[page]
+
+    def read_bytes(self, offset, nbytes):
+        """
+        the function to copy a contiguous byte range out of the pages
+        """
+        rtn_bytes = np.empty((nbytes), dtype=np.uint8)
+        pos = 0
+        while pos < nbytes:
+            page, page_offset = divmod(offset + pos, self.PageBytes)
+            size = min(nbytes - pos, self.PageBytes - page_offset)
+            rtn_bytes[pos:pos + size] = self._rpage(page).view(np.uint8)[page_offset:page_offset + size]
+            pos += size
+        return rtn_bytes
+
+    def write_bytes(self, offset, byte_data):
+        """
+        the function to copy a contiguous byte range into the pages
+        """
+        pos = 0
+        while pos < len(byte_data):
+            page, page_offset = divmod(offset + pos, self.PageBytes)
+            size = min(len(byte_data) - pos, self.PageBytes - page_offset)
+            self._wpage(page).view(np.uint8)[page_offset:page_offset + size] = byte_data[pos:pos + size]
+            pos += size
+
+    def _page_groups(self, byte_idx):
+        """
+        the function to group a byte index array by page, yield (page, position in byte_idx, offset in page)
+        """
+        byte_idx     = np.asarray(byte_idx, dtype=np.int64)
+        page, offset = np.divmod(byte_idx, self.PageBytes)
+        order        = np.argsort(page, kind='stable')
+        sorted_page  = page[order]
+
+        pages, starts = np.unique(sorted_page, return_index=True)
+        ends          = np.append(starts[1:], len(order))
+        for page_num, start, end in zip(pages, starts, ends):
+            position = order[start:end]
+            yield int(page_num), position, offset[position]
+
+    def gather_bytes(self, byte_idx):
+        """
+        the function to gather bytes from the pages (byte_idx is byte addr array)
+        """
+        rtn_bytes = np.zeros((len(byte_idx)), dtype=np.uint8)
+        for page, position, page_offset in self._page_groups(byte_idx):
+            if page in self.pages:
+                rtn_bytes[position] = self.pages[page].view(np.uint8)[page_offset]
+        return rtn_bytes
+
+    def scatter_bytes(self, byte_idx, byte_data):
+        """
+        the function to scatter bytes into the pages (byte_idx is byte addr array)
+        """
+        byte_data = np.asarray(byte_data, dtype=np.uint8)
+        for page, position, page_offset in self._page_groups(byte_idx):
+            self._wpage(page).view(np.uint8)[page_offset] = byte_data[position]
+
+    def fork(self):
+        """
+        the function to fork the page table, only the page table is copied
+        NOTE all pages become shared, both side copy a page on its first write
+        """
+        child = PagedMemory.__new__(PagedMemory)
+        child.__dict__.update(self.__dict__)
+        child.pages = dict(self.pages)
+        child.owned = set()
+        self.owned  = set()
+        return child
+
+
+class DRAM_TIMING:
+    """
+    the optional DRAM timing and statistics layer of MEMORY
+    NOTE:
+    (1) address mapping (relative byte addr): | row | bank | channel | column |, one row is "RowBytes"
+    (2) each (channel, bank) keeps one open row, a beat is a row hit, a miss (no open row) or a conflict (another row is open)
+    (3) the beats of one request are served in order, each channel moves one beat per "BeatCycles"
+        and the row activations of a bank are serialized:
+        cycles = latency of the first beat + max(beats of the busiest channel, activations of the busiest bank)
+    (4) "last" is the counters of the last request (one vector instruction), "total" is accrued since clear()
+    """
+    def __init__(self, BeatBytes=8, Channels=1, Banks=8, RowBytes=2048, RowHit=14, RowMiss=28, RowConflict=42, BeatCycles=1):
+        # === parameters ===
+        self.BeatBytes   = BeatBytes
+        self.Channels    = Channels
+        self.Banks       = Banks
+        self.RowBytes    = RowBytes
+        self.RowHit      = RowHit       # column access of the open row (cycles)
+        self.RowMiss     = RowMiss      # activate + column access
+        self.RowConflict = RowConflict  # precharge + activate + column access
+        self.BeatCycles  = BeatCycles
+        self.clear()
+
+    def clear(self):
+        self.open_row = np.full((self.Channels * self.Banks), -1, dtype=np.int64)  # (channel, bank) -> open row
+        self.last     = dict.fromkeys(DRAM_COUNTERS, 0)
+        self.total    = dict.fromkeys(DRAM_COUNTERS, 0)
+
+    def access(self, beat_addr, nbytes):
+        """
+        the function to serve one request of beats (relative byte addr of each beat, in issue order)
+        will return the counters of the request
+        """
+        beat_addr = np.asarray(beat_addr, dtype=np.int64)
+        self.last = dict.fromkeys(DRAM_COUNTERS, 0)
+        if len(beat_addr) == 0:
+            return self.last
+
+        channel = beat_addr // self.RowBytes % self.Channels
+        bank    = channel * self.Banks + beat_addr // (self.RowBytes * self.Channels) % self.Banks
+        row     = beat_addr // (self.RowBytes * self.Channels * self.Banks)
+
+        # === row-buffer state: the previous row of each beat in its own bank ===
+        order    = np.argsort(bank, kind='stable')
+        bank_seq = bank[order]
+        row_seq  = row[order]
+        first    = np.ones((len(order)), dtype=bool)
+        first[1:] = bank_seq[1:] != bank_seq[:-1]
+        prev_row = np.empty_like(row_seq)
+        prev_row[1:]    = row_seq[:-1]
+        prev_row[first] = self.open_row[bank_seq[first]]
+        hit      = prev_row == row_seq
+        miss     = prev_row == -1
+        latency  = np.where(hit, self.RowHit, np.where(miss, self.RowMiss, self.RowConflict))
+        self.open_row[bank_seq[np.append(first[1:], True)]] = row_seq[np.append(first[1:], True)]
+
+        # === bandwidth: the busiest channel and the busiest bank ===
+        channel_beats = np.bincount(channel, minlength=self.Channels) * self.BeatCycles
+        activations   = np.bincount(bank_seq, weights=latency - self.RowHit, minlength=self.Channels * self.Banks)
+        first_latency = int(latency[np.argmin(order)])
+
+        self.last.update(requests=1, beats=len(beat_addr), bytes=int(nbytes),
+                         row_hits=int(np.count_nonzero(hit)), row_misses=int(np.count_nonzero(miss & ~hit)),
+                         row_conflicts=int(np.count_nonzero(~hit & ~miss)), latency=int(latency.sum()),
+                         cycles=first_latency + int(max(channel_beats.max(), activations.max())))
+        for counter in DRAM_COUNTERS:
+            self.total[counter] += self.last[counter]
+        return self.last
+
+    def report(self, counters=None):
+        """
+        the function to get the counters with the average latency (cycles per beat) and bandwidth (bytes per cycle)
+        """
+        counters = self.total if counters is None else counters
+        return {**counters, 'avg_latency': counters['latency'] / max(counters['beats'], 1),
+                'bandwidth': counters['bytes'] / max(counters['cycles'], 1)}
+
+
 class MEMORY:
-    def __init__(self, BASEADDR=0, DataWidth=64, Depth=409600, debug=False):
+    def __init__(self, BASEADDR=0, DataWidth=64, Depth=409600, BackingFile=None, Paged=False, Timing=False, debug=False):
         
         # === parameters ===
-        self.BASEADDR  = BASEADDR
-        self.DataWidth = DataWidth
-        self.Depth     = Depth
-        self.debug     = debug
+        self.BASEADDR    = BASEADDR
+        self.DataWidth   = DataWidth
+        self.Depth       = Depth
+        self.BackingFile = BackingFile  # None -> in RAM, path -> file-backed (memory-mapped) DRAM image
+        self.Paged       = Paged        # True -> sparse pages allocated on first write, supports fork()
+        self.timing      = DRAM_TIMING(BeatBytes=DataWidth // 8) if Timing else None  # DRAM timing and statistics layer
+        self.debug       = debug
+
+        if self.Paged and self.BackingFile is not None:
+            raise ValueError("MEMORY: Paged memory can't be file-backed")
 
         # === Dynamic parameters ===
 
         # === memory ===
-        self.memory = np.zeros((self.Depth), dtype=np.uint64)
+        # NOTE the memory is always little-endian so it can be viewed as a byte stream
+        if self.Paged:
+            self.memory = PagedMemory(self.Depth)
+        elif self.BackingFile is None:
+            self.memory = np.zeros((self.Depth), dtype=np.dtype('<u8'))
+        else:
+            self.memory = self._map_file(self.BackingFile)
+
+        # === dirty block bitmap (one flag per DIRTY_WORDS words) for dirty-only dumps ===
+        self.dirty = np.zeros((-(-self.Depth // DIRTY_WORDS)), dtype=bool)
     
     
     # the function to initial bulk data to memory in byte
-    def init_byte_to_mem(self, pattern):
-        # === Reshape to (N, 8) ===
-        dram_reshape = pattern.reshape(-1, 8)
-        self.debug and print("reshape: ", dram_reshape.shape)
-        
+    def init_byte_to_mem(self, pattern, offset=0, length=None):
+        """
+        the function to preload bulk data into memory with one block copy
+        NOTE:
+        (1) "pattern" can be any numpy dtype, its raw bytes are loaded in little-endian order
+        (2) "offset" is the byte offset from BASEADDR, it doesn't need to be 64b aligned
+        (3) "length" is the number of pattern bytes to load, default is the whole pattern
+        """
+        # === reinterpret the pattern as a little-endian byte stream (no copy if already contiguous) ===
+        pattern      = np.asarray(pattern)
+        byte_pattern = np.ascontiguousarray(pattern, dtype=pattern.dtype.newbyteorder('<')).reshape(-1).view(np.uint8)
+        if length is not None:
+            byte_pattern = byte_pattern[:length]
+        self.debug and print("preload bytes: ", byte_pattern.size, "offset: ", offset)
+
+        if offset < 0 or offset + byte_pattern.size > self.Depth * 8:
+            raise ValueError("init_byte_to_mem: pattern is out of memory range")
+
+        # === load into memory ===
+        self._write_bytes(offset, byte_pattern)
+
+    def _map_file(self, path):
+        """
+        the function to map a DRAM image file as memory
+        NOTE:
+        (1) the file is grown (sparse) to Depth words if needed, the existing content is kept
+        (2) the OS only brings in the pages which are touched, dirty pages are written back on flush()
+        """
+        nbytes = self.Depth * 8
+        with open(path, "ab") as f:
+            if f.tell() < nbytes:
+                f.truncate(nbytes)
+
+        return np.memmap(path, dtype=np.dtype('<u8'), mode='r+', shape=(self.Depth,))
+
+    def flush(self):
+        """
+        the function to write the dirty pages back to the DRAM image file (no effect for in RAM memory)
+        """
+        if isinstance(self.memory, np.memmap):
+            self.memory.flush()
+
+    def snapshot(self):
+        """
+        the function to take a snapshot of the memory content
+        NOTE:
+        (1) for Paged memory it only copies the page table (pages are shared copy-on-write)
+        (2) file-backed memory can't be snapshot, the copy would bring the whole image into RAM
+        """
+        if self.BackingFile is not None:
+            raise ValueError("snapshot: file-backed memory can't be snapshot")
+        if self.Paged:
+            return self.memory.fork()
+        return np.array(self.memory)
+
+    def restore(self, snapshot):
+        """
+        the function to roll the memory content back to a snapshot, the snapshot can be restored again
+        """
+        if self.Paged:
+            self.memory = snapshot.fork()
+        else:
+            self.memory[:] = snapshot
+
+    def fork(self):
+        """
+        the function to create a new MEMORY which starts from the current content
+        NOTE for Paged memory this is cheap, the pages are shared copy-on-write
+        """
+        if self.BackingFile is not None:
+            raise ValueError("fork: file-backed memory can't be forked")
+
+        dram = MEMORY.__new__(MEMORY)
+        dram.__dict__.update(self.__dict__)
+        dram.memory = self.snapshot()
+        dram.dirty  = self.dirty.copy()
+        dram.timing = copy.deepcopy(self.timing)
+        return dram
+
+    def _check_range(self, offset, nbytes):
+        """
+        the function to check a contiguous byte range (offset is relative byte addr) is in memory
+        NOTE all the backends (dense, paged, file-backed) raise the same error
+        """
+        if nbytes > 0 and (offset < 0 or offset + nbytes > self.Depth * 8):
+            raise ValueError(f"MEMORY: byte address 0x{self.BASEADDR + offset:X} (+{nbytes} bytes) is out of memory range")
+
+    def _check_index(self, byte_idx):
+        """
+        the function to check a byte index array (relative byte addr) is in memory
+        """
+        byte_idx = np.asarray(byte_idx, dtype=np.int64)
+        outside  = (byte_idx < 0) | (byte_idx >= self.Depth * 8)
+        if outside.any():
+            self._check_range(int(byte_idx[outside][0]), 1)
+        return byte_idx
 
-        # === load into memory ===s
-        for idx, chunk in enumerate(dram_reshape):
-            self.debug and print(chunk)
-            
-            chunk = chunk[::-1]  # reverse each chunk (little-endian)
+    def _read_bytes(self, offset, nbytes):
+        """
+        the function to view a contiguous byte range of memory (offset is relative byte addr)
+        """
+        self._check_range(offset, nbytes)
+        if self.Paged:
+            return self.memory.read_bytes(offset, nbytes)
+        return self.memory.view(np.uint8)[offset:offset + nbytes]
 
-            Dec64b = 0
-            for byte in chunk:
-                self.debug and print(hex(byte))
-                Dec64b = (Dec64b << 8) | int(byte)
-            
-            self.debug and print(f"0x{Dec64b:016X}")
-            self.memory[idx] = Dec64b
+    def _write_bytes(self, offset, byte_data):
+        """
+        the function to copy a contiguous byte range into memory (offset is relative byte addr)
+        """
+        self._check_range(offset, len(byte_data))
+        if self.Paged:
+            self.memory.write_bytes(offset, byte_data)
+        else:
+            self.memory.view(np.uint8)[offset:offset + len(byte_data)] = byte_data
+
+        if len(byte_data):
+            self.dirty[(offset >> 3) // DIRTY_WORDS:((offset + len(byte_data) - 1) >> 3) // DIRTY_WORDS + 1] = True
+
+    def clear_dirty(self):
+        """
+        the function to clear the dirty flags, e.g. after preload to only dump what the simulation writes
+        """
+        self.dirty[:] = False
 
     def dumpMem_data(self, mode):
         """
-        The function to dump all of memory
+        The function to dump all of memory to stdout (see dump() for the options)
         Support mode:
         1. debug: used to dump python level memory in txt with 64b per data
         2. rtl: used to generate the hex file for rtl "readmemh" with 8b per data
         """
+        self.dump(sys.stdout, mode)
+
+    def dump(self, file, mode='debug', start_addr=None, end_addr=None, dirty_only=False, chunk_words=65536):
+        """
+        The function to dump memory in large chunks to a file (path or opened file)
+        Support mode:
+        1. debug: python level memory in txt with 64b per data
+        2. rtl:   hex file for rtl "readmemh" with 8b per data
+        3. hex64: hex file for rtl "readmemh" with 64b per data
+        4. bin:   raw little-endian bytes
+        5. npy:   numpy array of 64b words, (N, 2) array of [word addr, data] when dirty_only
+        NOTE:
+        (1) "start_addr"/"end_addr" are byte addr, the range is [start_addr, end_addr) rounded to 64b words
+        (2) "dirty_only" only dumps the DIRTY_WORDS blocks which were written,
+            the hex modes add "@addr" lines when the dumped words are not contiguous from 0
+        """
+        if mode not in ('debug', 'rtl', 'hex64', 'bin', 'npy'):
+            raise ValueError(f"dump: Unsupported mode {mode}")
+        if mode == 'bin' and dirty_only:
+            raise ValueError("dump: bin mode has no address, can't dump dirty_only")
+
+        # === select the word ranges to dump ===
+        start_word = 0 if start_addr is None else max((start_addr - self.BASEADDR) >> 3, 0)
+        end_word   = self.Depth if end_addr is None else min(-(-(end_addr - self.BASEADDR) // 8), self.Depth)
+        blocks     = self._dump_blocks(start_word, end_word, dirty_only)
+
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "wb") as f:
+                self._dump_to(f, mode, blocks, dirty_only, chunk_words)
+        else:
+            self._dump_to(file, mode, blocks, dirty_only, chunk_words)
+
+    def _dump_blocks(self, start_word, end_word, dirty_only):
+        """
+        the function to list the contiguous (start_word, end_word) ranges to dump
+        """
+        if not dirty_only:
+            return [(start_word, end_word)] if start_word < end_word else []
+
+        # === merge the neighbor dirty blocks into one range ===
+        flags  = np.concatenate(([False], self.dirty, [False]))
+        edges  = np.flatnonzero(flags[1:] != flags[:-1])
+        blocks = []
+        for begin, end in zip(edges[0::2] * DIRTY_WORDS, edges[1::2] * DIRTY_WORDS):
+            begin, end = max(begin, start_word), min(end, end_word)
+            if begin < end:
+                blocks.append((int(begin), int(end)))
+        return blocks
+
+    def _dump_to(self, f, mode, blocks, dirty_only, chunk_words):
+        """
+        the function to write the selected blocks chunk by chunk
+        """
+        text = isinstance(f, io.TextIOBase)
+        def write(chunk):
+            f.write(chunk.decode("ascii") if text else chunk)
+
+        if mode == 'npy':
+            if text:
+                raise ValueError("dump: npy mode needs a binary file")
+            words = [self._read_bytes(begin * 8, (end - begin) * 8).view(np.dtype('<u8')) for begin, end in blocks]
+            words = np.concatenate(words) if words else np.zeros((0), dtype=np.dtype('<u8'))
+            if dirty_only:
+                addrs = np.concatenate([np.arange(begin, end, dtype=np.uint64) for begin, end in blocks]) if blocks else words
+                words = np.stack((addrs, words), axis=1)
+            np.save(f, words)
+            return
 
         if mode == 'debug':
-            print("----- Memory data -----")
-            print(f"Size: {self.memory.shape}, DataWidth: {self.DataWidth}")
-            for idx, value in enumerate(self.memory):
-                print(f"[{idx:6}] ", end="")
-                print(f"0x{value:016X}", end="")
-                print(" -> ", value)
-        elif mode == 'rtl':
-            for idx, value in enumerate(self.memory):
-                for byte in range(8):
-                    byte_mask  = 0b11111111 << (byte * 8)
-                    byte_value = (value & byte_mask) >> (byte * 8)
-                    print(f"{byte_value:02X}")
+            write(f"----- Memory data -----\nSize: {self.memory.shape}, DataWidth: {self.DataWidth}\n".encode("ascii"))
+
+        next_word = 0
+        for begin, end in blocks:
+            # === readmemh address when the dump jumps ===
+            if begin != next_word and mode in ('rtl', 'hex64'):
+                write((f"@{begin * 8:X}\n" if mode == 'rtl' else f"@{begin:X}\n").encode("ascii"))
+            next_word = end
+
+            for chunk_begin in range(begin, end, chunk_words):
+                chunk_end  = min(chunk_begin + chunk_words, end)
+                byte_data  = self._read_bytes(chunk_begin * 8, (chunk_end - chunk_begin) * 8)
+
+                if   mode == 'bin':   write(byte_data.tobytes())
+                elif mode == 'rtl':   write(self._format_rtl(byte_data))
+                elif mode == 'hex64': write(self._hex64_chars(byte_data).tobytes())
+                elif mode == 'debug': write(self._format_debug(chunk_begin, byte_data))
+
+    def _format_rtl(self, byte_data):
+        """
+        the function to format bytes as "XX" lines (ascending byte addr)
+        """
+        lines = np.empty((len(byte_data), 3), dtype=np.uint8)
+        lines[:, 0] = HEX_DIGITS[byte_data >> 4]
+        lines[:, 1] = HEX_DIGITS[byte_data & 0xF]
+        lines[:, 2] = ord("\n")
+        return lines.tobytes()
+
+    def _hex64_chars(self, byte_data):
+        """
+        the function to format 64b words as "XXXXXXXXXXXXXXXX" lines (MSB first), one char array row per line
+        """
+        msb_first = byte_data.reshape(-1, 8)[:, ::-1]
+        lines = np.empty((len(msb_first), 17), dtype=np.uint8)
+        lines[:, 0:16:2] = HEX_DIGITS[msb_first >> 4]
+        lines[:, 1:16:2] = HEX_DIGITS[msb_first & 0xF]
+        lines[:, 16]     = ord("\n")
+        return lines
+
+    def _format_debug(self, begin, byte_data):
+        """
+        the function to format 64b words as "[idx] 0xHEX ->  DEC" lines
+        """
+        words   = byte_data.view(np.dtype('<u8'))
+        idx_str = np.char.rjust(np.arange(begin, begin + len(words)).astype(str), 6)
+        hex_str = self._hex64_chars(byte_data)[:, :16].copy().view("S16").reshape(-1).astype(str)
+        lines   = np.char.add(np.char.add(np.char.add("[", idx_str), "] 0x"), hex_str)
+        lines   = np.char.add(np.char.add(lines, " ->  "), words.astype(str))
+        return ("\n".join(lines.tolist()) + "\n").encode("ascii")
+
+    def account(self, byte_addrs, nbytes=None, write=False):
+        """
+        the function to account one LSU request in the DRAM timing layer (byte_addrs is byte addr array in issue order)
+        NOTE the consecutive bytes of one beat are one beat access, "nbytes" default is the number of byte addresses,
+             "write" is for the levels in front of MEMORY (see cache.py), the DRAM timing is the same for both
+        will return the counters of the request, None if the timing layer is off
+        """
+        if self.timing is None:
+            return None
+        beat = (np.asarray(byte_addrs, dtype=np.int64).reshape(-1) - self.BASEADDR) // self.timing.BeatBytes
+        new  = np.ones((len(beat)), dtype=bool)
+        new[1:] = beat[1:] != beat[:-1]
+        return self.timing.access(beat[new] * self.timing.BeatBytes, len(beat) if nbytes is None else nbytes)
+
+    def account_range(self, start_addr, nbytes, write=False):
+        """
+        the function to account one contiguous request (start_addr is byte addr) in the DRAM timing layer
+        """
+        if self.timing is None:
+            return None
+        beat_bytes = self.timing.BeatBytes
+        relative   = start_addr - self.BASEADDR
+        beat       = np.arange(relative // beat_bytes, (relative + nbytes - 1) // beat_bytes + 1, dtype=np.int64) if nbytes > 0 else []
+        return self.timing.access(np.asarray(beat, dtype=np.int64) * beat_bytes, nbytes)
 
     def take64bData(self, addr):
         """
@@ -88,6 +561,7 @@ class MEMORY:
         inv_mask = ~bit_mask & 0xFFFFFFFFFFFFFFFF  # assume 64-bit memory entry
         
         self.memory[align64_addr] = (self.memory[align64_addr] & inv_mask) | (data & bit_mask) 
+        self.dirty[align64_addr // DIRTY_WORDS] = True
         
 
     def take_data(self, start_addr, size, length):
@@ -99,42 +573,16 @@ class MEMORY:
         
         relative_start_addr = start_addr - self.BASEADDR
 
-        # === initial the return vector & align the start address ===
-        if   size == 8:
-            temp_vector = np.zeros((length), dtype=np.uint8)
-            align_start_addr = relative_start_addr
-        elif size == 16:
-            temp_vector = np.zeros((length), dtype=np.uint16)
-            align_start_addr = (relative_start_addr >> 1) << 1
-        elif size == 32:
-            temp_vector = np.zeros((length), dtype=np.uint32)
-            align_start_addr = (relative_start_addr >> 2) << 2
-        elif size == 64:
-            temp_vector = np.zeros((length), dtype=np.uint64)
-            align_start_addr = (relative_start_addr >> 3) << 3
-        else:
+        # === align the start address to the element size ===
+        if size not in ELEMENT_DTYPE:
             raise ValueError("take_data: Unsupported data size")
+        esize            = size // 8
+        align_start_addr = (relative_start_addr // esize) * esize
+        self.debug and print("align_start_addr: ", align_start_addr, "length: ", length)
 
-        # === take data out from memory ===
-        for idx in range(length):
-
-            # === convert byte address to mem address ===
-            mem_addr = (align_start_addr + (idx * size // 8)) // 8
-
-            # === convert byte address to bit offset ===
-            offset   = (align_start_addr + (idx * size // 8)) % 8 * 8
-            
-            self.debug and print("mem_addr: ", mem_addr, "offset: ", offset)
-
-            # === shift data to target byte ===
-            if   size == 8:   temp_data = (self.memory[mem_addr] >> offset) & 0Xff
-            elif size == 16:  temp_data = (self.memory[mem_addr] >> offset) & 0Xffff
-            elif size == 32:  temp_data = (self.memory[mem_addr] >> offset) & 0Xffffffff
-            elif size == 64:  temp_data = (self.memory[mem_addr] >> offset)
-
-            temp_vector[idx] = temp_data
-
-        return temp_vector
+        # === take data out from memory (one byte range viewed as elements) ===
+        byte_data = self._read_bytes(align_start_addr, length * esize)
+        return byte_data.view(ELEMENT_DTYPE[size]).astype(ELEMENT_DTYPE[size].newbyteorder('='))
 
     def store_data(self, start_addr, size, vector):
         """
@@ -145,42 +593,144 @@ class MEMORY:
 
         relative_start_addr = start_addr - self.BASEADDR
 
-        length = len(vector)
-        
-        # === initial the return vector & align the start address ===
-        if   size == 8:
-            align_start_addr = relative_start_addr
-        elif size == 16:
-            align_start_addr = (relative_start_addr >> 1) << 1
-        elif size == 32:
-            align_start_addr = (relative_start_addr >> 2) << 2
-        elif size == 64:
-            align_start_addr = (relative_start_addr >> 3) << 3
-        else:
+        # === align the start address to the element size ===
+        if size not in ELEMENT_DTYPE:
             raise ValueError("store_data: Unsupported data size")
+        esize            = size // 8
+        align_start_addr = (relative_start_addr // esize) * esize
+        self.debug and print("align_start_addr: ", align_start_addr, "length: ", len(vector))
+
+        # === store data to memory (elements viewed as one byte range) ===
+        elements = self._to_elements(vector, size)
+        self._write_bytes(align_start_addr, elements.view(np.uint8))
+
+    def take_bytes(self, start_addr, nbytes):
+        """
+        the function to take a contiguous byte range out of memory (start_addr is byte addr, no alignment)
+        NOTE the return bytes can be a view of the memory, copy it before keeping it
+        """
+        return self._read_bytes(start_addr - self.BASEADDR, nbytes)
+
+    def store_bytes(self, start_addr, byte_data):
+        """
+        the function to store a contiguous byte range into memory (start_addr is byte addr, no alignment)
+        """
+        self._write_bytes(start_addr - self.BASEADDR, np.asarray(byte_data, dtype=np.uint8).reshape(-1))
+
+    def take_scattered(self, byte_addrs):
+        """
+        the function to take bytes at any byte addresses out of memory in one gather (byte_addrs is byte addr array)
+        """
+        return self._gather_bytes(np.asarray(byte_addrs, dtype=np.int64) - self.BASEADDR)
+
+    def store_scattered(self, byte_addrs, byte_data):
+        """
+        the function to store bytes at any byte addresses into memory in one scatter (byte_addrs is byte addr array)
+        NOTE the bytes are stored in order, the later byte wins if the address repeats
+        """
+        self._scatter_last(np.asarray(byte_addrs, dtype=np.int64) - self.BASEADDR, np.asarray(byte_data, dtype=np.uint8))
+
+    def take_data_batch(self, start_addrs, size, lengths):
+        """
+        the function to take many (start_addr, length) ranges out of memory in one gather
+        NOTE: 
+        (1) each range follows the alignment of take_data
+        (2) "lengths" can be one length for all ranges, return one element vector per range
+        """
+        if size not in ELEMENT_DTYPE:
+            raise ValueError("take_data_batch: Unsupported data size")
+        byte_idx, lengths = self._batch_byte_idx(start_addrs, size, lengths)
+
+        elements = self._gather_bytes(byte_idx).view(ELEMENT_DTYPE[size]).astype(ELEMENT_DTYPE[size].newbyteorder('='))
+        return np.split(elements, np.cumsum(lengths)[:-1])
+
+    def store_data_batch(self, start_addrs, size, vectors):
+        """
+        the function to store many element vectors into memory in one scatter
+        NOTE: 
+        (1) each range follows the alignment of store_data
+        (2) if the ranges overlap, the later range wins
+        """
+        if size not in ELEMENT_DTYPE:
+            raise ValueError("store_data_batch: Unsupported data size")
+        lengths = [len(vector) for vector in vectors]
+        byte_idx, lengths = self._batch_byte_idx(start_addrs, size, lengths)
+
+        elements  = np.concatenate([self._to_elements(vector, size) for vector in vectors])
+        self._scatter_last(byte_idx, elements.view(np.uint8))
 
-        # === take data out from memory ===
-        for idx in range(length):
+    def store_beats(self, beat_addrs, byte_strbs, beat_data):
+        """
+        the function to store many beats with byte strobe into memory in one scatter (beat_addrs is byte addr)
+        NOTE "byte_strbs"/"beat_data" are (beat, beat bytes) arrays, high->store, low->don't store
+        """
+        byte_strbs = np.asarray(byte_strbs, dtype=bool)
+        beat_data  = np.asarray(beat_data, dtype=np.uint8)
+        byte_idx   = (np.asarray(beat_addrs, dtype=np.int64)[:, None] - self.BASEADDR) + np.arange(byte_strbs.shape[1])
+
+        self._scatter_last(byte_idx[byte_strbs], beat_data[byte_strbs])
+
+    def _scatter_last(self, byte_idx, byte_data):
+        """
+        the function to scatter bytes in order, the later byte wins if the byte index repeats
+        """
+        last_idx, last_pos = np.unique(byte_idx[::-1], return_index=True)
+        self._scatter_bytes(last_idx, byte_data[::-1][last_pos])
+
+    def _batch_byte_idx(self, start_addrs, size, lengths):
+        """
+        the function to expand (start_addr, length) ranges into the relative byte index of all elements
+        """
+        esize   = size // 8
+        starts  = (np.asarray(start_addrs, dtype=np.int64).reshape(-1) - self.BASEADDR) // esize * esize
+        lengths = np.broadcast_to(np.asarray(lengths, dtype=np.int64), starts.shape)
 
-            # === convert byte address to mem address===
-            mem_addr = (align_start_addr + (idx * size // 8)) // 8
+        # === element index inside its own range ===
+        range_end    = np.cumsum(lengths)
+        element_idx  = np.arange(range_end[-1] if len(range_end) else 0) - np.repeat(range_end - lengths, lengths)
+        element_addr = np.repeat(starts, lengths) + element_idx * esize
 
-            # === convert byte address to bit offset ===
-            offset   = (align_start_addr + (idx * size // 8)) % 8 * 8
-            
-            self.debug and print("mem_addr: ", mem_addr, "offset: ", offset)
+        byte_idx = (element_addr[:, None] + np.arange(esize)).reshape(-1)
+        return byte_idx, lengths
+
+    def _to_elements(self, vector, size):
+        """
+        the function to convert the data list into little-endian elements (truncate to the element size)
+        """
+        if not isinstance(vector, np.ndarray):
+            try:
+                vector = np.array(vector, dtype=np.int64)
+            except OverflowError:
+                vector = np.array([int(value) & ((1 << size) - 1) for value in vector], dtype=np.uint64)
+        elif vector.dtype == object:
+            vector = np.array([int(value) & ((1 << size) - 1) for value in vector], dtype=np.uint64)
+        return np.ascontiguousarray(vector.reshape(-1).astype(ELEMENT_DTYPE[size]))
+
+    def _gather_bytes(self, byte_idx):
+        """
+        the function to gather bytes of memory (byte_idx is relative byte addr array)
+        """
+        byte_idx = self._check_index(byte_idx)
+        if self.Paged:
+            return self.memory.gather_bytes(byte_idx)
+        return self.memory.view(np.uint8)[byte_idx]
+
+    def _scatter_bytes(self, byte_idx, byte_data):
+        """
+        the function to scatter bytes into memory (byte_idx is relative byte addr array)
+        """
+        byte_idx = self._check_index(byte_idx)
+        if self.Paged:
+            self.memory.scatter_bytes(byte_idx, byte_data)
+        else:
+            self.memory.view(np.uint8)[byte_idx] = byte_data
 
-            # === Clear the bits at the target location & refresh the new data ====
-            mask = ((1 << size) - 1) << offset
-            inv_mask = ~mask & 0xFFFFFFFFFFFFFFFF  # assume 64-bit memory entry
-            old_value = self.memory[mem_addr]
-            new_value = (old_value & inv_mask) | ((int(vector[idx]) << offset) & mask)
-            self.memory[mem_addr] = new_value
+        self.dirty[(byte_idx >> 3) // DIRTY_WORDS] = True
 
 
 if __name__ == "__main__":
     print("===== main memory testbench =====")
-    print("version: 2025.05.24")
+    print("version: 2025.06.20")
 
     dram = MEMORY(DataWidth=64, Depth=409600, debug=False)
 
@@ -249,3 +799,8 @@ if __name__ == "__main__":
             dram.dumpMem_data(mode = 'debug')
             # print("8bit : ", [f"0x{val:02X}"  for val in dram.take_data(0x1400, 8, 160)])
 
+    # === DRAM timing: one contiguous 1KB request vs. the same bytes scattered over the rows ===
+    timed = MEMORY(DataWidth=64, Depth=409600, Timing=True)
+    print("contiguous:", timed.timing.report(timed.account_range(0, 1024)))
+    timed.timing.clear()
+    print("scattered: ", timed.timing.report(timed.account(np.arange(128) * 2056)))
@@ -0,0 +1,172 @@
+import numpy as np
+
+# @ global variables
+# kind of the mask instruction
+LOGIC  = 0  # mask vd = f(mask vs2, mask vs1), computed on the packed bytes
+SCALAR = 1  # x[rd] = f(mask vs2)
+FIRST  = 2  # mask vd = f(mask vs2, index of the first active set bit)
+INDEX  = 3  # vd = f(mask vs2, active elements) as SEW elements
+
+
+# op -> (function, kind)
+MASKU_OPS = {
+    # mask-register logical, function(vs2 byte, vs1 byte)
+    'vmand':  (lambda a, b: a & b, LOGIC),
+    'vmnand': (lambda a, b: ~(a & b), LOGIC),
+    'vmandn': (lambda a, b: a & ~b, LOGIC),
+    'vmxor':  (lambda a, b: a ^ b, LOGIC),
+    'vmor':   (lambda a, b: a | b, LOGIC),
+    'vmnor':  (lambda a, b: ~(a | b), LOGIC),
+    'vmorn':  (lambda a, b: a | ~b, LOGIC),
+    'vmxnor': (lambda a, b: ~(a ^ b), LOGIC),
+    # count population / find-first-set, function(packed active set bits)
+    'vcpop':  (lambda byte: int(np.unpackbits(byte).sum()), SCALAR),
+    'vfirst': (lambda byte: _first_set(byte), SCALAR),
+    # set-before/including/only-first, function(element index, first), first = vl if no bit is set
+    'vmsbf':  (lambda idx, first: idx < first, FIRST),
+    'vmsif':  (lambda idx, first: idx <= first, FIRST),
+    'vmsof':  (lambda idx, first: idx == first, FIRST),
+    # iota and element index, function(element index, active set bits)
+    'viota':  (lambda idx, bits: np.cumsum(bits) - bits, INDEX),
+    'vid':    (lambda idx, bits: idx, INDEX),
+}
+
+
+def _first_set(byte):
+    nonzero = np.flatnonzero(byte)
+    if len(nonzero) == 0:
+        return -1
+    low = int(byte[nonzero[0]])
+    return int(nonzero[0]) * 8 + (low & -low).bit_length() - 1
+
+def _range_byte(vstart, vl):
+    """
+    the packed byte mask of the bits [vstart, vl)
+    """
+    bits = np.zeros(((vl + 7) // 8 * 8), dtype=bool)
+    bits[vstart:vl] = True
+    return np.packbits(bits, bitorder='little')
+
+
+class MASKU:
+    def __init__(self, vrf, dispatcher, debug=False):
+        """
+        the vector mask unit
+        NOTE:
+        (1) the mask registers are kept bit-packed in the VRF bytes (SEW=8, LMUL=1 layout of "vrf"),
+            the mask logical instructions work on the packed bytes directly
+        (2) the other units get the active elements by "predicate", and write the mask/tail policy
+            by "write_mask" and "tail_agnostic"
+        (3) the mask destination is updated in [vstart, vl), its tail is undisturbed (a legal agnostic choice)
+        """
+        self.vrf        = vrf
+        self.dispatcher = dispatcher
+        self.debug      = debug
+
+    # === predicate API of the execution units ===
+    def predicate(self, vm, vstart, vl):
+        """
+        the function to get the active elements [vstart, vl) from v0
+        will return a bool vector, or None when unmasked (vm=1, every body element is active)
+        """
+        if vm:
+            return None
+        return np.unpackbits(self.vrf.take_mask_byte(0, vl), count=vl, bitorder='little').view(bool)[vstart:]
+
+    def write_mask(self, vd, vstart, vl, bits, active=None):
+        """
+        the function to write the mask bits [vstart, vl) of vd, the masked-off bits are undisturbed
+        """
+        if active is not None:
+            bits = np.where(active, bits, self.vrf.take_mask(vd, vl)[vstart:])
+        self.vrf.load_mask(vd, vstart, bits)
+
+    def tail_agnostic(self, vd, start, eew, emul):
+        """
+        the function to overwrite the tail elements [start, VLMAX) of the vd register group (EEW, EMUL) with all 1s if vta
+        """
+        VLMAX = int(emul * self.vrf.VLEN // eew)
+        if self.dispatcher.vta and start < VLMAX:
+            self.vrf.load(vd, start, VLMAX - start, np.full((VLMAX - start), -1).astype(np.dtype(f'<u{eew // 8}')), eew, emul)
+
+    # === mask instructions ===
+    def execute(self, inst):
+        """
+        the function to execute one mask instruction
+        """
+        function, kind = MASKU_OPS[inst.op]
+        sew, vstart, vl = self.dispatcher.SEW, self.dispatcher.vstart, self.dispatcher.vl
+        if kind != LOGIC and vstart != 0:
+            raise ValueError(f"MASKU: {inst.op} is illegal with non-zero vstart {vstart}.")
+        self.debug and print(f"MASKU {inst.op} vd: {inst.vd}, vs2: {inst.vs2}, vstart: {vstart}, vl: {vl}")
+
+        if kind == LOGIC:
+            if vstart >= vl:
+                return
+            vs2_byte = self.vrf.take_mask_byte(inst.vs2, vl)
+            vs1_byte = self.vrf.take_mask_byte(inst.vs1, vl)
+            vd_byte  = self.vrf.take_mask_byte(inst.vd, vl)
+            body     = _range_byte(vstart, vl)
+            self.vrf.load_mask_byte(inst.vd, (function(vs2_byte, vs1_byte) & body) | (vd_byte & ~body))
+            return
+
+        # === the active set bits of vs2 ===
+        if kind == SCALAR:
+            byte = self.vrf.take_mask_byte(inst.vs2, vl) & _range_byte(0, vl)
+            if inst.vm == 0:
+                byte &= self.vrf.take_mask_byte(0, vl)
+            if inst.vd != 0:
+                self.dispatcher.xreg[inst.vd] = function(byte)
+            return
+        if vl == 0:
+            return
+
+        active = self.predicate(inst.vm, 0, vl)
+        bits   = self.vrf.take_mask(inst.vs2, vl) if inst.op != 'vid' else np.zeros((vl), dtype=bool)
+        if active is not None:
+            bits = bits & active
+
+        idx = np.arange(vl)
+        if kind == FIRST:
+            first = int(np.argmax(bits)) if bits.any() else vl
+            self.write_mask(inst.vd, 0, vl, function(idx, first), active)
+            return
+
+        # === INDEX: SEW elements of the vd register group ===
+        udtype = np.dtype(f'<u{sew // 8}')
+        self.vrf.vset(sew, self.dispatcher.LMUL)
+        result = function(idx, bits.astype(udtype)).astype(udtype)
+        if active is not None:
+            result = np.where(active, result, np.iinfo(udtype).max if self.dispatcher.vma else self.vrf.take(inst.vd, 0, vl))
+        self.vrf.load(inst.vd, 0, vl, result)
+        self.tail_agnostic(inst.vd, vl, sew, self.dispatcher.LMUL)
+
+
+if __name__ == "__main__":
+    print("===== MASKU testbench =====")
+    print("version: 2025.06.12")
+
+    from vrf import VRF
+    from dispatcher import DISPATCHER
+    from vinst import VInst
+
+    vrf        = VRF()
+    dispatcher = DISPATCHER()
+    masku      = MASKU(vrf, dispatcher)
+
+    dispatcher.decodeInst(VInst('vset', rs1=20, sew=8, lmul=1))
+    vrf.load_mask(1, 0, np.array([0, 0, 0, 1, 0, 1, 1, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 1, 1], dtype=bool))
+    vrf.load_mask(2, 0, np.array([1, 1, 0, 0] * 5, dtype=bool))
+    vrf.load_mask(0, 0, np.array([1, 1, 1, 0] * 5, dtype=bool))
+    print("vs2:     ", vrf.take_mask(1, 20).astype(int))
+    print("vs1:     ", vrf.take_mask(2, 20).astype(int))
+    print("v0:      ", vrf.take_mask(0, 20).astype(int))
+    for op in ['vmand', 'vmxor', 'vmorn', 'vmsbf', 'vmsif', 'vmsof']:
+        masku.execute(VInst(op, vd=3, vs2=1, vs1=2, form='vv'))
+        print(f"{op:9}", vrf.take_mask(3, 20).astype(int))
+    for op in ['viota', 'vid']:
+        masku.execute(VInst(op, vd=4, vs2=1, vm=0, form='vv'))
+        print(f"{op:6} v0.t", vrf.take(4, 0, 20))
+    for op in ['vcpop', 'vfirst']:
+        masku.execute(VInst(op, vd=5, vs2=1, vm=0, form='vv'))
+        print(f"{op:6} v0.t", dispatcher.xreg[5])
@@ -0,0 +1,122 @@
+import numpy as np
+from collections import deque
+
+# @ global variables
+# stall causes
+RAW        = 'raw'         # read after write of a vector register
+WAR        = 'war'         # write after read of a vector register
+WAW        = 'waw'         # write after write of a vector register
+MEMORY     = 'memory'      # load/store order of an overlapping byte span
+STRUCTURAL = 'structural'  # the unit (or its queue) is busy
+WINDOW     = 'window'      # the scoreboard window is full, the sequencer stalls
+CAUSES = (RAW, WAR, WAW, MEMORY, STRUCTURAL, WINDOW)
+
+
+class SCOREBOARD:
+    def __init__(self, Window=8, NrVRegs=32, debug=False):
+        """
+        the scoreboard of the sequencer, it tracks the hazards of the in-flight instructions
+        NOTE:
+        (1) the hazards are tracked per vector register, an instruction marks all the registers of its groups
+            (LMUL/EMUL > 1, widening, segment fields), so the overlap of groups with different EMUL is caught
+        (2) RAW: the consumer chains on the first result of the producer, or waits for its last result (no chaining)
+            WAR: the writer starts after the earlier readers start, and finishes after they finish
+            WAW: the writer starts after the first result of the earlier writer, and finishes after it
+        (3) memory: a load waits for the earlier stores overlapping its byte span to finish,
+            a store waits for the earlier loads/stores overlapping its byte span to start
+        (4) "Window" instructions can wait in the scoreboard, a stalled instruction doesn't block the later
+            independent instructions until the window is full. Window = 1 is the in-order sequencer
+        (5) "stalls" sums the wait of each instruction by its binding cause, the waits of overlapping
+            instructions add up, the sequencer stalls on a full window are counted as WINDOW
+        """
+        self.Window  = Window
+        self.NrVRegs = NrVRegs
+        self.debug   = debug
+        self.clear()
+
+    def clear(self):
+        self.write_first  = np.zeros((self.NrVRegs), dtype=np.int64)  # vreg -> first result of the last writer
+        self.write_last   = np.zeros((self.NrVRegs), dtype=np.int64)  # vreg -> last result of the last writer
+        self.write_chain  = np.ones((self.NrVRegs), dtype=bool)       # vreg -> the last writer can be chained
+        self.read_start   = np.zeros((self.NrVRegs), dtype=np.int64)  # vreg -> latest start of the readers
+        self.read_finish  = np.zeros((self.NrVRegs), dtype=np.int64)  # vreg -> latest finish of the readers
+        self.memory       = []                                        # in-flight (store, lo, hi, start, finish)
+        self.window       = deque()                                   # start of the last "Window" instructions
+        self.stalls       = dict.fromkeys(CAUSES, 0)                  # cause -> stall cycles
+
+    # === sequencer ===
+    def issue_slot(self, cycle):
+        """
+        the function to get the earliest issue cycle, the oldest instruction leaves the window when it starts
+        """
+        if len(self.window) < self.Window or self.window[0] <= cycle:
+            return cycle
+        self.stall(WINDOW, int(self.window[0]) - cycle)
+        return int(self.window[0])
+
+    def stall(self, cause, cycles):
+        if cycles > 0:
+            self.stalls[cause] += cycles
+
+    # === hazards ===
+    def check(self, reads, writes, span=None, store=False):
+        """
+        the function to get the bounds of an instruction from the in-flight instructions
+        will return {cause: (start bound, finish bound)}
+        NOTE "span" is the (lo, hi) byte span of a load/store, None for the others
+        """
+        reads, writes = np.unique(reads).astype(np.int64), np.unique(writes).astype(np.int64)
+        bounds = {}
+        if len(reads):
+            ready = np.where(self.write_chain[reads], self.write_first[reads], self.write_last[reads])
+            bounds[RAW] = (int(ready.max()), int(self.write_last[reads].max()))
+        if len(writes):
+            bounds[WAR] = (int(self.read_start[writes].max()), int(self.read_finish[writes].max()))
+            first = np.where(self.write_chain[writes], self.write_first[writes], self.write_last[writes])
+            bounds[WAW] = (int(first.max()), int(self.write_last[writes].max()))
+        if span is not None:
+            lo, hi = span
+            for older_store, older_lo, older_hi, start, finish in self.memory:
+                if older_lo < hi and lo < older_hi and (store or older_store):
+                    bound = (start, start) if store else (finish, finish)
+                    bounds[MEMORY] = tuple(max(a, b) for a, b in zip(bounds.get(MEMORY, (0, 0)), bound))
+        return bounds
+
+    def commit(self, reads, writes, start, first, finish, chain=True, span=None, store=False):
+        """
+        the function to mark the registers (and the byte span) of an issued instruction
+        """
+        reads, writes = np.unique(reads).astype(np.int64), np.unique(writes).astype(np.int64)
+        self.read_start[reads]  = np.maximum(self.read_start[reads], start)
+        self.read_finish[reads] = np.maximum(self.read_finish[reads], finish)
+        self.write_first[writes] = first
+        self.write_last[writes]  = finish
+        self.write_chain[writes] = chain
+        if span is not None:
+            self.memory = [entry for entry in self.memory if entry[4] > start] + [(store, span[0], span[1], start, finish)]
+        self.window.append(start)
+        while len(self.window) > self.Window:
+            self.window.popleft()
+
+
+if __name__ == "__main__":
+    print("===== SCOREBOARD testbench =====")
+    print("version: 2025.06.19")
+
+    from VPU_simulator import VPU_simulator, DRAM_BASEADDR
+    from vinst import VInst, vset, vle, vse
+    from tracer import TRACE_OFF
+
+    # === the same kernel on the in-order sequencer and on deeper windows ===
+    program = [vset(512, 8, 4), vle(8, 8, DRAM_BASEADDR), vle(8, 12, DRAM_BASEADDR + 2048),
+               VInst('vredsum', vd=16, vs2=8, vs1=12, form='vv'),  # no chaining on the reduction
+               VInst('vadd', vd=20, vs2=16, vs1=16, form='vv'),   # RAW on vredsum
+               VInst('vxor', vd=24, vs2=8, vs1=12, form='vv'),    # independent
+               VInst('vsub', vd=8, vs2=24, vs1=12, form='vv'),    # WAR on vredsum, RAW on vxor
+               vse(8, 20, DRAM_BASEADDR + 4096), vle(8, 28, DRAM_BASEADDR + 4096)]  # memory RAW
+    for window in [1, 2, 8]:
+        sim = VPU_simulator(DramDepth=65536, TraceLevel=TRACE_OFF, Timing=True)
+        sim.timing.scoreboard.Window = window
+        sim.run(program)
+        report = sim.timing.report()
+        print(f"window {window}: cycles {report['cycles']}, stalls {report['stalls']}")
@@ -0,0 +1,137 @@
+import numpy as np
+
+from valu import UINT, _emul
+from vmfpu import FTYPE
+from masku import MASKU
+
+# @ global variables
+# op -> source element of vd[i], function(i, x, vl, VLMAX)
+# NOTE the source is an element index of vs2, VLMAX reads 0 and VLMAX + 1 reads the scalar operand
+SLDU_OPS = {
+    # slide, x is OFFSET
+    'vslideup':     lambda i, x, vl, VLMAX: i - x,
+    'vslidedown':   lambda i, x, vl, VLMAX: np.where(i + x < VLMAX, i + x, VLMAX),
+    'vslide1up':    lambda i, x, vl, VLMAX: np.where(i == 0, VLMAX + 1, i - 1),
+    'vfslide1up':   lambda i, x, vl, VLMAX: np.where(i == 0, VLMAX + 1, i - 1),
+    'vslide1down':  lambda i, x, vl, VLMAX: np.where(i == vl - 1, VLMAX + 1, i + 1),
+    'vfslide1down': lambda i, x, vl, VLMAX: np.where(i == vl - 1, VLMAX + 1, i + 1),
+    # register gather, x is the index (vector or scalar)
+    'vrgather':     lambda i, x, vl, VLMAX: np.where(x < VLMAX, x, VLMAX),
+    'vrgatherei16': lambda i, x, vl, VLMAX: np.where(x < VLMAX, x, VLMAX),
+    # compress, the source is the set bits of the mask vs1
+    'vcompress':    None,
+}
+
+
+class SLDU:
+    def __init__(self, vrf, dispatcher, debug=False):
+        """
+        the vector slide (permutation) unit
+        NOTE:
+        (1) each instruction is one NumPy gather on the logical element order:
+            vd[i] = [vs2 elements..., 0, scalar][source(i)]
+        (2) the element i is stored in the lane "vrf.Lookup_idx" gives, an element whose source is in
+            another lane is one inter-lane move (the 0 and the scalar operand are not counted)
+        (3) the inter-lane moves of the last instruction is "moves", all the instructions are accrued to "inter_lane_moves"
+        """
+        self.vrf        = vrf
+        self.dispatcher = dispatcher
+        self.masku      = MASKU(vrf, dispatcher)
+        self.debug      = debug
+
+        self.moves            = 0
+        self.inter_lane_moves = 0
+
+    def scalar(self, inst, sew):
+        """
+        the function to get the scalar operand (x or f register) in SEW bits
+        """
+        if inst.op.startswith('vf'):
+            return np.array(inst.rs1, dtype=np.float64).astype(FTYPE[sew]).view(UINT[sew])
+        return UINT[sew].type(inst.rs1 & ((1 << sew) - 1))
+
+    def index(self, inst, vstart, vl, sew, VLMAX):
+        """
+        the function to get x of the source function, the OFFSET of slides or the index of vrgather
+        NOTE the index of vrgatherei16 is EEW=16, EMUL=16/SEW*LMUL
+        """
+        if inst.form == 'vv':
+            eew   = 16 if inst.op == 'vrgatherei16' else sew
+            index = self.vrf.take(inst.vs1, vstart, vl - vstart, eew, _emul(self.dispatcher.LMUL, eew, sew))
+            return np.minimum(index.astype(np.uint64), np.uint64(VLMAX)).astype(np.int64)
+        x = inst.rs1 & ((1 << 64) - 1) if inst.form == 'vx' else inst.imm & 0x1F  # unsigned XLEN / uimm5
+        return min(x, VLMAX)
+
+    def execute(self, inst):
+        """
+        the function to execute one permutation instruction
+        will return the inter-lane moves of the instruction
+        """
+        source = SLDU_OPS[inst.op]
+        sew, lmul, vstart, vl = self.dispatcher.SEW, self.dispatcher.LMUL, self.dispatcher.vstart, self.dispatcher.vl
+        self.moves = 0
+        if vl <= vstart:
+            return 0
+
+        self.vrf.vset(sew, lmul)
+        VLMAX = int(self.vrf.VLMAX)
+        lane  = self.vrf._idx_table[2]
+
+        # === destination elements and their source ===
+        if inst.op == 'vcompress':
+            if vstart != 0:
+                raise ValueError(f"SLDU: {inst.op} is illegal with non-zero vstart {vstart}.")
+            src    = np.flatnonzero(self.vrf.take_mask(inst.vs1, vl))
+            dst    = np.arange(len(src))
+            active = None
+        else:
+            x      = self.index(inst, vstart, vl, sew, VLMAX)
+            first  = max(vstart, x) if inst.op == 'vslideup' else vstart  # vd[0, OFFSET) is unchanged
+            dst    = np.arange(first, vl)
+            src    = np.broadcast_to(source(dst, x if np.ndim(x) == 0 else x[first - vstart:], vl, VLMAX), dst.shape)
+            active = self.masku.predicate(inst.vm, first, vl)
+        if len(dst) == 0:
+            self.masku.tail_agnostic(inst.vd, vl, sew, lmul)
+            return 0
+
+        # === one gather of [vs2, 0, scalar] ===
+        data   = np.concatenate([self.vrf.take(inst.vs2, 0, VLMAX), np.zeros((1), dtype=UINT[sew]), [self.scalar(inst, sew)]])
+        result = data[src]
+        if active is not None:
+            result = np.where(active, result, np.iinfo(UINT[sew]).max if self.dispatcher.vma else self.vrf.take(inst.vd, dst[0], len(dst)))
+
+        element = src < VLMAX if active is None else (src < VLMAX) & active
+        self.moves = int(np.count_nonzero(lane[src[element]] != lane[dst[element]]))
+        self.inter_lane_moves += self.moves
+        self.debug and print(f"SLDU {inst.op}.{inst.form} vd: {inst.vd}, vs2: {inst.vs2}, vstart: {vstart}, vl: {vl}, "
+                             f"inter-lane moves: {self.moves}")
+
+        self.vrf.load(inst.vd, int(dst[0]), len(dst), result)
+        self.masku.tail_agnostic(inst.vd, vl, sew, lmul)
+        return self.moves
+
+
+if __name__ == "__main__":
+    print("===== SLDU testbench =====")
+    print("version: 2025.06.14")
+
+    from vrf import VRF
+    from dispatcher import DISPATCHER
+    from vinst import VInst
+
+    vrf        = VRF()
+    dispatcher = DISPATCHER()
+    sldu       = SLDU(vrf, dispatcher)
+
+    dispatcher.decodeInst(VInst('vset', rs1=16, sew=16, lmul=1))
+    vrf.vset(16, 1)
+    vrf.load(1, 0, 16, np.arange(100, 116))
+    vrf.load(2, 0, 16, np.array([15, 0, 3, 3, 40, 1, 2, 5, 7, 7, 7, 8, 9, 10, 0, 1]))
+    vrf.load_mask(3, 0, np.arange(16) % 3 == 0)
+    for inst in [VInst('vslideup', vd=4, vs2=1, imm=3, form='vi'), VInst('vslidedown', vd=4, vs2=1, rs1=5, form='vx'),
+                 VInst('vslide1up', vd=4, vs2=1, rs1=-1, form='vx'), VInst('vslide1down', vd=4, vs2=1, rs1=7, form='vx'),
+                 VInst('vrgather', vd=4, vs2=1, vs1=2, form='vv'), VInst('vrgather', vd=4, vs2=1, imm=2, form='vi'),
+                 VInst('vcompress', vd=4, vs2=1, vs1=3, form='vv')]:
+        vrf.load(4, 0, 16, np.zeros(16))
+        moves = sldu.execute(inst)
+        print(f"{inst.op:12} {inst.form}:", vrf.take(4, 0, 16).view(np.int16), f"inter-lane moves: {moves}")
@@ -0,0 +1,256 @@
+import numpy as np
+from collections import deque
+
+from valu import VALU_OPS, MACC, MASK, MERGE, WIDE, WIDEW, WMACC, NARROW, CLIP, EXT
+from vmfpu import VMFPU_OPS, FP_UNARY
+from vrdu import VRDU_OPS
+from masku import MASKU_OPS, LOGIC, SCALAR, FIRST
+from sldu import SLDU_OPS
+from dispatcher import STRIDE_OPS, INDEX_OPS
+from scoreboard import SCOREBOARD, STRUCTURAL
+
+# @ global variables
+# instruction type -> functional unit
+LOAD_OPS  = tuple(op for op in STRIDE_OPS + INDEX_OPS if op.startswith('vl'))
+STORE_OPS = tuple(op for op in STRIDE_OPS + INDEX_OPS if op.startswith('vs'))
+UNIT = {
+    **dict.fromkeys(VALU_OPS, 'valu'),
+    **dict.fromkeys(VMFPU_OPS, 'vmfpu'),
+    **dict.fromkeys(VRDU_OPS, 'vrdu'),
+    **dict.fromkeys(MASKU_OPS, 'masku'),
+    **dict.fromkeys(SLDU_OPS, 'sldu'),
+    **dict.fromkeys(LOAD_OPS, 'vldu'),
+    **dict.fromkeys(STORE_OPS, 'vstu'),
+}
+UNITS = ('valu', 'vmfpu', 'vrdu', 'masku', 'sldu', 'vldu', 'vstu')
+
+# unit -> pipeline latency (cycles from the first operand to the first result)
+LATENCY = {'valu': 1, 'vmfpu': 5, 'vrdu': 2, 'masku': 1, 'sldu': 2, 'vldu': 20, 'vstu': 2}
+
+# the ops which don't run at one 64b word per lane per cycle -> cycles per word
+SLOW_OPS = {'vdiv': 8, 'vdivu': 8, 'vrem': 8, 'vremu': 8, 'vfdiv': 8, 'vfrdiv': 8, 'vfsqrt': 8}
+
+# the units which don't produce vd in element order, the consumer waits for the whole vd (no chaining)
+NO_CHAIN = {'vrdu', 'sldu', 'masku'}
+
+# the ops which read vs1 only (vs2 is not an operand)
+MOVE_OPS = {'vmv.v', 'vfmv.v.f'}
+
+
+def _group(vreg, emul):
+    """
+    the registers of the register group (vreg, EMUL), a fractional EMUL is one register
+    """
+    return range(vreg, vreg + max(int(np.ceil(emul)), 1))
+
+def operands(inst, sew, lmul):
+    """
+    the function to get the vector registers an instruction reads and writes, taking LMUL/EMUL into account
+    will return (reads, writes, eew, streams)
+    NOTE:
+    (1) "eew" is the widest element of the data streams, "streams" is the number of register groups
+        read or written (one VRF bank access per word each)
+    (2) the scalar operands (x/f registers) and v0 of an unmasked instruction are not included
+    """
+    op, unit = inst.op, UNIT.get(inst.op)
+    reads, writes, eew = [], [], sew
+    if not inst.vm:
+        reads.append(0)
+
+    if unit in ('valu', 'vmfpu'):
+        kind = (VALU_OPS.get(op) or VMFPU_OPS[op])[1]
+        dw   = 2 if kind in (WIDE, WIDEW, WMACC) else 1
+        sw   = 2 if kind in (WIDEW, NARROW, CLIP) else (1 / int(op[-1]) if kind == EXT else 1)
+        eew  = sew * max(dw, sw)
+        writes += _group(inst.vd, 1 if kind == MASK else lmul * dw)
+        if op not in MOVE_OPS:
+            reads += _group(inst.vs2, lmul * sw)
+        if inst.form == 'vv' and op not in FP_UNARY and kind != EXT:
+            reads += _group(inst.vs1, lmul)
+        if kind in (MACC, WMACC):
+            reads += _group(inst.vd, lmul * dw)
+        if kind == MERGE:
+            reads.append(0)
+    elif unit == 'vrdu':
+        eew     = sew * (2 if VRDU_OPS[op][3] else 1)
+        reads  += list(_group(inst.vs2, lmul)) + [inst.vs1]
+        writes += [inst.vd]
+    elif unit == 'masku':
+        kind    = MASKU_OPS[op][1]
+        reads  += [] if op == 'vid' else [inst.vs2]
+        reads  += [inst.vs1] if kind == LOGIC else []
+        writes += [] if kind == SCALAR else ([inst.vd] if kind in (LOGIC, FIRST) else _group(inst.vd, lmul))
+    elif unit == 'sldu':
+        reads  += _group(inst.vs2, lmul)
+        if op == 'vcompress':
+            reads.append(inst.vs1)
+        elif inst.form == 'vv':
+            reads += _group(inst.vs1, lmul * 16 / sew if op == 'vrgatherei16' else lmul)
+        writes += _group(inst.vd, lmul)
+    elif unit in ('vldu', 'vstu'):
+        data = _group(inst.vd, inst.nf * max(lmul, 1))
+        if op in INDEX_OPS:
+            reads += _group(inst.vs2, lmul * inst.sew / sew)
+        (writes if unit == 'vldu' else reads).extend(data)
+    streams = len(set(reads) & {inst.vs1, inst.vs2, inst.vd, 0}) + (1 if writes else 0)
+    return reads, writes, eew, max(streams, 1)
+
+
+class TIMING:
+    def __init__(self, vrf, dispatcher, lsu, vrdu, sldu, OpQueueDepth=4, UnitQueueDepth=4, Window=8, debug=False):
+        """
+        the cycle-approximate timing model of the VPU, layered on the functional run
+        NOTE:
+        (1) "issue" is called after the functional execution of each instruction, the work of the instruction
+            is taken from the architectural state ("dispatcher") and the statistics of the units:
+            the AXI bursts of "lsu" (the DRAM cycles when its timing layer is on), the inter-lane steps of "vrdu" and the inter-lane moves of "sldu"
+        (2) the sequencer issues one instruction per cycle in order to the queue of its unit,
+            it stalls when the unit queue ("UnitQueueDepth") is full
+        (3) each lane processes one 64b word per unit per cycle: "NrLanes" * 8 bytes per cycle per unit,
+            the load/store units move one AXI beat per cycle
+        (4) the operands are fetched into the operand queues ("OpQueueDepth" words) before the unit starts,
+            the fetch is hidden when the unit is still busy with the previous instruction
+        (5) each lane has "NrBanks" single-port VRF banks shared by all the running instructions,
+            an instruction needs one bank access per operand word and per result word
+        (6) the hazards (RAW with chaining, WAR, WAW, load/store order) are tracked by the "scoreboard",
+            up to "Window" instructions wait in it, so the independent instructions overlap the stalled ones.
+            the units in NO_CHAIN make the consumer wait for the whole result
+        (7) the stall cycles are reported by cause, see "scoreboard.CAUSES"
+        """
+        self.vrf        = vrf
+        self.dispatcher = dispatcher
+        self.lsu        = lsu
+        self.vrdu       = vrdu
+        self.sldu       = sldu
+        self.debug      = debug
+
+        # === parameters ===
+        self.OpQueueDepth   = OpQueueDepth
+        self.UnitQueueDepth = UnitQueueDepth
+        self.scoreboard     = SCOREBOARD(Window=Window, debug=debug)
+        self.clear()
+
+    def clear(self):
+        """
+        the function to reset the time and the statistics
+        """
+        self.cycle      = 0                                        # issue cycle of the last instruction
+        self.cycles     = 0                                        # the finish of the last instruction
+        self.busy       = dict.fromkeys(UNITS, 0)                  # unit -> busy cycles
+        self.count      = dict.fromkeys(UNITS, 0)                  # unit -> instructions
+        self.unit_free  = dict.fromkeys(UNITS, 0)                  # unit -> the cycle the unit is free
+        self.unit_start = {unit: deque() for unit in UNITS}        # unit -> start of the queued instructions
+        self.running    = []                                       # (start, finish, bank accesses per cycle)
+        self.last       = (0, 0, 0)                                # (issue, start, finish) of the last instruction
+        self.scoreboard.clear()
+
+    # === work of one instruction ===
+    def words(self, elements, eew):
+        """
+        the number of 64b words per lane of "elements" elements of EEW bits
+        """
+        return -(-max(elements, 0) * eew // (self.vrf.NrLanes * 64))
+
+    def work(self, inst, unit, elements, eew, streams, start):
+        """
+        the function to get the cycles a unit is busy with the instruction (the VRF bank ports included)
+        """
+        words = self.words(elements, eew)
+        if unit in ('vldu', 'vstu'):
+            dram   = self.lsu.memory.timing
+            cycles = max(self.lsu.beats, words, self.lsu.axi['cycles'] - self.lsu.AxiLatency,
+                         dram.last['cycles'] if dram is not None else 0)
+        elif unit == 'vrdu':
+            cycles = words + int(np.log2(max(words, 1))) + self.vrdu.steps * LATENCY['vrdu']
+        elif unit == 'sldu':
+            cycles = words + -(-self.sldu.moves // self.vrf.NrLanes)
+        else:
+            cycles = words * SLOW_OPS.get(inst.op, 1)
+
+        # === VRF bank ports: the instructions running at "start" take their accesses per cycle ===
+        taken = sum(used for begin, finish, used in self.running if begin <= start < finish)
+        ports = max(self.vrf.NrBanks - taken, 1)
+        return max(cycles, int(np.ceil(words * streams / ports)))
+
+    # === issue ===
+    def issue(self, inst, inst_type):
+        """
+        the function to account one executed instruction
+        will return (issue, start, finish) cycles of the instruction
+        """
+        unit     = UNIT.get(inst_type)
+        elements = self.dispatcher.vl - self.dispatcher.vstart
+        self.cycle += 1
+        if unit is None or elements <= 0:  # vset / vstart / CSR, or no element (vl <= vstart): one sequencer cycle
+            self.last   = (self.cycle, self.cycle, self.cycle)
+            self.cycles = max(self.cycles, self.cycle)
+            return self.last
+
+        sew, lmul = self.dispatcher.SEW, self.dispatcher.LMUL
+        reads, writes, eew, streams = operands(inst, sew, lmul)
+
+        # === sequencer: in-order issue, stall on a full unit queue or a full scoreboard window ===
+        queue = self.unit_start[unit]
+        while queue and queue[0] <= self.cycle:
+            queue.popleft()
+        if len(queue) >= self.UnitQueueDepth:
+            self.scoreboard.stall(STRUCTURAL, int(queue[-self.UnitQueueDepth]) - self.cycle)
+            self.cycle = int(queue[-self.UnitQueueDepth])
+        self.cycle = issue = self.scoreboard.issue_slot(self.cycle)
+
+        # === hazards: the instruction waits in the scoreboard until all its bounds are met ===
+        store  = unit == 'vstu'
+        span   = self.lsu.span if unit in ('vldu', 'vstu') else None
+        bounds = self.scoreboard.check(reads, writes, span, store)
+        bounds[STRUCTURAL] = (self.unit_free[unit], 0)
+        start  = max([issue] + [bound[0] for bound in bounds.values()])
+        cause  = max(bounds, key=lambda cause: bounds[cause][0])
+        self.scoreboard.stall(cause, start - issue)
+        after  = max(bound[1] for bound in bounds.values())
+
+        # === operand fetch (hidden behind a busy unit), pipeline latency, work ===
+        fetch  = 0 if self.unit_free[unit] > issue else min(self.OpQueueDepth, 1 + len(set(reads)))
+        cycles = self.work(inst, unit, elements, eew, streams, start)
+        first  = start + fetch + LATENCY[unit]
+        finish = max(first + max(cycles - 1, 0), after + 1)
+
+        # === book-keeping ===
+        self.unit_free[unit] = start + fetch + cycles
+        queue.append(start)
+        rate = streams * min(1, self.words(elements, eew) / max(finish - start, 1))  # a chained consumer runs at its producer pace
+        self.running = [(begin, end, used) for begin, end, used in self.running if end > issue] + [(start, finish, rate)]
+        self.scoreboard.commit(reads, writes, start, first, finish, unit not in NO_CHAIN, span, store)
+        self.busy[unit]  += cycles
+        self.count[unit] += 1
+        self.cycles = max(self.cycles, finish)
+        self.last   = (issue, start, finish)
+        self.debug and print(f"TIMING {inst.op:10} unit: {unit:5}, issue: {issue}, start: {start}, finish: {finish}")
+        return self.last
+
+    def report(self):
+        """
+        the function to get the total cycles, the utilization of each unit and the stall cycles by cause
+        """
+        cycles = max(self.cycles, 1)
+        return {'cycles': self.cycles,
+                'stalls': {cause: stall for cause, stall in self.scoreboard.stalls.items() if stall},
+                'utilization': {unit: round(self.busy[unit] / cycles, 4) for unit in UNITS if self.count[unit]},
+                'instructions': {unit: self.count[unit] for unit in UNITS if self.count[unit]}}
+
+
+if __name__ == "__main__":
+    print("===== TIMING testbench =====")
+    print("version: 2025.06.18")
+
+    from VPU_simulator import VPU_simulator, DRAM_BASEADDR
+    from vinst import VInst, vset, vle, vse
+    from tracer import TRACE_OFF
+
+    sim = VPU_simulator(DramDepth=65536, TraceLevel=TRACE_OFF, Timing=True)
+    program = [vset(512, 8, 4), vle(8, 8, DRAM_BASEADDR), vle(8, 12, DRAM_BASEADDR + 2048),
+               VInst('vadd', vd=16, vs2=8, vs1=12, form='vv'),   # chains on the loads
+               VInst('vmul', vd=20, vs2=16, vs1=8, form='vv'),   # chains on vadd
+               VInst('vxor', vd=24, vs2=8, vs1=12, form='vv'),   # independent
+               vse(8, 20, DRAM_BASEADDR + 4096)]
+    sim.run(program)
+    print(sim.timing.report())
@@ -0,0 +1,85 @@
+import numpy as np
+
+# @ global variables
+TRACE_OFF     = 0  # no trace at all
+TRACE_SUMMARY = 1  # binary ring buffer record per instruction + one summary line per run
+TRACE_INST    = 2  # + one text line per instruction
+TRACE_ELEMENT = 3  # + per element / per beat text trace of the sub-modules
+
+# binary trace record of one instruction
+TRACE_RECORD = np.dtype([('inst',   '<u8'),   # instruction number
+                         ('type',   '<u2'),   # instruction type code (see TRACER.types)
+                         ('vl',     '<u4'),
+                         ('vstart', '<u4'),
+                         ('sew',    '<u1'),
+                         ('vreg',   '<u1'),   # vd / vs of the instruction
+                         ('addr',   '<u8')])  # base address of load/store
+
+
+class TRACER:
+    def __init__(self, level=TRACE_INST, depth=65536):
+        """
+        the tracer of the simulator
+        NOTE:
+        (1) the sub-modules check "level" before formatting anything,
+            so a TRACE_OFF run doesn't pay any string formatting
+        (2) the records are kept in a fixed-size ring buffer, only the last "depth" records are kept
+        """
+        # === parameters ===
+        self.level = level
+        self.depth = depth
+
+        # === ring buffer ===
+        self.ring  = np.zeros((self.depth), dtype=TRACE_RECORD)
+        self.count = 0        # total number of records
+        self.types = {}       # instruction type -> type code
+
+    def record(self, inst, type, vl=0, vstart=0, sew=0, vreg=0, addr=0):
+        """
+        the function to write one instruction record into the ring buffer
+        """
+        code = self.types.setdefault(type, len(self.types))
+        self.ring[self.count % self.depth] = (inst, code, vl, vstart, sew, vreg, addr)
+        self.count += 1
+
+    def records(self):
+        """
+        the function to get the kept records in time order
+        """
+        if self.count <= self.depth:
+            return self.ring[:self.count].copy()
+        head = self.count % self.depth
+        return np.concatenate((self.ring[head:], self.ring[:head]))
+
+    def summary(self, since=0):
+        """
+        the function to count the kept records of each instruction type
+        NOTE "since" is the record count to start from, e.g. the count before a run
+        """
+        records = self.records()
+        records = records[len(records) - min(max(self.count - since, 0), len(records)):]
+        names   = {code: type for type, code in self.types.items()}
+        codes, counts = np.unique(records['type'], return_counts=True)
+        return {names[code]: int(count) for code, count in zip(codes, counts)}
+
+    def clear(self):
+        self.count = 0
+
+    def save(self, path):
+        """
+        the function to save the kept records (binary .npz with the type names)
+        """
+        names = np.array(sorted(self.types, key=self.types.get), dtype=str)
+        np.savez(path, records=self.records(), types=names)
+
+
+if __name__ == "__main__":
+    print("===== tracer testbench =====")
+    print("version: 2025.06.01")
+
+    tracer = TRACER(level=TRACE_SUMMARY, depth=4)
+    for inst in range(6):
+        tracer.record(inst, 'vset' if inst % 2 == 0 else 'vload_a', vl=160, sew=8, addr=0xE0000000 + inst)
+
+    print(tracer.records())
+    print(tracer.summary())
@@ -0,0 +1,324 @@
+import numpy as np
+
+from masku import MASKU
+
+# @ global variables
+UINT = {8: np.dtype('<u1'), 16: np.dtype('<u2'), 32: np.dtype('<u4'), 64: np.dtype('<u8')}
+SINT = {8: np.dtype('<i1'), 16: np.dtype('<i2'), 32: np.dtype('<i4'), 64: np.dtype('<i8')}
+
+# destination kind of the operation
+VEC   = 0  # vd = f(vs2, op1)
+MACC  = 1  # vd = f(vs2, op1, vd), the old vd is an operand
+MASK  = 2  # mask vd = f(vs2, op1)
+MERGE = 3  # vd = v0.mask ? op1 : vs2
+# widening / narrowing, the operand EEW is SEW if not listed
+WIDE   = 4  # vd(2*SEW) = f(vs2, op1)
+WIDEW  = 5  # vd(2*SEW) = f(vs2(2*SEW), op1)
+WMACC  = 6  # vd(2*SEW) = f(vs2, op1, vd(2*SEW))
+NARROW = 7  # vd = f(vs2(2*SEW), op1)
+CLIP   = 8  # vd = f(vs2(2*SEW), op1, vxrm) -> (result, saturated), the saturation sets vxsat
+EXT    = 9  # vd = f(vs2(SEW/F)), F is the suffix of vzext.vfF / vsext.vfF
+
+# the ops whose immediate is the unsigned uimm5 (shift amount)
+UIMM_OPS = {'vsll', 'vsrl', 'vsra', 'vnsrl', 'vnsra', 'vnclipu', 'vnclip'}
+
+
+# === integer helpers, all operands are the unsigned SEW view (wrapping) ===
+def _signed(x):
+    return x.view(SINT[x.dtype.itemsize * 8])
+
+def _shamt(x, b):
+    return b & (x.dtype.itemsize * 8 - 1)  # only the low log2(SEW) bits are used
+
+def _emul(lmul, eew, sew):
+    """
+    EMUL = (EEW / SEW) * LMUL, in the same domain as LMUL (int if >= 1)
+    """
+    emul = lmul * eew / sew
+    if emul > 8 or emul < 1 / 8:
+        raise ValueError(f"EMUL {emul} of EEW {eew} is out of [1/8, 8] (SEW {sew}, LMUL {lmul}).")
+    return int(emul) if emul >= 1 else emul
+
+def _zext(x, f=2):
+    return x.astype(UINT[x.dtype.itemsize * 8 * f])
+
+def _sext(x, f=2):
+    width = x.dtype.itemsize * 8 * f
+    return _signed(x).astype(SINT[width]).view(UINT[width])
+
+def _narrow(x):
+    return x.astype(UINT[x.dtype.itemsize * 4])  # keep the low SEW bits
+
+def _roundoff(v, d, vxrm):
+    """
+    the rounding increment of (v >> d) by the fixed-point rounding mode vxrm: rnu, rne, rdn, rod
+    """
+    one  = v.dtype.type(1)
+    d1   = np.where(d == 0, 0, d - one).astype(v.dtype)
+    bit  = lambda n: (v >> n) & one
+    rest = lambda n: (v & ((one << n) - one)) != 0      # any of the low n bits is set
+    if vxrm == 0:
+        r = (d > 0) & (bit(d1) == 1)
+    elif vxrm == 1:
+        r = (d > 0) & (bit(d1) == 1) & (rest(d1) | (bit(d) == 1))
+    elif vxrm == 2:
+        r = np.zeros(v.shape, dtype=bool)
+    else:
+        r = (bit(d) == 0) & rest(d)
+    return r.astype(v.dtype)
+
+def _clip(a, b, vxrm, signed):
+    """
+    narrowing fixed-point clip: (vs2 >> shamt) rounded by vxrm, then saturated to SEW
+    will return (result, saturated)
+    """
+    sew = a.dtype.itemsize * 4
+    d   = _shamt(a, b.astype(a.dtype))
+    r   = _roundoff(a, d, vxrm)
+    if signed:
+        v = (_signed(a) >> _signed(d)) + _signed(r)
+        low, high = np.iinfo(SINT[sew]).min, np.iinfo(SINT[sew]).max
+        return np.clip(v, low, high).astype(SINT[sew]).view(UINT[sew]), (v < low) | (v > high)
+    v = (a >> d) + r
+    high = np.iinfo(UINT[sew]).max
+    return np.minimum(v, high).astype(UINT[sew]), v > high
+
+def _mulhu(a, b):
+    sew = a.dtype.itemsize * 8
+    if sew < 64:
+        return ((a.astype(np.uint64) * b.astype(np.uint64)) >> sew).astype(a.dtype)
+
+    # === SEW=64: split to 32b halves, the partial products fit in 64b ===
+    low = np.uint64(0xFFFFFFFF)
+    a0, a1 = a & low, a >> 32
+    b0, b1 = b & low, b >> 32
+    p00, p01, p10, p11 = a0 * b0, a0 * b1, a1 * b0, a1 * b1
+    mid = (p00 >> 32) + (p01 & low) + (p10 & low)
+    return p11 + (p01 >> 32) + (p10 >> 32) + (mid >> 32)
+
+def _mulh(a, b):
+    sew = a.dtype.itemsize * 8
+    if sew < 64:
+        return ((_signed(a).astype(np.int64) * _signed(b).astype(np.int64)) >> sew).astype(a.dtype)
+    return _mulhu(a, b) - np.where(_signed(a) < 0, b, 0) - np.where(_signed(b) < 0, a, 0)
+
+def _mulhsu(a, b):  # signed vs2 * unsigned op1
+    sew = a.dtype.itemsize * 8
+    if sew < 64:
+        return ((_signed(a).astype(np.int64) * b.astype(np.int64)) >> sew).astype(a.dtype)
+    return _mulhu(a, b) - np.where(_signed(a) < 0, b, 0)
+
+def _divu(a, b):
+    return np.where(b == 0, np.iinfo(a.dtype).max, a // np.where(b == 0, 1, b).astype(a.dtype))
+
+def _remu(a, b):
+    return np.where(b == 0, a, a % np.where(b == 0, 1, b).astype(a.dtype))
+
+def _div(a, b):
+    """
+    signed division rounding toward zero
+    NOTE by the magnitudes in unsigned domain, so the overflow (-2^(SEW-1) / -1) wraps to -2^(SEW-1) as rvv
+    """
+    sa, sb = _signed(a) < 0, _signed(b) < 0
+    ua = np.where(sa, 0 - a, a)
+    ub = np.where(sb, 0 - b, b)
+    uq = ua // np.where(b == 0, 1, ub).astype(a.dtype)
+    return np.where(b == 0, np.iinfo(a.dtype).max, np.where(sa ^ sb, 0 - uq, uq))
+
+def _rem(a, b):
+    sa, sb = _signed(a) < 0, _signed(b) < 0
+    ua = np.where(sa, 0 - a, a)
+    ub = np.where(sb, 0 - b, b)
+    ur = ua % np.where(b == 0, 1, ub).astype(a.dtype)
+    return np.where(b == 0, a, np.where(sa, 0 - ur, ur))
+
+
+# op -> (function(vs2, op1, vd), kind)
+VALU_OPS = {
+    # single-width integer add and subtract
+    'vadd':    (lambda a, b, d: a + b, VEC),
+    'vsub':    (lambda a, b, d: a - b, VEC),
+    'vrsub':   (lambda a, b, d: b - a, VEC),
+    # bitwise logical
+    'vand':    (lambda a, b, d: a & b, VEC),
+    'vor':     (lambda a, b, d: a | b, VEC),
+    'vxor':    (lambda a, b, d: a ^ b, VEC),
+    # single-width shift
+    'vsll':    (lambda a, b, d: a << _shamt(a, b), VEC),
+    'vsrl':    (lambda a, b, d: a >> _shamt(a, b), VEC),
+    'vsra':    (lambda a, b, d: (_signed(a) >> _signed(_shamt(a, b))).view(a.dtype), VEC),
+    # integer min/max
+    'vminu':   (lambda a, b, d: np.minimum(a, b), VEC),
+    'vmin':    (lambda a, b, d: np.minimum(_signed(a), _signed(b)).view(a.dtype), VEC),
+    'vmaxu':   (lambda a, b, d: np.maximum(a, b), VEC),
+    'vmax':    (lambda a, b, d: np.maximum(_signed(a), _signed(b)).view(a.dtype), VEC),
+    # single-width integer multiply
+    'vmul':    (lambda a, b, d: a * b, VEC),
+    'vmulh':   (lambda a, b, d: _mulh(a, b), VEC),
+    'vmulhu':  (lambda a, b, d: _mulhu(a, b), VEC),
+    'vmulhsu': (lambda a, b, d: _mulhsu(a, b), VEC),
+    # integer divide
+    'vdivu':   (lambda a, b, d: _divu(a, b), VEC),
+    'vdiv':    (lambda a, b, d: _div(a, b), VEC),
+    'vremu':   (lambda a, b, d: _remu(a, b), VEC),
+    'vrem':    (lambda a, b, d: _rem(a, b), VEC),
+    # single-width integer multiply-add
+    'vmacc':   (lambda a, b, d: b * a + d, MACC),
+    'vnmsac':  (lambda a, b, d: d - b * a, MACC),
+    'vmadd':   (lambda a, b, d: b * d + a, MACC),
+    'vnmsub':  (lambda a, b, d: a - b * d, MACC),
+    # integer compare
+    'vmseq':   (lambda a, b, d: a == b, MASK),
+    'vmsne':   (lambda a, b, d: a != b, MASK),
+    'vmsltu':  (lambda a, b, d: a < b, MASK),
+    'vmslt':   (lambda a, b, d: _signed(a) < _signed(b), MASK),
+    'vmsleu':  (lambda a, b, d: a <= b, MASK),
+    'vmsle':   (lambda a, b, d: _signed(a) <= _signed(b), MASK),
+    'vmsgtu':  (lambda a, b, d: a > b, MASK),
+    'vmsgt':   (lambda a, b, d: _signed(a) > _signed(b), MASK),
+    # integer merge and move
+    'vmerge':  (None, MERGE),
+    'vmv.v':   (lambda a, b, d: b, VEC),
+    # widening integer add/subtract
+    'vwaddu':   (lambda a, b, d: _zext(a) + _zext(b), WIDE),
+    'vwadd':    (lambda a, b, d: _sext(a) + _sext(b), WIDE),
+    'vwsubu':   (lambda a, b, d: _zext(a) - _zext(b), WIDE),
+    'vwsub':    (lambda a, b, d: _sext(a) - _sext(b), WIDE),
+    'vwaddu.w': (lambda a, b, d: a + _zext(b), WIDEW),
+    'vwadd.w':  (lambda a, b, d: a + _sext(b), WIDEW),
+    'vwsubu.w': (lambda a, b, d: a - _zext(b), WIDEW),
+    'vwsub.w':  (lambda a, b, d: a - _sext(b), WIDEW),
+    # widening integer multiply (the 2*SEW product is exact)
+    'vwmulu':   (lambda a, b, d: _zext(a) * _zext(b), WIDE),
+    'vwmul':    (lambda a, b, d: _sext(a) * _sext(b), WIDE),
+    'vwmulsu':  (lambda a, b, d: _sext(a) * _zext(b), WIDE),
+    # widening integer multiply-add
+    'vwmaccu':  (lambda a, b, d: _zext(b) * _zext(a) + d, WMACC),
+    'vwmacc':   (lambda a, b, d: _sext(b) * _sext(a) + d, WMACC),
+    'vwmaccsu': (lambda a, b, d: _sext(b) * _zext(a) + d, WMACC),
+    'vwmaccus': (lambda a, b, d: _zext(b) * _sext(a) + d, WMACC),
+    # narrowing integer right shift
+    'vnsrl':    (lambda a, b, d: _narrow(a >> _shamt(a, b.astype(a.dtype))), NARROW),
+    'vnsra':    (lambda a, b, d: _narrow((_signed(a) >> _signed(_shamt(a, b.astype(a.dtype)))).view(a.dtype)), NARROW),
+    # narrowing fixed-point clip
+    'vnclipu':  (lambda a, b, vxrm: _clip(a, b, vxrm, False), CLIP),
+    'vnclip':   (lambda a, b, vxrm: _clip(a, b, vxrm, True), CLIP),
+    # integer extension
+    'vzext.vf2': (lambda a, b, d: _zext(a, 2), EXT),
+    'vzext.vf4': (lambda a, b, d: _zext(a, 4), EXT),
+    'vzext.vf8': (lambda a, b, d: _zext(a, 8), EXT),
+    'vsext.vf2': (lambda a, b, d: _sext(a, 2), EXT),
+    'vsext.vf4': (lambda a, b, d: _sext(a, 4), EXT),
+    'vsext.vf8': (lambda a, b, d: _sext(a, 8), EXT),
+}
+
+
+class VALU:
+    def __init__(self, vrf, dispatcher, debug=False):
+        """
+        the vector integer arithmetic unit
+        NOTE:
+        (1) the registers are taken from "vrf" as numpy arrays of the current SEW,
+            each instruction is computed on the whole [vstart, vl) body at once
+        (2) vl, vstart, SEW, LMUL, vta and vma are read from the "dispatcher" CSRs
+        (3) the agnostic policy is modelled as overwriting with all 1s
+        (4) the widening/narrowing operands are the register groups of EEW = 2*SEW (or SEW/F of extension),
+            EMUL = (EEW / SEW) * LMUL, they are converted by numpy dtype casts of the whole group
+        """
+        self.vrf        = vrf
+        self.dispatcher = dispatcher
+        self.masku      = MASKU(vrf, dispatcher)
+        self.debug      = debug
+
+    def operand(self, inst, vstart, elen, sew):
+        """
+        the function to get op1 of the instruction in vector-vector, vector-scalar or vector-immediate form
+        NOTE the scalar is truncated to SEW, the immediate is sign-extended simm5 (uimm5 of shifts)
+        """
+        if inst.form == 'vv':
+            return self.vrf.take(inst.vs1, vstart, elen)
+        value = inst.rs1 if inst.form == 'vx' else inst.imm & 0x1F if inst.op in UIMM_OPS else inst.imm
+        return np.full((elen), value & ((1 << sew) - 1), dtype=UINT[sew])
+
+    def execute(self, inst):
+        """
+        the function to execute one integer instruction on the whole register group
+        """
+        function, kind = VALU_OPS[inst.op]
+        sew, lmul, vstart, vl = self.dispatcher.SEW, self.dispatcher.LMUL, self.dispatcher.vstart, self.dispatcher.vl
+        elen = vl - vstart
+        if elen <= 0:
+            return
+
+        # === EEW/EMUL of vs2 and vd ===
+        vs2_eew = 2 * sew if kind in (WIDEW, NARROW, CLIP) else sew // int(inst.op[-1]) if kind == EXT else sew
+        vd_eew  = 2 * sew if kind in (WIDE, WIDEW, WMACC) else sew
+        if max(vs2_eew, vd_eew) > 64 or vs2_eew < 8:
+            raise ValueError(f"VALU: {inst.op} is not supported at SEW {sew}.")
+        vs2_emul, vd_emul = _emul(lmul, vs2_eew, sew), _emul(lmul, vd_eew, sew)
+
+        self.vrf.vset(sew, lmul)
+        vs2  = self.vrf.take(inst.vs2, vstart, elen, vs2_eew, vs2_emul)
+        op1  = None if kind == EXT else self.operand(inst, vstart, elen, sew)
+        mask = self.masku.predicate(0 if kind == MERGE else inst.vm, vstart, vl)
+        self.debug and print(f"VALU {inst.op}.{inst.form} vd: {inst.vd}, vstart: {vstart}, vl: {vl}, SEW: {sew}")
+
+        # === mask destination: the masked-off bits are undisturbed ===
+        if kind == MASK:
+            result = function(vs2, op1, None)
+            self.masku.write_mask(inst.vd, vstart, vl, result, mask)
+            return
+
+        # === vector destination ===
+        old = kind in (MACC, WMACC) or (mask is not None and not self.dispatcher.vma)
+        vd  = self.vrf.take(inst.vd, vstart, elen, vd_eew, vd_emul) if old else None
+        if kind == MERGE:
+            result = np.where(mask, op1, vs2)
+        else:
+            if kind == CLIP:
+                result, saturated = function(vs2, op1, self.dispatcher.vxrm)
+                self.dispatcher.vxsat |= int(np.any(saturated if mask is None else saturated & mask))
+            else:
+                result = function(vs2, op1, vd)
+            if mask is not None:
+                result = np.where(mask, result, np.iinfo(UINT[vd_eew]).max if self.dispatcher.vma else vd)
+        self.vrf.load(inst.vd, vstart, elen, result, vd_eew, vd_emul)
+
+        # === tail agnostic ===
+        self.masku.tail_agnostic(inst.vd, vl, vd_eew, vd_emul)
+
+
+if __name__ == "__main__":
+    print("===== VALU testbench =====")
+    print("version: 2025.06.16")
+
+    from vrf import VRF
+    from dispatcher import DISPATCHER
+    from vinst import VInst
+
+    vrf        = VRF()
+    dispatcher = DISPATCHER()
+    valu       = VALU(vrf, dispatcher)
+
+    for sew in [8, 16, 32, 64]:
+        dispatcher.decodeInst(VInst('vset', rs1=8, sew=sew, lmul=1))
+        vrf.vset(sew, 1)
+        vrf.load(1, 0, 8, np.array([0, 1, 2, 3, -4, -3, -2, -1]).astype(UINT[sew]))
+        vrf.load(2, 0, 8, np.array([3, 3, 0, -1, 2, -1, 0, -1]).astype(UINT[sew]))
+        for op in ['vadd', 'vmul', 'vmulh', 'vdiv', 'vrem', 'vdivu']:
+            valu.execute(VInst(op, vd=3, vs2=1, vs1=2, form='vv'))
+            print(f"SEW {sew:2} {op:6}:", vrf.take(3, 0, 8).view(SINT[sew]))
+
+    # === int8 -> int32 accumulation: vwmul (e8 -> e16), then vsext.vf2 to e32 ===
+    dispatcher.decodeInst(VInst('vset', rs1=8, sew=8, lmul=1))
+    vrf.vset(8, 1)
+    vrf.load(1, 0, 8, np.array([127, -128, 5, -7, 100, 0, -1, 64]).astype(UINT[8]))
+    vrf.load(2, 0, 8, np.array([127, -128, -3, 9, 100, 77, -1, 2]).astype(UINT[8]))
+    valu.execute(VInst('vwmul', vd=4, vs2=1, vs1=2, form='vv'))
+    print("e8  vwmul    :", vrf.take(4, 0, 8, 16, 2).view(SINT[16]))
+    dispatcher.decodeInst(VInst('vset', rs1=8, sew=32, lmul=4))
+    valu.execute(VInst('vsext.vf2', vd=8, vs2=4, form='vv'))
+    print("e32 vsext.vf2:", vrf.take(8, 0, 8, 32, 4).view(SINT[32]))
+    dispatcher.decodeInst(VInst('vset', rs1=8, sew=16, lmul=2))
+    valu.execute(VInst('vnclip', vd=12, vs2=8, imm=4, form='vi'))
+    print("e16 vnclip   :", vrf.take(12, 0, 8, 16, 2).view(SINT[16]), "vxsat:", dispatcher.vxsat)
@@ -0,0 +1,133 @@
+from fractions import Fraction
+
+# @ global variables
+# op -> C code template of the RTL flow, see VInst.capi()
+CAPI_FORMAT = {
+    'vset':   'VSET({rs1}, e{sew}, {lmul});',
+    'vstart': 'write_csr(vstart, {imm});',
+    'frm':    'write_csr(frm, {imm});',
+    'vxrm':   'write_csr(vxrm, {imm});',
+    'vle':    'asm volatile("vle{sew}.v v{vd}, (%0)" ::"r"((uint{sew}_t*){rs1}));',
+    'vse':    'asm volatile("vse{sew}.v v{vd}, (%0)" ::"r"((uint{sew}_t*){rs1}));',
+    'vlse':   'asm volatile("vlse{sew}.v v{vd}, (%0), %1" ::"r"((uint{sew}_t*){rs1}), "r"({rs2}));',
+    'vsse':   'asm volatile("vsse{sew}.v v{vd}, (%0), %1" ::"r"((uint{sew}_t*){rs1}), "r"({rs2}));',
+    'vluxei': 'asm volatile("vluxei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vloxei': 'asm volatile("vloxei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vsuxei': 'asm volatile("vsuxei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vsoxei': 'asm volatile("vsoxei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vlseg':  'asm volatile("vlseg{nf}e{sew}.v v{vd}, (%0)" ::"r"((uint{sew}_t*){rs1}));',
+    'vsseg':  'asm volatile("vsseg{nf}e{sew}.v v{vd}, (%0)" ::"r"((uint{sew}_t*){rs1}));',
+    'vlsseg': 'asm volatile("vlsseg{nf}e{sew}.v v{vd}, (%0), %1" ::"r"((uint{sew}_t*){rs1}), "r"({rs2}));',
+    'vssseg': 'asm volatile("vssseg{nf}e{sew}.v v{vd}, (%0), %1" ::"r"((uint{sew}_t*){rs1}), "r"({rs2}));',
+    'vluxseg': 'asm volatile("vluxseg{nf}ei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vloxseg': 'asm volatile("vloxseg{nf}ei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vsuxseg': 'asm volatile("vsuxseg{nf}ei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+    'vsoxseg': 'asm volatile("vsoxseg{nf}ei{sew}.v v{vd}, (%0), v{vs2}" ::"r"({rs1}));',
+}
+
+
+class VInst:
+    """
+    the typed instruction of the simulator, an opcode plus operands
+    NOTE:
+    (1) "op" is the mnemonic without EEW/form suffix: 'vset', 'vstart', 'vle', 'vse', ...
+    (2) "vd" is the destination, and the store data source (vs3) of stores
+    (3) "rs1" / "rs2" are scalar operand values (not register index): AVL of vset, base address / byte stride of load/store
+    (4) "imm" is the immediate operand, e.g. the value written to vstart
+    (5) "form" is the operand form of arithmetic: 'vv' (vs1), 'vx' (rs1), 'vi' (imm), 'vf' (rs1 of f register)
+    (6) "sew" / "lmul" are in true value domain, "sew" is the EEW of load/store (the index EEW of indexed load/store)
+    (7) "nf" is the number of fields of segment load/store, the fields are vd, vd + EMUL, vd + 2*EMUL, ...
+    """
+    __slots__ = ('op', 'vd', 'vs1', 'vs2', 'rs1', 'rs2', 'imm', 'vm', 'form', 'sew', 'lmul', 'ta', 'ma', 'nf')
+
+    def __init__(self, op, vd=0, vs1=0, vs2=0, rs1=0, rs2=0, imm=0, vm=1, form=None, sew=8, lmul=1, ta=0, ma=0, nf=1):
+        self.op   = op
+        self.vd   = vd
+        self.vs1  = vs1
+        self.vs2  = vs2
+        self.rs1  = rs1
+        self.rs2  = rs2
+        self.imm  = imm
+        self.vm   = vm
+        self.form = form
+        self.sew  = sew
+        self.lmul = lmul
+        self.ta   = ta
+        self.ma   = ma
+        self.nf   = nf
+
+    def __repr__(self):
+        """
+        the asm rendering, only used for trace and debug
+        """
+        if self.op == 'vset':
+            return f"vsetvli x{self.vd}, {self.rs1}, e{self.sew}, {self.lmul_name()}, {'ta' if self.ta else 'tu'}, {'ma' if self.ma else 'mu'}"
+        if self.op in ('vstart', 'frm', 'vxrm'):
+            return f"csrwi {self.op}, {self.imm}"
+        if self.op in ('vle', 'vse'):
+            return f"{self.op}{self.sew}.v v{self.vd}, (0x{self.rs1:X}){'' if self.vm else ', v0.t'}"
+        if self.op in ('vlse', 'vsse'):
+            return f"{self.op}{self.sew}.v v{self.vd}, (0x{self.rs1:X}), {self.rs2}{'' if self.vm else ', v0.t'}"
+        if self.op in ('vluxei', 'vloxei', 'vsuxei', 'vsoxei'):
+            return f"{self.op}{self.sew}.v v{self.vd}, (0x{self.rs1:X}), v{self.vs2}{'' if self.vm else ', v0.t'}"
+        if self.op in ('vlseg', 'vsseg', 'vlsseg', 'vssseg'):
+            stride = f", {self.rs2}" if self.op in ('vlsseg', 'vssseg') else ""
+            return f"{self.op}{self.nf}e{self.sew}.v v{self.vd}, (0x{self.rs1:X}){stride}{'' if self.vm else ', v0.t'}"
+        if self.op in ('vluxseg', 'vloxseg', 'vsuxseg', 'vsoxseg'):
+            return f"{self.op}{self.nf}ei{self.sew}.v v{self.vd}, (0x{self.rs1:X}), v{self.vs2}{'' if self.vm else ', v0.t'}"
+        op1 = {'vx': f"0x{self.rs1:X}", 'vi': f"{self.imm}", 'vf': f"{self.rs1}"}.get(self.form, f"v{self.vs1}")
+        return f"{self.op}.{self.form} v{self.vd}, v{self.vs2}, {op1}{'' if self.vm else ', v0.t'}"
+
+    def lmul_name(self):
+        lmul = Fraction(self.lmul).limit_denominator(8)
+        return f"m{lmul}" if lmul >= 1 else f"mf{lmul.denominator}"
+
+    def capi(self):
+        """
+        the function to serialize the instruction to the VPU C code which run in RTL
+        """
+        if self.op not in CAPI_FORMAT:
+            raise ValueError(f"Unsupported instruction type: {self.op}")
+        return CAPI_FORMAT[self.op].format(vd=self.vd, vs2=self.vs2, rs1=self.rs1, rs2=self.rs2, imm=self.imm, sew=self.sew,
+                                           lmul=self.lmul_name(), nf=self.nf)
+
+
+# === constructors of the generator ===
+def vset(vl, sew, lmul):
+    return VInst('vset', rs1=vl, sew=sew, lmul=lmul)
+
+def vstart(value):
+    return VInst('vstart', imm=value)
+
+def vle(sew, vd, base_addr):
+    return VInst('vle', vd=vd, rs1=base_addr, sew=sew)
+
+def vse(sew, vs, base_addr):
+    return VInst('vse', vd=vs, rs1=base_addr, sew=sew)
+
+def vlse(sew, vd, base_addr, stride):
+    return VInst('vlse', vd=vd, rs1=base_addr, rs2=stride, sew=sew)
+
+def vsse(sew, vs, base_addr, stride):
+    return VInst('vsse', vd=vs, rs1=base_addr, rs2=stride, sew=sew)
+
+def vlseg(nf, sew, vd, base_addr):
+    return VInst('vlseg', vd=vd, rs1=base_addr, sew=sew, nf=nf)
+
+def vsseg(nf, sew, vs, base_addr):
+    return VInst('vsseg', vd=vs, rs1=base_addr, sew=sew, nf=nf)
+
+def vloxei(eew, vd, base_addr, vs2):
+    return VInst('vloxei', vd=vd, vs2=vs2, rs1=base_addr, sew=eew)
+
+def vsoxei(eew, vs, base_addr, vs2):
+    return VInst('vsoxei', vd=vs, vs2=vs2, rs1=base_addr, sew=eew)
+
+
+if __name__ == "__main__":
+    print("===== vinst testbench =====")
+    print("version: 2025.06.03")
+
+    for inst in [vset(160, 8, 8), vstart(8), vle(8, 2, 0xE0000000), vse(8, 2, 0xE0000000), vset(16, 16, 1/2),
+                 vlse(32, 4, 0xE0000000, 64), vloxei(16, 4, 0xE0000000, 8), vlseg(3, 8, 4, 0xE0000000)]:
+        print(f"{inst!r:40} -> {inst.capi()}")
@@ -0,0 +1,473 @@
+import numpy as np
+from fractions import Fraction
+
+from valu import UINT, SINT, VEC, MACC, MASK, MERGE
+from masku import MASKU
+
+# @ global variables
+FTYPE = {16: np.dtype('<f2'), 32: np.dtype('<f4'), 64: np.dtype('<f8')}
+CANONICAL_NAN = {16: 0x7E00, 32: 0x7FC00000, 64: 0x7FF8000000000000}
+
+# frm: rounding mode
+RNE = 0  # round to nearest, ties to even
+RTZ = 1  # round towards zero
+RDN = 2  # round down (towards -inf)
+RUP = 3  # round up (towards +inf)
+RMM = 4  # round to nearest, ties to max magnitude
+
+# fflags: accrued exception flags
+NX = 1   # inexact
+UF = 2   # underflow
+OF = 4   # overflow
+DZ = 8   # divide by zero
+NV = 16  # invalid operation
+
+
+# === error-free transforms in float64 ===
+def _two_sum(a, b):
+    """
+    a + b = s + e exactly
+    """
+    s  = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+def _split(a):
+    c = 134217729.0 * a  # 2^27 + 1, Veltkamp split
+    ah = c - (c - a)
+    return ah, a - ah
+
+def _two_prod(a, b):
+    """
+    a * b = p + e exactly (the product of two <=24b mantissas is already exact, e = 0)
+    """
+    p = a * b
+    ah, al = _split(a)
+    bh, bl = _split(b)
+    return p, ((ah * bh - p) + ah * bl + al * bh) + al * bl
+
+def _sign_rel(d, h, lo, lo2):
+    """
+    sign of (d - h + lo + lo2)
+    NOTE "d - h" is exact, lo2 is below the half ulp of lo, so lo2 only breaks the tie of (d - h + lo == 0)
+    """
+    x = (d - h) + lo
+    return np.where(x != 0, np.sign(x), np.sign(lo2))
+
+def _extreme(inputs, derived):
+    """
+    the elements of finite non-zero "inputs" that any of inputs/derived values is out of [2^-960, 2^960],
+    where the float64 transforms above may lose bits (the split overflows, or the error term is subnormal)
+    NOTE only SEW=64 can reach there, the float64 intermediates of SEW=16/32 are far from the limits
+    """
+    valid  = np.logical_and.reduce([np.isfinite(x) & (x != 0) for x in inputs])
+    unsafe = np.zeros(valid.shape, dtype=bool)
+    for x in inputs + derived:
+        ax = np.abs(x)
+        unsafe |= (ax < 2.0 ** -960) | (ax > 2.0 ** 960)
+    return valid & unsafe
+
+
+# === rounding and exception flags ===
+def _is_snan(x):
+    sew   = x.dtype.itemsize * 8
+    quiet = 1 << (np.finfo(x.dtype).nmant - 1)
+    return np.isnan(x) & ((x.view(UINT[sew]) & quiet) == 0)
+
+def _invalid(result, *inputs):
+    """
+    NV: a NaN is produced from non-NaN inputs, or any input is a signaling NaN
+    """
+    nan_in = np.zeros(result.shape, dtype=bool)
+    snan   = np.zeros(result.shape, dtype=bool)
+    for x in inputs:
+        nan_in |= np.isnan(x)
+        snan   |= _is_snan(x)
+    return (np.isnan(result) & ~nan_in) | snan
+
+def _round(hi, lo, lo2, ftype, frm, finite):
+    """
+    the function to round the exact value (hi + lo + lo2) to "ftype" with rounding mode "frm"
+    will return (result, fflags)
+    NOTE:
+    (1) hi/lo/lo2 are float64 from the error-free transforms, hi is close to the exact value
+    (2) the RNE rounding of numpy is the start point, then it steps one ulp (nextafter)
+        towards the exact value if the mode or a midpoint case asks for it,
+        so the double rounding (float64 -> float32/16) is also corrected
+    (3) "finite" is the element whose operands are all finite, an infinite result of them is an overflow
+    """
+    n   = hi.astype(ftype)
+    n64 = n.astype(np.float64)
+    d   = hi - n64
+    toward = _sign_rel(d, 0, lo, lo2)                     # sign of (exact - n)
+    toward = np.where(np.isfinite(n), toward, 0)
+    m = np.nextafter(n, np.where(toward > 0, np.inf, -np.inf).astype(ftype))
+
+    if frm == RNE or frm == RMM:
+        half = (m.astype(np.float64) - n64) / 2
+        tie  = _sign_rel(d, half, lo, lo2) * toward       # > 0: beyond the midpoint, 0: at the midpoint
+        if frm == RNE:
+            even = (m.view(UINT[ftype.itemsize * 8]) & 1) == 0
+        else:
+            even = np.abs(m) > np.abs(n)
+        step = (toward != 0) & ((tie > 0) | ((tie == 0) & even))
+    elif frm == RTZ:
+        step = toward * np.sign(n64) < 0
+    elif frm == RDN:
+        step = toward < 0
+    elif frm == RUP:
+        step = toward > 0
+    else:
+        raise ValueError(f"Invalid frm value {frm}.")
+    result = np.where(step, m, n)
+
+    # === overflow: the rounding mode decides inf or the largest finite value ===
+    overflow = np.isinf(n) & finite
+    maxf     = np.finfo(ftype).max
+    negative = np.signbit(n)
+    if frm == RTZ:
+        result = np.where(overflow, np.where(negative, -maxf, maxf), result)
+    elif frm == RDN:
+        result = np.where(overflow & ~negative, maxf, result)
+    elif frm == RUP:
+        result = np.where(overflow & negative, -maxf, result)
+    overflow |= np.isinf(result) & finite
+
+    inexact = (toward != 0) | overflow
+    tiny    = inexact & (np.abs(result) < np.finfo(ftype).tiny)
+    flags   = NX * inexact | UF * tiny | OF * overflow
+    return result.astype(ftype), flags.astype(np.uint8)
+
+def _finish(hi, lo, lo2, ftype, frm, *inputs, exact=True):
+    """
+    NOTE "exact" is False for the elements whose exact result is infinite (e.g. divide by zero)
+    """
+    finite = np.logical_and.reduce([np.isfinite(x) for x in inputs]) & exact
+    result, flags = _round(hi, lo, lo2, ftype, frm, finite)
+    return result, flags | NV * _invalid(result, *inputs)
+
+def _round_fraction(x, frm):
+    """
+    the function to round the rational "x" to float64 with rounding mode "frm"
+    will return (result, fflags)
+    """
+    if x == 0:
+        return (-0.0 if frm == RDN else 0.0), 0  # an exact zero of non-zero addends
+    sign = -1.0 if x < 0 else 1.0
+    ax   = abs(x)
+    maxf = float(np.finfo(np.float64).max)
+    try:
+        n = float(ax)                                   # correctly rounded, RNE
+    except OverflowError:
+        n = np.inf
+    if np.isinf(n):
+        big = frm in (RNE, RMM) or (frm == RDN and sign < 0) or (frm == RUP and sign > 0)
+        return sign * (np.inf if big else maxf), NX | OF
+    if Fraction(n) == ax:
+        return sign * n, 0
+
+    low, high = (n, float(np.nextafter(n, np.inf))) if Fraction(n) < ax else (float(np.nextafter(n, 0.0)), n)
+    if frm == RTZ:
+        n = low
+    elif frm == RDN:
+        n = low if sign > 0 else high
+    elif frm == RUP:
+        n = high if sign > 0 else low
+    elif frm == RMM and 2 * ax == Fraction(low) + Fraction(high):
+        n = high
+    flags = NX | (OF if np.isinf(n) else 0) | (UF if n < np.finfo(np.float64).tiny else 0)
+    return sign * n, flags
+
+def _exact_fix(result, flags, unsafe, frm, function, *inputs):
+    """
+    the function to recompute the "unsafe" elements by rational arithmetic, in place
+    """
+    for i in np.flatnonzero(unsafe):
+        result[i], flags[i] = _round_fraction(function(*(Fraction(float(x[i])) for x in inputs)), frm)
+    return result, flags
+
+def _rdn_zero(result, exact_zero, a, b, frm):
+    """
+    the exact zero sum is +0 except both addends are -0, but is -0 except both addends are +0 in RDN
+    """
+    if frm != RDN:
+        return result
+    both_positive = (a == 0) & (b == 0) & ~np.signbit(a) & ~np.signbit(b)
+    return np.where(exact_zero & ~both_positive, -np.zeros((), result.dtype), result)
+
+
+# === floating-point operations, operands are float arrays of SEW ===
+def _fadd(a, b, frm):
+    a64, b64 = a.astype(np.float64), b.astype(np.float64)
+    hi, lo = _two_sum(a64, b64)
+    result, flags = _finish(hi, lo, 0.0, a.dtype, frm, a, b)
+    return _rdn_zero(result, (hi == 0) & (lo == 0), a64, b64, frm), flags
+
+def _fmul(a, b, frm):
+    a64, b64 = a.astype(np.float64), b.astype(np.float64)
+    hi, lo = _two_prod(a64, b64)
+    result, flags = _finish(hi, lo, 0.0, a.dtype, frm, a, b)
+    return _exact_fix(result, flags, _extreme([a64, b64], [hi]), frm, lambda x, y: x * y, a64, b64)
+
+def _fdiv(a, b, frm):
+    a64, b64 = a.astype(np.float64), b.astype(np.float64)
+    q = a64 / b64
+    p, e = _two_prod(q, b64)
+    remainder = (a64 - p) - e                           # exact
+    lo = np.where(np.isfinite(q) & (b64 != 0), remainder / b64, 0.0)
+    result, flags = _finish(q, lo, 0.0, a.dtype, frm, a, b, exact=b != 0)
+    divzero = (b == 0) & np.isfinite(a) & (a != 0)
+    result, flags = _exact_fix(result, flags, _extreme([a64, b64], [q]), frm, lambda x, y: x / y, a64, b64)
+    return result, flags | DZ * divzero
+
+def _fsqrt(a, frm):
+    """
+    NOTE the extreme operand is scaled by an even power of 2 and the root is scaled back,
+         both are exact since the root of any float64 is a normal number
+    """
+    a64   = a.astype(np.float64)
+    scale = np.where(_extreme([a64], []), np.where(np.abs(a64) < 1, 200, -200), 0)
+    a64   = np.ldexp(a64, scale)
+    s = np.sqrt(a64)
+    p, e = _two_prod(s, s)
+    remainder = (a64 - p) - e                           # exact
+    lo = np.where(np.isfinite(s) & (s != 0), remainder / (2 * s), 0.0)
+    result, flags = _finish(s, lo, 0.0, a.dtype, frm, a)
+    return np.ldexp(result, -scale // 2).astype(a.dtype), flags
+
+def _fma(x, y, z, frm):
+    """
+    x * y + z with a single rounding
+    NOTE the exact value is kept as hi + lo + lo2 (float64 TwoProduct, then the three-term sum by TwoSum)
+    """
+    x64, y64, z64 = x.astype(np.float64), y.astype(np.float64), z.astype(np.float64)
+    p, e    = _two_prod(x64, y64)
+    s1, t1  = _two_sum(p, z64)
+    u, v    = _two_sum(t1, e)
+    hi, w   = _two_sum(s1, u)
+    lo, lo2 = _two_sum(w, v)
+    result, flags = _finish(hi, lo, lo2, x.dtype, frm, x, y, z)
+    invalid = np.isinf(x) & (y == 0) | (x == 0) & np.isinf(y)  # inf * 0 + qNaN
+    result  = _rdn_zero(result, (hi == 0) & (lo == 0) & (lo2 == 0), p, z64, frm)
+    unsafe  = _extreme([x64, y64], [p, hi]) & np.isfinite(z64)
+    result, flags = _exact_fix(result, flags, unsafe, frm, lambda a, b, c: a * b + c, x64, y64, z64)
+    return result, flags | NV * invalid
+
+def _fminmax(a, b, maximum):
+    """
+    IEEE 754-2019 minimumNumber / maximumNumber: a NaN operand is ignored, -0 < +0
+    """
+    sew  = a.dtype.itemsize * 8
+    bits = (a.view(UINT[sew]) & b.view(UINT[sew])) if maximum else (a.view(UINT[sew]) | b.view(UINT[sew]))
+    result = np.fmax(a, b) if maximum else np.fmin(a, b)
+    result = np.where((a == 0) & (b == 0), bits.view(a.dtype), result)
+    return result, (NV * (_is_snan(a) | _is_snan(b))).astype(np.uint8)
+
+def _fsgnj(a, b, mode):
+    sew  = a.dtype.itemsize * 8
+    sign = UINT[sew].type(1 << (sew - 1))
+    ua, ub = a.view(UINT[sew]), b.view(UINT[sew])
+    if mode == 'n':
+        ub = ~ub
+    elif mode == 'x':
+        ub = ua ^ ub
+    return ((ua & ~sign) | (ub & sign)).view(a.dtype), np.zeros(a.shape, dtype=np.uint8)
+
+def _fcmp(result, a, b, signaling):
+    nan = (np.isnan(a) | np.isnan(b)) if signaling else (_is_snan(a) | _is_snan(b))
+    return result, (NV * nan).astype(np.uint8)
+
+def _fclass(a):
+    """
+    bit 0~9: -inf, -normal, -subnormal, -0, +0, +subnormal, +normal, +inf, sNaN, qNaN
+    """
+    sew = a.dtype.itemsize * 8
+    neg, absolute = np.signbit(a), np.abs(a)
+    normal, zero, inf = absolute >= np.finfo(a.dtype).tiny, a == 0, np.isinf(a)
+    subnormal = ~normal & ~zero & ~np.isnan(a)
+    normal &= ~inf
+    bit = np.select([inf & neg, normal & neg, subnormal & neg, zero & neg,
+                     zero & ~neg, subnormal & ~neg, normal & ~neg, inf & ~neg, _is_snan(a)],
+                    [0, 1, 2, 3, 4, 5, 6, 7, 8], 9)
+    return (1 << bit).astype(UINT[sew]), np.zeros(a.shape, dtype=np.uint8)
+
+def _f2i(a, frm, signed):
+    """
+    float to integer with saturation, NaN is converted to the largest integer
+    """
+    sew = a.dtype.itemsize * 8
+    x = a.astype(np.float64)
+    if frm == RMM:
+        t = np.trunc(x)
+        r = np.where(np.abs(x - t) >= 0.5, t + np.sign(x), t)
+    else:
+        r = {RNE: np.rint, RTZ: np.trunc, RDN: np.floor, RUP: np.ceil}[frm](x)
+
+    low, high = (-2.0 ** (sew - 1), 2.0 ** (sew - 1)) if signed else (0.0, 2.0 ** sew)
+    over  = (r >= high) | np.isnan(x)
+    under = r < low
+    itype = np.int64 if signed else np.uint64
+    value = np.where(over | under, 0, r).astype(itype)
+    value = np.where(over, np.iinfo(SINT[sew] if signed else UINT[sew]).max, value)
+    value = np.where(under, np.iinfo(SINT[sew] if signed else UINT[sew]).min, value)
+    invalid = over | under
+    flags = NV * invalid | NX * (~invalid & (r != x))
+    return value.astype(UINT[sew]), flags.astype(np.uint8)
+
+def _i2f(a, frm, signed):
+    """
+    integer to float, the integer is split to two exact float64 halves
+    """
+    sew = a.dtype.itemsize * 8
+    x  = a.view(UINT[sew]).view(SINT[sew]).astype(np.int64) if signed else a.view(UINT[sew]).astype(np.uint64)
+    xh = (x >> 32) << 32
+    hi, lo = _two_sum(xh.astype(np.float64), (x - xh).astype(np.float64))
+    return _round(hi, lo, 0.0, a.dtype, frm, np.ones(a.shape, dtype=bool))
+
+
+# op -> (function(vs2, op1, vd, frm), kind)
+VMFPU_OPS = {
+    # single-width floating-point add/subtract
+    'vfadd':    (lambda a, b, d, frm: _fadd(a, b, frm), VEC),
+    'vfsub':    (lambda a, b, d, frm: _fadd(a, -b, frm), VEC),
+    'vfrsub':   (lambda a, b, d, frm: _fadd(b, -a, frm), VEC),
+    # single-width floating-point multiply/divide
+    'vfmul':    (lambda a, b, d, frm: _fmul(a, b, frm), VEC),
+    'vfdiv':    (lambda a, b, d, frm: _fdiv(a, b, frm), VEC),
+    'vfrdiv':   (lambda a, b, d, frm: _fdiv(b, a, frm), VEC),
+    # single-width floating-point fused multiply-add
+    'vfmacc':   (lambda a, b, d, frm: _fma( b, a,  d, frm), MACC),
+    'vfnmacc':  (lambda a, b, d, frm: _fma(-b, a, -d, frm), MACC),
+    'vfmsac':   (lambda a, b, d, frm: _fma( b, a, -d, frm), MACC),
+    'vfnmsac':  (lambda a, b, d, frm: _fma(-b, a,  d, frm), MACC),
+    'vfmadd':   (lambda a, b, d, frm: _fma( b, d,  a, frm), MACC),
+    'vfnmadd':  (lambda a, b, d, frm: _fma(-b, d, -a, frm), MACC),
+    'vfmsub':   (lambda a, b, d, frm: _fma( b, d, -a, frm), MACC),
+    'vfnmsub':  (lambda a, b, d, frm: _fma(-b, d,  a, frm), MACC),
+    # floating-point square-root
+    'vfsqrt':   (lambda a, b, d, frm: _fsqrt(a, frm), VEC),
+    # floating-point min/max
+    'vfmin':    (lambda a, b, d, frm: _fminmax(a, b, False), VEC),
+    'vfmax':    (lambda a, b, d, frm: _fminmax(a, b, True), VEC),
+    # floating-point sign-injection
+    'vfsgnj':   (lambda a, b, d, frm: _fsgnj(a, b, ''), VEC),
+    'vfsgnjn':  (lambda a, b, d, frm: _fsgnj(a, b, 'n'), VEC),
+    'vfsgnjx':  (lambda a, b, d, frm: _fsgnj(a, b, 'x'), VEC),
+    # floating-point compare
+    'vmfeq':    (lambda a, b, d, frm: _fcmp(a == b, a, b, False), MASK),
+    'vmfne':    (lambda a, b, d, frm: _fcmp(a != b, a, b, False), MASK),
+    'vmflt':    (lambda a, b, d, frm: _fcmp(a < b,  a, b, True), MASK),
+    'vmfle':    (lambda a, b, d, frm: _fcmp(a <= b, a, b, True), MASK),
+    'vmfgt':    (lambda a, b, d, frm: _fcmp(a > b,  a, b, True), MASK),
+    'vmfge':    (lambda a, b, d, frm: _fcmp(a >= b, a, b, True), MASK),
+    # floating-point classify
+    'vfclass':  (lambda a, b, d, frm: _fclass(a), VEC),
+    # single-width floating-point/integer type-convert
+    'vfcvt.xu.f.v':     (lambda a, b, d, frm: _f2i(a, frm, False), VEC),
+    'vfcvt.x.f.v':      (lambda a, b, d, frm: _f2i(a, frm, True), VEC),
+    'vfcvt.rtz.xu.f.v': (lambda a, b, d, frm: _f2i(a, RTZ, False), VEC),
+    'vfcvt.rtz.x.f.v':  (lambda a, b, d, frm: _f2i(a, RTZ, True), VEC),
+    'vfcvt.f.xu.v':     (lambda a, b, d, frm: _i2f(a, frm, False), VEC),
+    'vfcvt.f.x.v':      (lambda a, b, d, frm: _i2f(a, frm, True), VEC),
+    # floating-point merge and move
+    'vfmerge':  (None, MERGE),
+    'vfmv.v.f': (lambda a, b, d, frm: (b, np.zeros(b.shape, dtype=np.uint8)), VEC),
+}
+
+# the ops which only take vs2 (vs1 is the sub-opcode)
+FP_UNARY = {'vfsqrt', 'vfclass', 'vfcvt.xu.f.v', 'vfcvt.x.f.v', 'vfcvt.rtz.xu.f.v', 'vfcvt.rtz.x.f.v', 'vfcvt.f.xu.v', 'vfcvt.f.x.v'}
+# the ops which move the bits (sign-injection, merge, move), their NaN is not canonicalized
+FP_MOVE = {'vfsgnj', 'vfsgnjn', 'vfsgnjx', 'vfmerge', 'vfmv.v.f'}
+
+
+class VMFPU:
+    def __init__(self, vrf, dispatcher, debug=False):
+        """
+        the vector floating-point unit (SEW = 16, 32, 64)
+        NOTE:
+        (1) the registers are taken from "vrf" as numpy float views of SEW,
+            each instruction is computed on the whole [vstart, vl) body at once
+        (2) the result is rounded by "dispatcher.frm", the exception flags are accrued to "dispatcher.fflags"
+            (only the active elements raise flags)
+        (3) the NaN result of the arithmetic ops is the canonical NaN, FP_MOVE keeps the NaN bits, the agnostic policy is modelled as overwriting with all 1s
+        """
+        self.vrf        = vrf
+        self.dispatcher = dispatcher
+        self.masku      = MASKU(vrf, dispatcher)
+        self.debug      = debug
+
+    def operand(self, inst, vstart, elen, sew):
+        """
+        the function to get op1 of the instruction in vector-vector or vector-scalar(f register) form
+        """
+        if inst.form == 'vv':
+            return self.vrf.take(inst.vs1, vstart, elen).view(FTYPE[sew])
+        return np.full((elen), inst.rs1, dtype=np.float64).astype(FTYPE[sew])
+
+    def execute(self, inst):
+        """
+        the function to execute one floating-point instruction on the whole register group
+        """
+        function, kind = VMFPU_OPS[inst.op]
+        sew, vstart, vl = self.dispatcher.SEW, self.dispatcher.vstart, self.dispatcher.vl
+        if sew not in FTYPE:
+            raise ValueError(f"VMFPU: SEW {sew} is not a floating-point width, must be one of [16, 32, 64].")
+        elen = vl - vstart
+        if elen <= 0:
+            return
+
+        ftype = FTYPE[sew]
+        self.vrf.vset(sew, self.dispatcher.LMUL)
+        vs2  = self.vrf.take(inst.vs2, vstart, elen).view(ftype)
+        op1  = None if inst.op in FP_UNARY else self.operand(inst, vstart, elen, sew)
+        mask = self.masku.predicate(0 if kind == MERGE else inst.vm, vstart, vl)
+        vd   = self.vrf.take(inst.vd, vstart, elen) if kind == MACC or (mask is not None and not self.dispatcher.vma) else None
+        self.debug and print(f"VMFPU {inst.op}.{inst.form} vd: {inst.vd}, vstart: {vstart}, vl: {vl}, SEW: {sew}, frm: {self.dispatcher.frm}")
+
+        if kind == MERGE:
+            result = np.where(mask, op1, vs2)
+        else:
+            with np.errstate(all='ignore'):
+                result, flags = function(vs2, op1, None if vd is None else vd.view(ftype), self.dispatcher.frm)
+            self.dispatcher.fflags |= int(np.bitwise_or.reduce(flags if mask is None else flags[mask], initial=0))
+
+        # === mask destination: the masked-off bits are undisturbed ===
+        if kind == MASK:
+            self.masku.write_mask(inst.vd, vstart, vl, result, mask)
+            return
+
+        # === vector destination ===
+        if result.dtype == ftype and inst.op in FP_MOVE:
+            result = result.view(UINT[sew])
+        elif result.dtype == ftype:
+            result = np.where(np.isnan(result), UINT[sew].type(CANONICAL_NAN[sew]), result.view(UINT[sew]))
+        if mask is not None and kind != MERGE:
+            result = np.where(mask, result, np.iinfo(UINT[sew]).max if self.dispatcher.vma else vd)
+        self.vrf.load(inst.vd, vstart, elen, result)
+
+        # === tail agnostic ===
+        self.masku.tail_agnostic(inst.vd, vl, sew, self.dispatcher.LMUL)
+
+
+if __name__ == "__main__":
+    print("===== VMFPU testbench =====")
+    print("version: 2025.06.08")
+
+    from vrf import VRF
+    from dispatcher import DISPATCHER
+    from vinst import VInst
+
+    vrf        = VRF()
+    dispatcher = DISPATCHER()
+    vmfpu      = VMFPU(vrf, dispatcher)
+
+    dispatcher.decodeInst(VInst('vset', rs1=8, sew=32, lmul=1))
+    vrf.vset(32, 1)
+    vrf.load(1, 0, 8, np.array([1.0, 1.0, -1.0, 3.0, 1e38, 0.0, np.inf, 2.0], dtype=np.float32).view(np.uint32))
+    vrf.load(2, 0, 8, np.array([2**-24, 3.0, -2**-24, 7.0, 1e38, -0.0, np.inf, 0.0], dtype=np.float32).view(np.uint32))
+    for frm in [RNE, RTZ, RDN, RUP, RMM]:
+        for op in ['vfadd', 'vfdiv']:
+            dispatcher.decodeInst(VInst('frm', imm=frm))
+            dispatcher.fflags = 0
+            vmfpu.execute(VInst(op, vd=3, vs2=1, vs1=2, form='vv'))
+            print(f"frm {frm} {op:6}:", vrf.take(3, 0, 8).view(np.float32), f"fflags: {dispatcher.fflags:05b}")
@@ -0,0 +1,213 @@
+import numpy as np
+
+from valu import UINT, SINT, _signed
+from vmfpu import FTYPE, CANONICAL_NAN, NV, _fadd, _fminmax, _is_snan
+from masku import MASKU
+
+# @ global variables
+# reduction order
+TREE    = 0  # unordered: pairwise tree inside each lane, then a log2(NrLanes) tree across the lanes
+ORDERED = 1  # ordered:   strict sequential in element order, the accumulator walks through the lanes
+
+# element type
+INT = 0
+FP  = 1
+
+
+# op -> (function(a, b, frm) -> (result, fflags), element type, order, widening)
+VRDU_OPS = {
+    # single-width integer reduction
+    'vredsum':    (lambda a, b, frm: (a + b, 0), INT, TREE, False),
+    'vredand':    (lambda a, b, frm: (a & b, 0), INT, TREE, False),
+    'vredor':     (lambda a, b, frm: (a | b, 0), INT, TREE, False),
+    'vredxor':    (lambda a, b, frm: (a ^ b, 0), INT, TREE, False),
+    'vredminu':   (lambda a, b, frm: (np.minimum(a, b), 0), INT, TREE, False),
+    'vredmin':    (lambda a, b, frm: (np.minimum(_signed(a), _signed(b)).view(a.dtype), 0), INT, TREE, False),
+    'vredmaxu':   (lambda a, b, frm: (np.maximum(a, b), 0), INT, TREE, False),
+    'vredmax':    (lambda a, b, frm: (np.maximum(_signed(a), _signed(b)).view(a.dtype), 0), INT, TREE, False),
+    # widening integer reduction
+    'vwredsumu':  (lambda a, b, frm: (a + b, 0), INT, TREE, 'u'),
+    'vwredsum':   (lambda a, b, frm: (a + b, 0), INT, TREE, 's'),
+    # single-width floating-point reduction
+    'vfredusum':  (lambda a, b, frm: _fadd(a, b, frm), FP, TREE, False),
+    'vfredosum':  (lambda a, b, frm: _fadd(a, b, frm), FP, ORDERED, False),
+    'vfredmin':   (lambda a, b, frm: _fminmax(a, b, False), FP, TREE, False),
+    'vfredmax':   (lambda a, b, frm: _fminmax(a, b, True), FP, TREE, False),
+    # widening floating-point reduction
+    'vfwredusum': (lambda a, b, frm: _fadd(a, b, frm), FP, TREE, 'f'),
+    'vfwredosum': (lambda a, b, frm: _fadd(a, b, frm), FP, ORDERED, 'f'),
+}
+
+
+def _log2_steps(n):
+    return int(n - 1).bit_length() if n > 1 else 0
+
+def _tree(x, valid, function, frm):
+    """
+    the pairwise reduction of "x" along the last axis, the invalid (masked-off or padding) elements are skipped
+    will return (result, valid, fflags)
+    NOTE each level combines the neighbour pairs (0, 1), (2, 3), ... of all rows at once
+    """
+    flags = 0
+    while x.shape[-1] > 1:
+        if x.shape[-1] % 2:
+            x     = np.concatenate([x, x[..., :1]], axis=-1)
+            valid = np.concatenate([valid, np.zeros_like(valid[..., :1])], axis=-1)
+        a, b   = x[..., 0::2], x[..., 1::2]
+        va, vb = valid[..., 0::2], valid[..., 1::2]
+        result, flag = function(a, b, frm)
+        both  = va & vb
+        flags |= int(np.bitwise_or.reduce(np.broadcast_to(flag, both.shape)[both], initial=0))
+        x     = np.where(both, result, np.where(va, a, b))
+        valid = va | vb
+    return x[..., 0], valid[..., 0], flags
+
+
+class VRDU:
+    def __init__(self, vrf, dispatcher, debug=False):
+        """
+        the vector reduction unit
+        NOTE:
+        (1) vd[0] = vs1[0] (op) the active elements of vs2 [0, vl), vs1 and vd are single registers
+        (2) the unordered reduction follows the lane structure of "vrf": each lane reduces its own elements
+            by a pairwise tree, then the lane results are reduced by a tree of log2(NrLanes) inter-lane steps,
+            vs1[0] joins at the last step
+        (3) the ordered reduction (vfredosum, vfwredosum) accumulates one element after another from vs1[0],
+            each hand-over to an element in another lane is one inter-lane step
+        (4) the inter-lane steps of the last reduction is "steps", all the reductions are accrued to "inter_lane_steps"
+        """
+        self.vrf        = vrf
+        self.dispatcher = dispatcher
+        self.masku      = MASKU(vrf, dispatcher)
+        self.debug      = debug
+
+        self.steps            = 0
+        self.inter_lane_steps = 0
+
+    def lane_grid(self, x, active, sew, lmul):
+        """
+        the function to place the elements of vs2 to its lane
+        will return (grid, valid, lane) where grid/valid are (NrLanes, elements per lane)
+        """
+        lane  = self.vrf.Lookup_idx(shuffle=True, SEW=sew, LMUL=lmul)[2][:len(x)]
+        count = np.bincount(lane, minlength=self.vrf.NrLanes)
+        order = np.argsort(lane, kind='stable')
+        slot  = np.arange(len(x)) - np.repeat(np.cumsum(count) - count, count)
+
+        grid  = np.zeros((self.vrf.NrLanes, max(int(count.max()), 1)), dtype=x.dtype)
+        valid = np.zeros(grid.shape, dtype=bool)
+        grid[lane[order], slot]  = x[order]
+        valid[lane[order], slot] = active[order]
+        return grid, valid, lane
+
+    def widen(self, x, widening):
+        """
+        the function to extend the vs2 elements to 2*SEW
+        """
+        sew = x.dtype.itemsize * 8
+        if widening == 'u':
+            return x.astype(UINT[2 * sew])
+        if widening == 's':
+            return _signed(x).astype(SINT[2 * sew]).view(UINT[2 * sew])
+        return x.view(FTYPE[sew]).astype(FTYPE[2 * sew])
+
+    def execute(self, inst):
+        """
+        the function to execute one reduction instruction
+        will return the inter-lane steps of the instruction
+        """
+        function, etype, order, widening = VRDU_OPS[inst.op]
+        sew, lmul, vstart, vl = self.dispatcher.SEW, self.dispatcher.LMUL, self.dispatcher.vstart, self.dispatcher.vl
+        eew = 2 * sew if widening else sew
+        if vstart != 0:
+            raise ValueError(f"VRDU: {inst.op} is illegal with non-zero vstart {vstart}.")
+        if eew > 64 or (etype == FP and sew not in FTYPE):
+            raise ValueError(f"VRDU: {inst.op} is not supported at SEW {sew}.")
+        self.steps = 0
+        if vl == 0:
+            return 0
+
+        # === operands: vs2 in SEW/LMUL, vs1[0] in EEW ===
+        self.vrf.vset(sew, lmul)
+        vs2    = self.vrf.take(inst.vs2, 0, vl)
+        active = self.masku.predicate(inst.vm, 0, vl)
+        active = np.ones((vl), dtype=bool) if active is None else active
+        self.vrf.vset(eew, 1)
+        scalar = self.vrf.take(inst.vs1, 0, 1)
+
+        flags = 0
+        if etype == FP:
+            if widening:
+                flags |= NV * bool(np.any(_is_snan(vs2.view(FTYPE[sew]))[active]))
+            vs2    = self.widen(vs2, widening) if widening else vs2.view(FTYPE[sew])
+            scalar = scalar.view(FTYPE[eew])
+        elif widening:
+            vs2 = self.widen(vs2, widening)
+
+        # === reduction ===
+        frm  = self.dispatcher.frm
+        grid, valid, lane = self.lane_grid(vs2, active, sew, lmul)
+        with np.errstate(all='ignore'):
+            if order == ORDERED:
+                result = scalar
+                for element in np.flatnonzero(active):
+                    result, flag = function(result, vs2[element:element + 1], frm)
+                    flags |= int(flag[0])
+                hops = lane[active]
+                self.steps = int(np.count_nonzero(np.diff(hops, prepend=0)))
+            else:
+                lane_result, lane_valid, flag = _tree(grid, valid, function, frm)   # intra-lane
+                total, any_valid, flag2       = _tree(lane_result, lane_valid, function, frm)  # inter-lane
+                flags |= flag | flag2
+                result = scalar
+                if any_valid:
+                    result, flag = function(total.reshape(1), scalar, frm)
+                    flags |= int(np.bitwise_or.reduce(np.atleast_1d(flag)))
+                self.steps = _log2_steps(self.vrf.NrLanes)
+        self.inter_lane_steps += self.steps
+        self.debug and print(f"VRDU {inst.op} vd: {inst.vd}, vl: {vl}, SEW: {sew}, "
+                             f"intra-lane steps: {_log2_steps(grid.shape[1])}, inter-lane steps: {self.steps}")
+
+        # === write vd[0], the tail of vd is the elements [1, VLEN/EEW) ===
+        if etype == FP:
+            self.dispatcher.fflags |= flags
+            result = np.where(np.isnan(result), UINT[eew].type(CANONICAL_NAN[eew]), result.view(UINT[eew]))
+        self.vrf.load(inst.vd, 0, 1, result)
+        self.masku.tail_agnostic(inst.vd, 1, eew, 1)
+        return self.steps
+
+
+if __name__ == "__main__":
+    print("===== VRDU testbench =====")
+    print("version: 2025.06.10")
+
+    from vrf import VRF
+    from dispatcher import DISPATCHER
+    from vinst import VInst
+
+    vrf        = VRF()
+    dispatcher = DISPATCHER()
+    vrdu       = VRDU(vrf, dispatcher)
+
+    # === integer: sum of 0..99 ===
+    dispatcher.decodeInst(VInst('vset', rs1=100, sew=16, lmul=1))
+    vrf.vset(16, 1)
+    vrf.load(1, 0, 100, np.arange(100))
+    vrf.load(2, 0, 1, [1000])
+    for op in ['vredsum', 'vredmaxu', 'vredxor', 'vwredsumu']:
+        steps = vrdu.execute(VInst(op, vd=3, vs2=1, vs1=2, form='vv'))
+        vrf.vset(32 if op.startswith('vw') else 16, 1)
+        print(f"{op:10}: {vrf.take(3, 0, 1)[0]:6}, inter-lane steps: {steps}")
+        vrf.vset(16, 1)
+
+    # === floating-point: the unordered tree and the ordered sum differ in rounding ===
+    dispatcher.decodeInst(VInst('vset', rs1=64, sew=32, lmul=1))
+    vrf.vset(32, 1)
+    vrf.load(4, 0, 64, np.array([1.0] + [2**-24] * 63, dtype=np.float32).view(np.uint32))
+    vrf.load(5, 0, 1, np.array([0.0], dtype=np.float32).view(np.uint32))
+    for op in ['vfredusum', 'vfredosum', 'vfwredusum']:
+        steps = vrdu.execute(VInst(op, vd=6, vs2=4, vs1=5, form='vv'))
+        eew = 64 if op.startswith('vfw') else 32
+        vrf.vset(eew, 1)
+        print(f"{op:10}: {float(vrf.take(6, 0, 1).view(f'<f{eew // 8}')[0])!r}, inter-lane steps: {steps}")
+        vrf.vset(32, 1)
@@ -26,6 +26,7 @@ class VRF:
         self.VRFSizePerLane  = self.MaxVLenPerLane  * RegFile # there are 32 register in vector register file
         self.VRFBSizePerLane = self.MaxVLenBPerLane * RegFile
         self.VRFSize = int(self.VRFSizePerLane)
+        self.RowPerReg       = self.VLEN // (self.NrLanes * self.NrBanks * self.DataWidth)  # VRF row for each vreg
 
         # === Dynamic parameters ===
         self._SEW  = SEW     # SEW:  8, 16, 32, 64
@@ -33,18 +34,58 @@ class VRF:
         self.VLMAX = self._LMUL * self.VLEN // self._SEW  # Maximum number of elements
 
         # === VRF memory structure: (Lane=4, Bank=8, Depth-per-Bank=64) ===
-        self.VRF = np.zeros((self.NrLanes, self.NrBanks, 64), dtype=np.uint64)
+        # NOTE the VRF words are little-endian so they can be viewed as SEW elements
+        self.VRF = np.zeros((self.NrLanes, self.NrBanks, RegFile * self.RowPerReg), dtype=np.dtype('<u8'))
+
+        # === element <-> VRF location lookup tables, built once per configuration ===
+        self._idx_cache = {}
+        self._idx_table = self.Lookup_idx(shuffle=True)  # lookup table of the current SEW/LMUL (refreshed by vset)
+
+    # Get the element -> VRF location lookup table
+    def Lookup_idx(self, shuffle=True, SEW=None, LMUL=None):
+        """
+        this function is used to get the lookup table between element index and VRF location
+        will return (idx_arr, row, lane, bank, word)
+        NOTE:
+        (1) idx_arr is the Gen_idx result (row, lane, bank, word per bank) -> element index
+        (2) row/lane/bank/word are arrays indexed by element index (inverse mapping of idx_arr)
+        (3) the table is only built once for each (SEW, LMUL, NrLanes, NrBanks, DataWidth, VLEN, shuffle)
+        (4) SEW/LMUL default to the current vset, others are used for EEW/EMUL and mask layout
+        """
+        SEW  = self._SEW  if SEW  is None else SEW
+        LMUL = self._LMUL if LMUL is None else LMUL
+        key = (SEW, LMUL, self.NrLanes, self.NrBanks, self.DataWidth, self.VLEN, shuffle)
+        table = self._idx_cache.get(key)
+
+        if table is None:
+            idx_arr = self.Gen_idx(shuffle=shuffle, SEW=SEW, LMUL=LMUL)
+            idx_arr.flags.writeable = False
+
+            # === inverse mapping: element index -> (row, lane, bank, word) ===
+            flat_idx = idx_arr.reshape(-1)
+            location = np.flatnonzero(flat_idx != NONE)
+            element_location = np.empty((len(location)), dtype=np.int64)
+            element_location[flat_idx[location]] = location
+
+            row, lane, bank, word = np.unravel_index(element_location, idx_arr.shape)
+            table = (idx_arr, row, lane, bank, word)
+            self._idx_cache[key] = table
+
+        return table
 
     # Generate the VRF element index
-    def Gen_idx(self, shuffle=False):
+    def Gen_idx(self, shuffle=False, SEW=None, LMUL=None):
+        SEW   = self._SEW  if SEW  is None else SEW
+        LMUL  = self._LMUL if LMUL is None else LMUL
+        VLMAX = LMUL * self.VLEN // SEW
 
         # === create element index array ===
-        if self._LMUL >= 1:
-            idx_VLMAX = int(self.VLMAX)
+        if LMUL >= 1:
+            idx_VLMAX = int(VLMAX)
             idx_arr = np.zeros(idx_VLMAX, dtype=int)
-            virtual_LMUL = self._LMUL
+            virtual_LMUL = LMUL
         else:
-            idx_VLMAX = int(self.VLEN // self._SEW)
+            idx_VLMAX = int(self.VLEN // SEW)
             idx_arr = np.zeros(idx_VLMAX, dtype=int) # if LMUL < 1, the element index is limited to one VLEN
             virtual_LMUL = 1
         
@@ -53,14 +94,14 @@ class VRF:
         for row in range(virtual_LMUL * self.VLEN // (self.NrLanes * self.NrBanks * self.DataWidth)):  # row in VRF per VLEN
             for lane in range(self.NrLanes):                                            # lane in VRF
                 for bank in range(self.NrBanks):                                        # bank in lane
-                    for word in range(self.DataWidth // self._SEW):                     # word in bank
-                        rowoffset  = row * (self.NrLanes * self.NrBanks) * (self.DataWidth // self._SEW)
+                    for word in range(self.DataWidth // SEW):                     # word in bank
+                        rowoffset  = row * (self.NrLanes * self.NrBanks) * (self.DataWidth // SEW)
                         laneoffset = lane
-                        bankoffset = bank * self.NrLanes * (self.DataWidth // self._SEW)
+                        bankoffset = bank * self.NrLanes * (self.DataWidth // SEW)
                         wordoffset = word * self.NrLanes
 
                         idx = rowoffset + laneoffset + bankoffset + wordoffset
-                        if idx < self.VLMAX:
+                        if idx < VLMAX:
                             idx_arr[count_idx] = idx
                         else:
                             idx_arr[count_idx] = NONE
@@ -68,16 +109,16 @@ class VRF:
                         count_idx += 1
         
         # === reshape element idx per bank ===
-        idx_arr = idx_arr.reshape(virtual_LMUL * self.VLEN // self.DataWidth, self.DataWidth // self._SEW) # (Total bank slot for VLEN, element inside the bank)
+        idx_arr = idx_arr.reshape(virtual_LMUL * self.VLEN // self.DataWidth, self.DataWidth // SEW) # (Total bank slot for VLEN, element inside the bank)
 
         # === re-order each bank element to fit with ara if needed ===
         if shuffle:
             for bank in range(virtual_LMUL * self.VLEN // self.DataWidth):
-                if self._SEW == 32:
+                if SEW == 32:
                     arr = [0, 1]
-                elif self._SEW == 16:
+                elif SEW == 16:
                     arr = [0, 2, 1, 3]
-                elif self._SEW == 8:
+                elif SEW == 8:
                     arr = [0, 4, 2, 6, 1, 5, 3, 7]
                 else:
                     arr = [0]
@@ -91,7 +132,7 @@ class VRF:
         idx_arr = idx_arr.reshape((virtual_LMUL * self.VLEN // (self.NrLanes * self.NrBanks * self.DataWidth), 
                                    self.NrLanes,
                                    self.NrBanks,
-                                   self.DataWidth // self._SEW)) # (row, lane, bank, word per bank)
+                                   self.DataWidth // SEW)) # (row, lane, bank, word per bank)
 
         return idx_arr
     
@@ -114,55 +155,13 @@ class VRF:
         print()
 
 
-        # element index array
-        if self._LMUL >= 1:
-            el_arr = np.zeros(int(self.VLMAX), dtype=int)
-        else:
-            el_arr = np.zeros(int(self.VLEN // self._SEW), dtype=int)
-
-        # calculate the element index (shuffle)
-        count_idx = 0
-        
         if self._LMUL >= 1:
             virtual_LMUL = self._LMUL
         else:
             virtual_LMUL = 1
 
-        for row in range(virtual_LMUL * self.VLEN // (self.NrLanes * self.NrBanks * self.DataWidth)):  # row in VRF per VLEN
-            for lane in range(self.NrLanes):                                            # lane in VRF
-                for bank in range(self.NrBanks):                                        # bank in lane
-                    for word in range(self.DataWidth // self._SEW):                           # word in bank
-                        rowoffset  = row * (self.NrLanes * self.NrBanks) * (self.DataWidth // self._SEW)
-                        laneoffset = lane
-                        bankoffset = bank * self.NrLanes * (self.DataWidth // self._SEW)
-                        wordoffset = word * self.NrLanes
-
-                        idx = rowoffset + laneoffset + bankoffset + wordoffset
-                        if idx < self.VLMAX:
-                            el_arr[count_idx] = idx
-                        else:
-                            el_arr[count_idx] = NONE
-
-                        count_idx += 1
-        
-        # reshape element with the unit in bank
-        el_arr = el_arr.reshape(virtual_LMUL * self.VLEN // self.DataWidth, self.DataWidth // self._SEW) # (Total bank slot for VLEN, element inside the bank)
-
-        # print(el_arr) # (total element pre vreg, element per bank)
-
-        # re-order each bank to fit with ara
-        for bank in range(virtual_LMUL * self.VLEN // self.DataWidth):
-            if self._SEW == 32:
-                arr = [0, 1]
-            elif self._SEW == 16:
-                arr = [0, 2, 1, 3]
-            elif self._SEW == 8:
-                arr = [0, 4, 2, 6, 1, 5, 3, 7]
-            else:
-                arr = [0]
-            reordered = [el_arr[bank][i] for i in arr]
-            el_arr[bank] = reordered
-
+        # element index per bank (reuse the shuffled lookup table, same order as ara)
+        el_arr = self._idx_table[0].reshape(virtual_LMUL * self.VLEN // self.DataWidth, self.DataWidth // self._SEW)
 
         # print out the element index
         for reg in range(0, RegFile, virtual_LMUL):
@@ -205,12 +204,13 @@ class VRF:
             raise ValueError("Invalid LMUL value. Must be one of [1, 2, 4, 8, 1/2, 1/4, 1/8].")
 
         self.VLMAX = self._LMUL * self.VLEN // self._SEW
+        self._idx_table = self.Lookup_idx(shuffle=True)
 
     # function to print out the VRF data
     def dumpVRF_data(self):
         print("----- VRF Data -----")
     
-        for depth in range(64):
+        for depth in range(self.VRF.shape[2]):
             for lane in range(self.NrLanes):
                 for bank in range(self.NrBanks):
                     value = self.VRF[lane, bank, depth]
@@ -218,56 +218,102 @@ class VRF:
                 print("| ", end="")
             print()
     
+    # function to get the VRF location of elements
+    def _location(self, vreg, vstart, elen, SEW=None, LMUL=None):
+        """
+        this function is used to get the location of elements [vstart, vstart+elen) of vreg
+        will return (lane, bank, slot) index arrays of the SEW element view of VRF
+        NOTE the SEW element view is (Lane, Bank, Depth-per-Bank * element per word)
+        """
+        if SEW in (None, self._SEW) and LMUL in (None, self._LMUL):
+            _, row, lane, bank, word = self._idx_table
+        else:
+            _, row, lane, bank, word = self.Lookup_idx(shuffle=True, SEW=SEW, LMUL=LMUL)
+        element = slice(vstart, vstart + elen)
+        if vstart < 0 or vstart + elen > len(row):
+            raise IndexError(f"VRF: element [{vstart}, {vstart + elen}) is out of VLMAX {len(row)}")
+
+        word_per_bank = self.DataWidth // (self._SEW if SEW is None else SEW)
+        slot = (vreg * self.RowPerReg + row[element]) * word_per_bank + word[element]
+        return lane[element], bank[element], slot
+
     # function to load data to VRF
-    def load(self, vd, vstart, elen, data):
+    def load(self, vd, vstart, elen, data, EEW=None, EMUL=None):
         """
         this function is used to load data to VRF
         NOTE:
         (1) vd is take 0~31 as idx, even "LMUL" will change
-        (2) the behavior is shifting each element to its correspond location
+        (2) the whole [vstart, vstart+elen) slice is scattered to its location in one step,
+            the old element value is overwritten, the elements out of the slice are undisturbed
+        (3) "EEW"/"EMUL" are the register group of widening/narrowing operands, default to the current SEW/LMUL
         TODO:
         need to consider the real case for 
         Ara whether to store full 64b in each bank or element one by one
         """
-        idx_arr = self.Gen_idx(shuffle=True)
+        dtype = np.dtype(f'<u{(self._SEW if EEW is None else EEW) // 8}')
+        lane, bank, slot = self._location(vd, vstart, elen, EEW, EMUL)
+        if isinstance(data, np.ndarray):
+            elements = data[:elen].astype(dtype)
+        else:  # python ints are converted exactly (a list mixing ints above 2**63 would become float64)
+            elements = np.array([int(value) & ((1 << dtype.itemsize * 8) - 1) for value in data[:elen]], dtype=dtype)
+        self.debug and print("load vd: ", vd, "vstart: ", vstart, "elen: ", elen, [hex(val) for val in elements])
 
-        for idx in range(elen):
-            VRF_dimension = np.argwhere(idx_arr == (vstart + idx))[0] # (row, lane, bank, word per bank)
-            if self._SEW == 64:
-                val = np.uint64(int(data[idx]))
-            else:
-                val = np.uint64(int(data[idx]) << (VRF_dimension[3] * self._SEW))
-            self.debug and print("hex: ", hex(val), "dec: ", val, "Dimension: ", VRF_dimension)
-            self.VRF[ VRF_dimension[1] ][ VRF_dimension[2] ][ vd*2 + VRF_dimension[0] ] |= val
+        self.VRF.view(dtype)[lane, bank, slot] = elements
 
     # function to take data from VRF to do some operation
-    def take(self, vs, vstart, elen):
+    def take(self, vs, vstart, elen, EEW=None, EMUL=None):
         """
         this function is used to take data out of VRF
+        will return the element vector (numpy array) of [vstart, vstart+elen) with SEW (or EEW) data size
         TODO:
         need to consider the real case for 
         Ara whether to store full 64b in each bank or element one by one
         """
-        rtn_vec = []
+        dtype = np.dtype(f'<u{(self._SEW if EEW is None else EEW) // 8}')
+        lane, bank, slot = self._location(vs, vstart, elen, EEW, EMUL)
 
-        idx_arr = self.Gen_idx(shuffle=True)
+        rtn_vec = self.VRF.view(dtype)[lane, bank, slot].astype(dtype.newbyteorder('='))
+        self.debug and print("take vs: ", vs, "vstart: ", vstart, "elen: ", elen, [hex(val) for val in rtn_vec])
 
-        for idx in range(elen):
-            VRF_dimension = np.argwhere(idx_arr == (vstart + idx))[0] # (row, lane, bank, word per bank)
-            
-            word_8B = self.VRF[ VRF_dimension[1] ][ VRF_dimension[2] ][ vs*2 + VRF_dimension[0] ]
-            
-            if self._SEW == 64:
-                element = word_8B
-            else:
-                shift_amount = int(VRF_dimension[3] * self._SEW)
-                element_mask = ((1 << self._SEW) - 1)
-                element = word_8B >> shift_amount & element_mask
+        return rtn_vec
 
-            self.debug and print("hex: ", hex(element), "dec: ", element, "Dimension: ", VRF_dimension)
-            rtn_vec.append(element)
+    # function to take a mask register as packed bytes
+    def take_mask_byte(self, vs, vl):
+        """
+        this function is used to take the bytes which hold mask bits [0, vl) of vs
+        NOTE the mask bit i is the bit (i % 8) of the register byte (i // 8), the byte layout is SEW=8, LMUL=1
+        """
+        lane, bank, slot = self._location(vs, 0, (vl + 7) // 8, SEW=8, LMUL=1)
+        return self.VRF.view(np.uint8)[lane, bank, slot]
 
-        return rtn_vec
+    # function to load packed bytes to mask register
+    def load_mask_byte(self, vd, mask_byte):
+        """
+        this function is used to load the bytes [0, len(mask_byte)) of vd
+        """
+        lane, bank, slot = self._location(vd, 0, len(mask_byte), SEW=8, LMUL=1)
+        self.VRF.view(np.uint8)[lane, bank, slot] = mask_byte
+
+    # function to take a mask register as bool vector
+    def take_mask(self, vs, vl):
+        """
+        this function is used to take mask bits [0, vl) of vs
+        """
+        return np.unpackbits(self.take_mask_byte(vs, vl), count=vl, bitorder='little').view(bool)
+
+    # function to load a bool vector to mask register
+    def load_mask(self, vd, vstart, bits):
+        """
+        this function is used to load mask bits [vstart, vstart+len(bits)) of vd
+        NOTE the other mask bits of the touched bytes are undisturbed
+        """
+        bits = np.asarray(bits, dtype=bool)
+        vend = vstart + len(bits)
+        lane, bank, slot = self._location(vd, vstart // 8, (vend + 7) // 8 - vstart // 8, SEW=8, LMUL=1)
+        mask_byte = self.VRF.view(np.uint8)
+        mask_bits = np.unpackbits(mask_byte[lane, bank, slot], bitorder='little')
+        mask_bits[vstart % 8 : vstart % 8 + len(bits)] = bits
+        mask_byte[lane, bank, slot] = np.packbits(mask_bits, bitorder='little')
 
 
 if __name__ == "__main__":